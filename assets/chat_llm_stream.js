@@ -0,0 +1,30 @@
+// Streaming de respuestas de la página Chat LLM (ver src/callbacks/chat_llm_callbacks.py).
+// Abre el stream SSE del trabajo en curso y va escribiendo el texto en el mensaje de espera.
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    chat_llm: {
+        stream_answer: function (jobId) {
+            if (window.chatLlmSource) {
+                window.chatLlmSource.close();
+                window.chatLlmSource = null;
+            }
+            if (!jobId) {
+                return window.dash_clientside.no_update;
+            }
+
+            // EventSource se reconecta solo al cerrarse cada ventana y reenvía Last-Event-ID,
+            // así el servidor continúa desde el último fragmento recibido
+            const source = new EventSource(`/chat-llm/stream/${jobId}`);
+            let text = "";
+            source.addEventListener("token", function (event) {
+                text += JSON.parse(event.data);
+                window.dash_clientside.set_props("chat-llm-pending-text", {children: text});
+            });
+            source.addEventListener("done", function () {
+                source.close();
+                window.dash_clientside.set_props("chat-llm-stream-end", {data: jobId});
+            });
+            window.chatLlmSource = source;
+            return jobId;
+        }
+    }
+});
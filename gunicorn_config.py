@@ -1,7 +1,30 @@
+import os
+
 # Configuración para mejor manejo de recursos
-workers = 1  # Número de workers
-threads = 1  # Threads por worker
+# Con el caché compartido (OFTW_CACHE_BACKEND=filesystem|redis) se pueden subir los workers
+# sin multiplicar la carga de datos ni la memoria.
+workers = int(os.getenv("GUNICORN_WORKERS", "1"))  # Número de workers
+# El caché por defecto es por proceso; con varios workers se usa el compartido en disco para que el
+# historial del chat, los trabajos del LLM, /metrics y el single-flight vean lo mismo en todos
+if workers > 1:
+    os.environ.setdefault("OFTW_CACHE_BACKEND", "filesystem")
+# Los datos compartidos son de solo lectura (src/utils/read_only.py), así que se pueden subir los
+# threads; `python -m src.utils.thread_stress` verifica los callbacks con varios hilos a la vez.
+threads = int(os.getenv("GUNICORN_THREADS", "1"))  # Threads por worker
 worker_class = 'gthread'  # Usar threads
 worker_connections = 1000
 timeout = 300
-keepalive = 2
\ No newline at end of file
+keepalive = 2
+
+# Con OFTW_PREWARM=1 la app se carga en el maestro y los datos y bundles comunes se calculan
+# antes del fork, de modo que los workers arrancan con el caché caliente (ver src/utils/prewarm.py)
+preload_app = os.getenv("OFTW_PREWARM", "0") == "1"
+
+
+def when_ready(server):
+    if preload_app:
+        from main import server as flask_server
+        from src.utils.prewarm import prewarm
+
+        with flask_server.app_context():
+            prewarm()
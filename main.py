@@ -7,6 +7,9 @@ import dash_bootstrap_components as dbc
 from src.components.layout import create_layout
 from src.callbacks.router_callbacks import register_callbacks
 from src.utils.cache import cache
+from src.utils.instrumentation import register_instrumentation
+from src.utils.tracing import register_tracing
+from src.utils.profiling import register_profiling
 from src.metrics_vizualizations.theme import register_oftw_template
 
 # Inicializar la app
@@ -15,6 +18,8 @@ app.config.suppress_callback_exceptions = True
 
 # 🔥 Inicializar el cache aquí (después de definir app)
 cache.init_app(app.server)
+# App por defecto del caché, para que los hilos en segundo plano (recarga de datos) usen el mismo backend
+cache.app = app.server
 
 app.title = "OFTW Challenge"
 server = app.server
@@ -28,6 +33,12 @@ app.layout = create_layout
 # Registrar callbacks
 register_callbacks(app)
 
+# Métricas de callbacks y cálculos en /metrics, y trazas de los callbacks lentos en logs/traces.jsonl
+register_instrumentation(app)
+register_tracing(app)
+# Perfilado bajo demanda de un request (solo con OFTW_PROFILE_SECRET)
+register_profiling(app)
+
 # Ejecutar el servidor
 if __name__ == "__main__":
     app.run_server(host='0.0.0.0', debug=False, port=8050)
@@ -1,23 +1,77 @@
 # src/callbacks/chat_llm_callbacks.py
+"""
+Chat LLM page callbacks.
+
+Questions run as background jobs (`src/utils/job_queue.py`), so a slow answer never blocks the
+dashboards: `OFTW_LLM_WORKERS` (default 4) concurrent calls, `OFTW_LLM_MAX_PENDING` (default 32)
+queued questions before new ones are rejected, and `OFTW_LLM_TIMEOUT` (default 60 s, see
+`src/utils/llm_client.py`, which also reads `OFTW_LLM_MODEL`) per question. A Cancel button stops the
+question in progress.
+
+The answer is streamed as the model generates it: the page listens to `/chat-llm/stream/<job_id>`
+(`assets/chat_llm_stream.js`) and renders each token into the pending message. Each SSE connection
+is closed after `OFTW_LLM_STREAM_WINDOW` seconds (default 1) and the browser resumes from the last
+token, so a stream never holds a gunicorn thread for long; a slow interval picks up the answer if the
+stream is unavailable.
+
+Answers are cached by question, filters, data context, model and prompt (`src/utils/answer_cache.py`),
+and the history is kept on the server per browser session (`src/utils/chat_history.py`). To test
+without OpenAI, run `python -m src.utils.fake_openai_server` and point `OPENAI_BASE_URL` at it.
+"""
 
 import os
 import json
-import openai
+import time
 import pandas as pd
 from datetime import datetime
-from dash.dependencies import Input, Output, State
-from dash import html, no_update, dcc
-from src.utils.cache import cache
+from flask import Response, request
+from dash.dependencies import Input, Output, State, ClientsideFunction
+from dash import html, no_update, dcc, Patch
 from src.utils.callbacks_filter import get_filtered_data
-from dotenv import load_dotenv
+from src.utils.cache import cache
+from src.utils.job_queue import JobQueue, JobRejected, DONE, CANCELLED, TIMED_OUT, FINAL_STATES, JOB_TTL
+from src.utils.llm_client import build_messages, stream_chat, LLM_TIMEOUT, LLM_MODEL, SYSTEM_PROMPT
+from src.utils.answer_cache import AnswerCache, answer_cache_key
+from src.utils.chat_history import get_chat_session_id, trim_history, append_history
+from src.utils.instrumentation import add_collector
+
+# Background queue for LLM calls: a slow answer never blocks the dashboard callbacks
+llm_jobs = JobQueue(
+    "llm",
+    max_workers=int(os.getenv("OFTW_LLM_WORKERS", "4")),
+    max_pending=int(os.getenv("OFTW_LLM_MAX_PENDING", "32")),
+    timeout=LLM_TIMEOUT
+)
 
-load_dotenv()
+# Answers by question, filters and data context: a repeated question costs no API call
+llm_answers = AnswerCache()
 
-# Retrieve the API key from environment variable
-api_key = os.getenv("OPENAI_API_KEY")
 
-# Instantiate the OpenAI client with your API key
-openai_client = openai.OpenAI(api_key=api_key)
+def collect_llm_metrics():
+    """Job and answer cache counters of this process for /metrics."""
+    metrics = [
+        ("oftw_llm_jobs", "gauge", "LLM jobs of this process by status.", {"status": status}, count)
+        for status, count in llm_jobs.stats().items()
+    ]
+    answer_stats = llm_answers.stats()
+    metrics.append(("oftw_llm_answer_cache_size", "gauge", "Cached LLM answers.", {}, answer_stats.pop("size")))
+    metrics += [
+        ("oftw_llm_answer_cache_total", "counter", "LLM answer cache lookups and removals by result.",
+         {"result": result}, value)
+        for result, value in answer_stats.items()
+    ]
+    return metrics
+
+
+add_collector(collect_llm_metrics)
+
+# Id of the text of the loading message (the answer is streamed into it)
+PENDING_TEXT_ID = "chat-llm-pending-text"
+
+# Each SSE connection is closed after this many seconds and the browser reconnects where it left off,
+# so an answer being streamed never holds a gunicorn thread for long
+STREAM_WINDOW = float(os.getenv("OFTW_LLM_STREAM_WINDOW", "1"))
+STREAM_POLL_INTERVAL = 0.05
 
 # ---------------------------------------------------------
 # Helper function to check the length of the user's question
@@ -52,7 +106,7 @@ def create_rich_context(payments_df: pd.DataFrame, pledges_df: pd.DataFrame) ->
         context_lines.append(f"- Average Payment in USD: {avg_payment:.2f}.")
 
         if "payment_platform" in payments_df.columns:
-            platform_counts = payments_df["payment_platform"].value_counts().head(3)
+            platform_counts = payments_df["payment_platform"].value_counts().loc[lambda s: s > 0].head(3)
             if not platform_counts.empty:
                 top_platforms = ", ".join(
                     [f"{plat} ({count} payments)" for plat, count in platform_counts.items()]
@@ -70,13 +124,13 @@ def create_rich_context(payments_df: pd.DataFrame, pledges_df: pd.DataFrame) ->
         context_lines.append(f"- Total Pledges: {total_pledges}.")
 
         if "pledge_status" in pledges_df.columns:
-            status_counts = pledges_df["pledge_status"].value_counts()
+            status_counts = pledges_df["pledge_status"].value_counts().loc[lambda s: s > 0]
             if not status_counts.empty:
                 statuses = ", ".join([f"{status} ({cnt})" for status, cnt in status_counts.items()])
                 context_lines.append(f"- Status distribution: {statuses}")
 
         if "frequency" in pledges_df.columns:
-            freq_counts = pledges_df["frequency"].value_counts()
+            freq_counts = pledges_df["frequency"].value_counts().loc[lambda s: s > 0]
             if not freq_counts.empty:
                 freq_info = ", ".join([f"{freq} ({cnt})" for freq, cnt in freq_counts.items()])
                 context_lines.append(f"- Frequency distribution: {freq_info}")
@@ -89,9 +143,9 @@ def create_rich_context(payments_df: pd.DataFrame, pledges_df: pd.DataFrame) ->
     # Join everything into a single text block
     return "\n".join(context_lines)
 
-def create_message_div(content, is_user=False):
+def create_message_div(content, is_user=False, timestamp=None):
     """Create a styled message div for the chat interface."""
-    timestamp = datetime.now().strftime("%H:%M")
+    timestamp = timestamp or datetime.now().strftime("%H:%M")
     
     # For user messages, use plain text
     if is_user:
@@ -126,8 +180,9 @@ def create_loading_div():
     """Create a simple loading message."""
     return html.Div(
         [
-            html.Div(
+            dcc.Markdown(
                 "⏳ Processing your question... Please wait.",
+                id=PENDING_TEXT_ID,
                 style={
                     "color": "var(--text-secondary)",
                     "fontSize": "var(--font-size-base)",
@@ -135,39 +190,126 @@ def create_loading_div():
                     "backgroundColor": "var(--background-card)",
                     "borderRadius": "var(--border-radius)",
                     "border": "1px solid var(--border-color)",
-                    "margin": "0.5rem 0"
+                    "margin": "0.5rem 0",
+                    "whiteSpace": "pre-wrap"
                 }
             )
         ],
         className="assistant-message"
     )
 
+def render_history_message(message):
+    """Render a message stored in the server-side chat history."""
+    return create_message_div(message["content"], is_user=message["role"] == "user", timestamp=message["time"])
+
+def add_message(messages_patch, session_id, role, content):
+    """Store a message in the session history and append it to the page as a partial update."""
+    message = append_history(session_id, role, content)
+    messages_patch.append(render_history_message(message))
+
+def answer_question(job, messages, cache_key=None):
+    """
+    Job body: stream the LLM answer, reporting the text so far, within the job's deadline.
+    Complete answers are stored in the answer cache under `cache_key`.
+    """
+    answer = ""
+    for token in stream_chat(messages, timeout=max(job.remaining(), 1.0)):
+        if job.is_cancelled():
+            return answer
+        if job.remaining() <= 0:
+            raise TimeoutError("The LLM answer did not finish in time.")
+        answer += token
+        job.report(answer)
+
+    if cache_key is not None and answer:
+        llm_answers.set(cache_key, answer)
+    return answer
+
+def sse_event(event, data, event_id=None):
+    """Format one server-sent event."""
+    lines = [f"id: {event_id}"] if event_id is not None else []
+    lines += [f"event: {event}", f"data: {json.dumps(data)}"]
+    return "\n".join(lines) + "\n\n"
+
+def stream_job_events(job_id, offset=0, window=STREAM_WINDOW):
+    """
+    Server-sent events for a queued question: `token` events with the new text (the event id is the
+    length of the text sent so far) and a final `done` event with the job status.
+    """
+    yield "retry: 50\n\n"
+    deadline = time.monotonic() + window
+    while True:
+        job = llm_jobs.get(job_id)
+        if job is None:
+            yield sse_event("done", "missing")
+            return
+
+        text = job["result"] if job["status"] == DONE else job["progress"] or ""
+        if len(text) > offset:
+            yield sse_event("token", text[offset:], event_id=len(text))
+            offset = len(text)
+        if job["status"] in FINAL_STATES:
+            yield sse_event("done", job["status"])
+            return
+        if time.monotonic() > deadline:
+            return
+        time.sleep(STREAM_POLL_INTERVAL)
+
 def register_chat_llm_callbacks(app):
+    @app.server.route("/chat-llm/stream/<job_id>")
+    def stream_chat_llm(job_id):
+        """SSE endpoint the chat page listens to while an answer is generated."""
+        offset = request.headers.get("Last-Event-ID") or request.args.get("offset") or 0
+        return Response(
+            stream_job_events(job_id, int(offset)),
+            mimetype="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
+
+    # Opens the event stream in the browser and renders tokens into the pending message
+    app.clientside_callback(
+        ClientsideFunction(namespace="chat_llm", function_name="stream_answer"),
+        Output("chat-llm-stream", "data"),
+        Input("chat-llm-job", "data"),
+        prevent_initial_call=True
+    )
+
+    # Full history, sent once when the page is shown; every later update is a Patch
+    @app.callback(
+        Output("chat-messages-container", "children"),
+        Input("chat-llm-restore", "data")
+    )
+    def restore_chat_history(_):
+        """Renders the chat history stored on the server for this browser session."""
+        return [render_history_message(message) for message in trim_history(get_chat_session_id())]
+
     @app.callback(
-        [Output("chat-messages-container", "children"),
-         Output("chat-llm-input", "value")],
+        [Output("chat-messages-container", "children", allow_duplicate=True),
+         Output("chat-llm-pending", "children"),
+         Output("chat-llm-input", "value"),
+         Output("chat-llm-job", "data"),
+         Output("chat-llm-poll", "disabled"),
+         Output("chat-llm-cancel", "disabled")],
         [Input("chat-llm-submit", "n_clicks")],
         [
             State("chat-llm-input", "value"),
-            State("chat-messages-container", "children"),
-            Input("year-filter", "value"),
-            Input("portfolio-filter", "value"),
-            Input("year-mode", "value")
+            State("chat-llm-job", "data"),
+            State("year-filter", "value"),
+            State("portfolio-filter", "value"),
+            State("year-mode", "value")
         ],
         prevent_initial_call=True
     )
-    @cache.memoize(timeout=300)  # optional caching for repeated queries
-    def run_chat_llm(n_clicks, user_question, current_messages, selected_years, selected_portfolios, year_mode):
+    def run_chat_llm(n_clicks, user_question, current_job, selected_years, selected_portfolios, year_mode):
         """
-        Calls the OpenAI API (or another LLM) to answer the user's question,
-        using filtered data as context (if any).
+        Queues the LLM call for the user's question, using filtered data as context (if any),
+        and starts streaming the answer. Only the new messages are sent to the page.
         """
         if not user_question:
-            return no_update, ""
+            return no_update, no_update, "", no_update, no_update, no_update
 
-        # Initialize messages list if None
-        if current_messages is None:
-            current_messages = []
+        session_id = get_chat_session_id()
+        messages = Patch()
 
         # Check the character limit
         if not check_question_length(user_question):
@@ -175,88 +317,87 @@ def register_chat_llm_callbacks(app):
                 "Your question is too long. Please keep it under 300 characters and try again.",
                 is_user=False
             )
-            return current_messages + [error_message], ""
+            messages.append(error_message)
+            return messages, no_update, "", no_update, no_update, no_update
 
-        # Add user message to chat
-        user_message = create_message_div(user_question, is_user=True)
-        current_messages = current_messages + [user_message]
+        # A new question replaces the one still in progress
+        if current_job:
+            llm_jobs.cancel(current_job)
+            add_message(messages, session_id, "assistant", "Previous question cancelled.")
 
-        # Add loading indicator
-        loading_div = create_loading_div()
-        current_messages = current_messages + [loading_div]
+        # Add user message to chat
+        add_message(messages, session_id, "user", user_question)
 
         # Prepare the filtered data context
         payments_df, pledges_df = get_filtered_data(selected_years, selected_portfolios, year_mode)
         context_text = create_rich_context(payments_df, pledges_df)
 
-        # Build the system message and user prompt
-        system_prompt = """
-            You are a specialized data assistant for the One for the World (OFTW) organization. You have access to the following high-level context about the data, metrics, and codebase:    
-            1) **Data & Datasets**:
-               - **Pledges dataset** (pledge_id, donor_id, donor_chapter, chapter_type, pledge_status, pledge_created_at, pledge_starts_at, pledge_ended_at, contribution_amount, currency, frequency, payment_platform). 
-                 - Each pledge records a donor's intention to give recurring or one-time donations. It may be active, pledged (i.e. starting in the future), or canceled.
-               - **Payments dataset** (id, donor_id, payment_platform, portfolio, amount, currency, date, counterfactuality, pledge_id).
-                 - Each payment is an actual monetary transaction made by a donor on a certain date and might belong to a pledge. The "counterfactuality" factor (0–1) represents how much of this donation is truly attributable to OFTW's influence.
-            
-            2) **Core Metrics & Definitions**:
-               - **Money Moved**: The sum of relevant donations, converted to USD. This excludes certain portfolios such as "One for the World Discretionary Fund" or "One for the World Operating Costs," focusing on the recommended charities.
-               - **Counterfactual Money Moved**: Each donation multiplied by its counterfactual factor, to capture how much was uniquely caused by OFTW's influence.
-               - **Annualized Run Rate (ARR)**: A projection of yearly donation amounts based on the frequency in pledges (e.g., monthly pledges get multiplied by 12, quarterly by 4, etc.). Often subdivided into Active ARR (for "Active donor" pledges) and Future ARR (for "Pledged donor").
-               - **Pledge Performance**: Tracks the total of all pledges (active + future), the monthly attrition rate (how many pledges are lost or fail), and breakdowns by channel or chapter type.
-               - **OKRs / Wishlist Metrics** (examples):
-                 - Target $1.8M Money Moved by 2025,
-                 - $1.2M Active ARR,
-                 - 1200 total active donors,
-                 - 850 active pledges,
-                 - 18% pledge attrition rate, etc.
-            
-            3) **Filters**:
-               - Users can filter the data by:
-                 - **Year mode**: either "calendar" (Jan–Dec) or "fiscal" (Jul–Jun).
-                 - **Year(s)**: e.g. 2023, 2024, etc., which define date ranges depending on the year mode.
-                 - **Portfolio**: e.g., "OFTW Top Picks," "Entire OFTW Portfolio," or custom top picks.
-            
-            4) **Technical/Code Structure**:
-               - The codebase is a Dash application with separate pages (Home, Money Moved, Pledge Performance, Objectives & Key Results, Notes, plus a new Chat LLM page).
-               - The data ingestion converts all amounts to USD using historical currency rates, ignoring "One for the World Discretionary Fund" or "Operating Costs" in main metrics.
-               - A variety of metrics are computed in dedicated modules (e.g., `money_metrics`, `performance_metrics`, `objectics_metrics`).
-               - The user can combine filters (year, year-mode, portfolio) to see custom slices of the data.
-            
-            5) **How You Should Respond**:
-               - Always answer in English.
-               - Remain consistent with the above definitions of money moved, pledge statuses, and methodological assumptions.
-               - If a user asks about specific calculations or code references, rely on these data definitions and the typical approach in the code (ARR = frequency factor × contribution amount in USD, etc.).
-               - If uncertain because the code or data does not specify details, politely say you do not have enough information.
-               - If the user's question is longer than allowed or if it contradicts known constraints, provide an appropriate disclaimer.
-            
-            Your main objective: Provide coherent, concise, and accurate answers about the OFTW data, metrics, and logic described in the codebase. Do not fabricate details that are not supported by the provided context. If asked about numeric results, use the actual data context available (or disclaim you do not have it if not included).
-            
-            Remember: Respond strictly in English, reference only the known data and approach from the codebase, and keep your explanations straightforward but sufficiently detailed to be helpful.
+        cache_key = answer_cache_key(user_question, selected_years, selected_portfolios, year_mode,
+                                     context_text, model=LLM_MODEL, prompt=SYSTEM_PROMPT)
+        cached_answer = llm_answers.get(cache_key)
+        if cached_answer is not None:
+            add_message(messages, session_id, "assistant", cached_answer)
+            return messages, None, "", None, True, True
+
+        try:
+            job_id = llm_jobs.submit(answer_question, build_messages(context_text, user_question), cache_key)
+        except JobRejected:
+            add_message(messages, session_id, "assistant",
+                        "The assistant is busy right now. Please try again in a moment.")
+            return messages, None, "", None, True, True
+
+        # Show the loading indicator; the answer is streamed into it
+        return messages, create_loading_div(), "", job_id, False, False  # Clear the input field
+
+    @app.callback(
+        [Output("chat-messages-container", "children", allow_duplicate=True),
+         Output("chat-llm-pending", "children", allow_duplicate=True),
+         Output("chat-llm-job", "data", allow_duplicate=True),
+         Output("chat-llm-poll", "disabled", allow_duplicate=True),
+         Output("chat-llm-cancel", "disabled", allow_duplicate=True)],
+        [Input("chat-llm-stream-end", "data"),
+         Input("chat-llm-poll", "n_intervals")],
+        [State("chat-llm-job", "data")],
+        prevent_initial_call=True
+    )
+    def poll_chat_llm(stream_end, n_intervals, job_id):
+        """
+        Shows the final answer (or error) once the queued LLM call finishes. Triggered by the end of
+        the event stream; the interval is a fallback for when the stream is not available.
         """
+        if not job_id:
+            return no_update, no_update, no_update, True, True
 
-        user_prompt = (
-            f"Context:\n{context_text}\n\n"
-            f"User Question:\n{user_question}"
-        )
+        job = llm_jobs.get(job_id)
+        if job is None:
+            answer = "The answer was lost (the server restarted or it expired). Please ask again."
+        elif job["status"] not in FINAL_STATES:
+            return no_update, no_update, no_update, no_update, no_update
+        elif job["status"] == DONE:
+            answer = job["result"]
+        elif job["status"] == TIMED_OUT:
+            answer = f"The LLM did not answer in time: {job['error']}"
+        elif job["status"] == CANCELLED:
+            answer = "Question cancelled."
+        else:
+            answer = f"Error while calling the LLM: {job['error']}"
 
-        # Call the OpenAI Chat Completion endpoint
-        try:
-            response = openai_client.chat.completions.create(
-                model="gpt-4o-mini",  # Adjust to the model you want to use
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                temperature=0.2
-            )
-            # Extract the LLM's reply
-            answer = response.choices[0].message.content
-        except Exception as e:
-            answer = f"Error while calling the LLM: {e}"
+        # The stream end and the fallback interval can both see the finished job: only one appends it
+        if not cache.add(f"chat-llm-delivered:{job_id}", True, timeout=JOB_TTL):
+            return no_update, None, None, True, True
 
-        # Remove loading indicator and add assistant's response
-        current_messages = current_messages[:-1]  # Remove loading indicator
-        assistant_message = create_message_div(answer, is_user=False)
-        current_messages = current_messages + [assistant_message]
+        messages = Patch()
+        add_message(messages, get_chat_session_id(), "assistant", answer)
+        return messages, None, None, True, True
 
-        return current_messages, ""  # Clear the input field
+    @app.callback(
+        Output("chat-llm-cancel", "disabled", allow_duplicate=True),
+        [Input("chat-llm-cancel", "n_clicks")],
+        [State("chat-llm-job", "data")],
+        prevent_initial_call=True
+    )
+    def cancel_chat_llm(n_clicks, job_id):
+        """Cancels the question in progress; the next poll shows it as cancelled."""
+        if job_id:
+            llm_jobs.cancel(job_id)
+        return True
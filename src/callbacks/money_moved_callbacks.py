@@ -2,15 +2,16 @@ import json
 import pandas as pd
 import plotly.graph_objects as go
 from dash.dependencies import Input, Output
-from src.metrics_calculations.money_metrics import calculate_money_moved, calculate_counterfactual_money_moved, calculate_money_moved_by_donation_type, calculate_money_moved_by_platform, calculate_money_moved_by_source, calculate_accumulated_money_moved
 from src.metrics_vizualizations.money_viz import plot_money_moved, plot_counterfactual_money_moved, plot_money_moved_by_platform, plot_money_moved_by_donation_type, plot_money_moved_treemap, plot_accumulated_money_moved
-from src.utils.callbacks_filter import get_filtered_data
+from src.metrics_calculations.page_bundles import get_money_moved_bundle
 from src.data_ingestion.data_read import read_targets
 
 
 def register_money_moved_callbacks(app):
     """
     Registra los callbacks en la aplicación Dash.
+    Los tres callbacks comparten el bundle de la página: el primero que se ejecuta
+    calcula todas las métricas y los demás las leen del caché.
     """
 
     @app.callback(
@@ -26,21 +27,17 @@ def register_money_moved_callbacks(app):
         en función de los filtros seleccionados.
         """
 
-        payments_df, pledges_df = get_filtered_data(selected_years, selected_portfolios, year_mode)
+        bundle = get_money_moved_bundle(selected_years, selected_portfolios, year_mode)
 
-        if payments_df is None or payments_df.empty:
+        if bundle is None:
             empty_fig = go.Figure()
             empty_fig.add_annotation(text="No Data Available", showarrow=False, x=0.5, y=0.5, xref="paper",
                                      yref="paper")
             return empty_fig, empty_fig
 
-        # Calcular métricas
-        monthly_money_moved, total_money_moved = calculate_money_moved(payments_df)
-        monthly_counterfactual_money_moved, total_counterfactual_money_moved = calculate_counterfactual_money_moved(payments_df)
-
         # Generar gráficos
-        fig1 = plot_money_moved(monthly_money_moved, total_money_moved)
-        fig2 = plot_counterfactual_money_moved(monthly_counterfactual_money_moved, total_counterfactual_money_moved)
+        fig1 = plot_money_moved(*bundle["money_moved"])
+        fig2 = plot_counterfactual_money_moved(*bundle["counterfactual_money_moved"])
 
         return fig1, fig2
 
@@ -57,25 +54,24 @@ def register_money_moved_callbacks(app):
         Actualiza gráficos de Money Moved por plataforma, por tipo de donación y por fuente.
         """
 
-        payments_df, pledges_df = get_filtered_data(selected_years, selected_portfolios, year_mode)
+        bundle = get_money_moved_bundle(selected_years, selected_portfolios, year_mode)
 
-        if payments_df is None or payments_df.empty:
+        if bundle is None:
             empty_fig = go.Figure()
             empty_fig.add_annotation(text="No Data Available", showarrow=False, x=0.5, y=0.5, xref="paper",
                                      yref="paper")
             return empty_fig, empty_fig, empty_fig
 
-        df_platform = calculate_money_moved_by_platform(payments_df)
+        df_platform = bundle["by_platform"]
 
         if df_platform.empty:
             fig_platform = go.Figure()
         else:
             fig_platform = plot_money_moved_by_platform(df_platform)
 
-        fig_donation_type = plot_money_moved_by_donation_type(
-            calculate_money_moved_by_donation_type(payments_df, pledges_df))
+        fig_donation_type = plot_money_moved_by_donation_type(bundle["by_donation_type"])
 
-        fig_source = plot_money_moved_treemap(calculate_money_moved_by_source(payments_df, pledges_df))
+        fig_source = plot_money_moved_treemap(bundle["by_source"])
 
         return fig_platform, fig_donation_type, fig_source
 
@@ -86,25 +82,15 @@ def register_money_moved_callbacks(app):
          Input("year-mode", "value")]
     )
     def update_accumulated_graph(selected_years, selected_portfolios, year_mode):
-        payments_df, pledges_df = get_filtered_data(selected_years, selected_portfolios, year_mode)
-        if payments_df is None or payments_df.empty:
+        bundle = get_money_moved_bundle(selected_years, selected_portfolios, year_mode)
+        if bundle is None:
             fig_empty = go.Figure()
             fig_empty.add_annotation(text="No Data Available", showarrow=False, x=0.5, y=0.5,
                                      xref="paper", yref="paper")
             return fig_empty
 
-        # Llamamos a la nueva función de cálculo
-        df_accum = calculate_accumulated_money_moved(payments_df, year_mode)
-
-        # Obtenemos la lista de años contables únicos
-        unique_years = sorted(df_accum["contable_year"].unique())  # ascending order
-
-        # Si hay más de 5, nos quedamos con los últimos 5
-        if len(unique_years) > 5:
-            # “Últimos 5” → los más recientes
-            keep_years = unique_years[-5:]
-            # Filtramos el DF
-            df_accum = df_accum[df_accum["contable_year"].isin(keep_years)]
+        # Acumulado por año contable (ya limitado a los últimos 5 años)
+        df_accum = bundle["accumulated"]
 
         # 2) leer la meta si la tenemos
         targets = read_targets()
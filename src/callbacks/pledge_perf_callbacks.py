@@ -2,10 +2,8 @@ import json
 import pandas as pd
 import plotly.graph_objects as go
 from dash.dependencies import Input, Output
-from src.metrics_calculations.performance_metrics import calculate_all_pledges, calculate_future_pledges, calculate_breakdown_by_channel, calculate_monthly_attrition_rate
-from src.metrics_vizualizations.performance_viz import plot_breakdown_by_channel
-from src.utils.financial import calculate_arr
-from src.utils.callbacks_filter import get_filtered_data
+from src.metrics_vizualizations.performance_viz import plot_breakdown_by_channel, plot_monthly_churn
+from src.metrics_calculations.page_bundles import get_pledge_perf_bundle
 
 
 def register_performance_callbacks(app):
@@ -20,29 +18,31 @@ def register_performance_callbacks(app):
          Output("future-arr", "children"),  # NUEVO
          Output("active-arr", "children"),  # NUEVO
          Output("monthly-attrition-rate", "children"),
-         Output("breakdown-channel-graph", "figure")],
+         Output("breakdown-channel-graph", "figure"),
+         Output("monthly-churn-graph", "figure")],
         [Input("year-filter", "value"),
          Input("portfolio-filter", "value"),
          Input("year-mode", "value")]
     )
     def update_performance_metrics(selected_years, selected_portfolios, year_mode):
 
-        payments_df, pledges_df = get_filtered_data(selected_years, selected_portfolios, year_mode)
+        bundle = get_pledge_perf_bundle(selected_years, selected_portfolios, year_mode)
 
-        if pledges_df is None or pledges_df.empty:
+        if bundle is None:
             empty_fig = go.Figure()
             empty_fig.add_annotation(text="No Data Available", showarrow=False, x=0.5, y=0.5, xref="paper",
                                      yref="paper")
-            return "N/A", "N/A", "N/A", "N/A", "N/A", "N/A", empty_fig
+            return "N/A", "N/A", "N/A", "N/A", "N/A", "N/A", empty_fig, empty_fig
 
-        # Calcular las métricas
-        total_pledges_val = calculate_all_pledges(pledges_df)
-        future_pledges_val = calculate_future_pledges(pledges_df)
-        all_arr_val = calculate_arr(pledges_df, ["Pledged donor", "Active donor"])
-        future_arr_val = calculate_arr(pledges_df, ["Pledged donor"])
-        active_arr_val = calculate_arr(pledges_df, ["Active donor"])
-        monthly_attrition_val = calculate_monthly_attrition_rate(pledges_df)
-        breakdown_fig = plot_breakdown_by_channel(calculate_breakdown_by_channel(pledges_df))
+        # Métricas calculadas en el bundle de la página
+        total_pledges_val = bundle["total_pledges"]
+        future_pledges_val = bundle["future_pledges"]
+        all_arr_val = bundle["all_arr"]
+        future_arr_val = bundle["future_arr"]
+        active_arr_val = bundle["active_arr"]
+        monthly_attrition_val = bundle["monthly_attrition_rate"]
+        breakdown_fig = plot_breakdown_by_channel(bundle["breakdown_by_channel"])
+        churn_fig = plot_monthly_churn(bundle["monthly_churn"])
 
         return (
             total_pledges_val,
@@ -51,5 +51,6 @@ def register_performance_callbacks(app):
             f"${future_arr_val:,.2f}",  # Future ARR en formato $
             f"${active_arr_val:,.2f}",  # Active ARR en formato $
             f"{monthly_attrition_val * 100:.2f}%",
-            breakdown_fig
+            breakdown_fig,
+            churn_fig
         )
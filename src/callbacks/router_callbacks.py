@@ -8,6 +8,7 @@ from src.pages.pledge_perf_layout import pledge_perf_layout
 from src.pages.home_layout import home_layout
 from src.pages.notes import notes_layout
 from src.data_ingestion.data_loader import load_clean_data
+from src.utils.filtering import get_available_years
 from src.pages.chat_llm_layout import chat_llm_layout
 
 
@@ -33,11 +34,8 @@ def register_callbacks(app):
         if payments_df is None or payments_df.empty:
             raise PreventUpdate
 
-        # Asegúrate de tener la columna year convertida (si no, hazlo aquí).
-        payments_df["year"] = payments_df["date"].dt.year.astype(str)
-
         # Construir opciones
-        year_opts = [{"label": y, "value": y} for y in sorted(payments_df["year"].unique())]
+        year_opts = [{"label": y, "value": y} for y in get_available_years(payments_df)]
         portfolio_opts = [
             {"label": p, "value": p}
             for p in sorted(payments_df["portfolio"].dropna().unique())
@@ -1,15 +1,78 @@
 """
 Carga los datos desde los JSON y aplica transformaciones iniciales.
+
+`data_versions` mantiene en memoria la versión vigente de los datos limpios y la recarga en
+segundo plano cuando cambian los archivos de data/ (ver `data_version`).
 """
 
 from src.data_ingestion.data_read import read_data
 from src.data_ingestion.data_transform import clean_data
+from src.data_ingestion.data_version import DataVersionManager
+from src.data_ingestion.incremental import apply_deltas, compute_watermarks
+from src.data_ingestion.snapshot import (
+    MONEY_CUBE_FRAME, compute_base_fingerprint, compute_fingerprint, find_parent_snapshot, list_delta_files,
+    load_snapshot, load_snapshot_frame, write_snapshot, write_snapshot_frame
+)
+from src.utils.single_flight import MISSING, single_flight
+from log_config import get_logger
+
+logger = get_logger(__name__)
+
+
+def load_clean_data_version(fingerprint: str) -> dict:
+    """
+    Carga los datos limpios de una versión concreta de los insumos.
+    Usa el snapshot Parquet si existe; si no, parte del snapshot anterior con la misma base y
+    aplica solo los deltas pendientes, o recalcula todo si no hay ninguno utilizable.
+
+    Si varios hilos o workers piden la misma versión sin snapshot, solo uno la construye y los
+    demás la leen del snapshot publicado.
+
+    :param fingerprint: Huella de los insumos (ver `compute_fingerprint`).
+    :return: Diccionario con DataFrames de datos limpios.
+    """
+    def lookup():
+        dfs = load_snapshot(fingerprint)
+        return MISSING if dfs is None else dfs
+
+    return single_flight("load_clean_data_version", f"data-version:{fingerprint}", lookup,
+                         lambda: _build_clean_data_version(fingerprint))
+
+
+def _build_clean_data_version(fingerprint: str) -> dict:
+    dfs = None
+    base_fingerprint = compute_base_fingerprint()
+    deltas = list_delta_files()
+    parent, manifest = find_parent_snapshot(base_fingerprint, deltas)
+    if parent is not None:
+        dfs = load_snapshot(parent)
+
+    cube = None
+    if dfs is None:
+        dfs = clean_data(read_data())
+        pending = deltas
+    else:
+        pending = deltas[len(manifest["deltas"]):]
+        cube = load_snapshot_frame(parent, MONEY_CUBE_FRAME)
+        logger.info(f"Versión {fingerprint}: se parte del snapshot {parent} con {len(pending)} deltas pendientes.")
+
+    if pending:
+        dfs, cube = apply_deltas(dfs, pending, cube)
+
+    manifest = {"base": base_fingerprint, "deltas": deltas, "watermarks": compute_watermarks(dfs)}
+    write_snapshot(fingerprint, dfs, manifest)
+    if cube is not None:
+        write_snapshot_frame(fingerprint, MONEY_CUBE_FRAME, cube)
+    return dfs
+
+
+data_versions = DataVersionManager(load_clean_data_version, compute_fingerprint)
+
 
 def load_clean_data():
     """
-    Carga y transforma los datos de pagos y pledges.
+    Retorna los datos limpios de pagos y pledges de la versión activa.
 
     :return: Diccionario con DataFrames de datos limpios.
     """
-    dfs = read_data()
-    return clean_data(dfs)
+    return data_versions.current().dfs
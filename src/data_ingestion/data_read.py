@@ -1,11 +1,27 @@
+import contextlib
+import os
+import time
+import tracemalloc
 import pandas as pd
+import numpy as np
 import json
 from pathlib import Path
 from log_config import get_logger
 from src.utils.cache import cache
+from src.utils.tracing import traced
+from src.data_ingestion.schema import CATEGORICAL_COLUMNS, DATE_FORMAT, SCHEMAS
 
 logger = get_logger(__name__)
 
+# Ingesta en streaming (por chunks) en lugar de json.load del archivo completo
+STREAMING_INGEST = os.getenv("OFTW_STREAMING_INGEST", "0") == "1"
+STREAM_CHUNK_ROWS = int(os.getenv("OFTW_STREAM_CHUNK_ROWS", "10000"))
+# Pico de memoria por archivo con tracemalloc (encarece la lectura varias veces: solo para diagnóstico)
+STREAM_MEMORY_STATS = os.getenv("OFTW_STREAM_MEMORY_STATS", "0") == "1"
+STREAM_READ_BYTES = 1 << 20
+
+_decoder = json.JSONDecoder()
+
 
 def load_json_to_dataframe(file_path: Path) -> pd.DataFrame:
     """Carga un archivo JSON en un DataFrame de pandas."""
@@ -20,7 +36,204 @@ def load_json_to_dataframe(file_path: Path) -> pd.DataFrame:
         return pd.DataFrame()
 
 
-@cache.memoize(timeout=300)
+@contextlib.contextmanager
+def _traced_peak_mb():
+    """
+    Mide con tracemalloc el pico de memoria asignada (MB) durante el bloque: entrega un diccionario
+    cuyo campo "peak_mb" queda definido al salir. Solo con `OFTW_STREAM_MEMORY_STATS`; si tracemalloc
+    ya estaba activo (p. ej. en `src.utils.benchmark`) no se toca para no alterar esa medición, y
+    "peak_mb" queda en None.
+    """
+    result = {"peak_mb": None}
+    if not STREAM_MEMORY_STATS or tracemalloc.is_tracing():
+        yield result
+        return
+    tracemalloc.start()
+    try:
+        yield result
+        result["peak_mb"] = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+    finally:
+        tracemalloc.stop()
+
+
+def parse_dates(values: pd.Series, name: str) -> pd.Series:
+    """
+    Convierte una columna de fechas en texto a datetime con el formato explícito del esquema;
+    si este no reconoce valores presentes, vuelve a la inferencia de pandas.
+
+    :param values: Serie con las fechas.
+    :param name: Nombre de la columna (para el log).
+    :return: Serie datetime64 (NaT en los valores no reconocidos).
+    """
+    parsed = pd.to_datetime(values, format=DATE_FORMAT, errors='coerce')
+    if parsed.isna().sum() > values.isna().sum():
+        logger.warning(f"Columna {name} con fechas fuera del formato {DATE_FORMAT}; se usará inferencia.")
+        parsed = pd.to_datetime(values, errors='coerce')
+    return parsed
+
+
+def iter_json_array(file_path: Path, chunk_rows: int = STREAM_CHUNK_ROWS):
+    """
+    Decodifica incrementalmente el arreglo JSON de primer nivel de un archivo,
+    entregando listas de a lo más `chunk_rows` registros.
+
+    :param file_path: Ruta al archivo JSON (un arreglo de objetos).
+    :param chunk_rows: Número máximo de registros por chunk.
+    """
+    with open(file_path, 'r', encoding='utf-8') as file:
+        buffer = file.read(STREAM_READ_BYTES)
+        pos = len(buffer) - len(buffer.lstrip())
+        if buffer[pos:pos + 1] != "[":
+            raise ValueError(f"{file_path.name} no contiene un arreglo JSON en el primer nivel.")
+        pos += 1
+        eof = False
+        chunk = []
+
+        while True:
+            # Saltar separadores entre elementos
+            while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+                pos += 1
+
+            if pos < len(buffer) and buffer[pos] == "]":
+                break
+
+            try:
+                record, end = _decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                # Registro incompleto: descartar lo consumido y leer otro bloque
+                more = file.read(STREAM_READ_BYTES)
+                eof = not more
+                buffer = buffer[pos:] + more
+                pos = 0
+                continue
+
+            chunk.append(record)
+            pos = end
+            if len(chunk) >= chunk_rows:
+                yield chunk
+                chunk = []
+
+        if chunk:
+            yield chunk
+
+
+def _encode_labels(values: pd.Series, labels: dict) -> np.ndarray:
+    """
+    Codifica un chunk de texto como códigos int32 sobre un diccionario de etiquetas que se va
+    ampliando entre chunks (-1 para los nulos).
+
+    :param values: Serie de objetos del chunk.
+    :param labels: Diccionario {etiqueta: código} acumulado del archivo (se modifica).
+    :return: Arreglo de códigos.
+    """
+    codes, uniques = pd.factorize(values)
+    # El -1 final mantiene los nulos en -1 al indexar con el código -1
+    mapping = np.array([labels.setdefault(label, len(labels)) for label in uniques] + [-1], dtype="int32")
+    return mapping[codes]
+
+
+def _build_column(parts: list, labels: dict, categorical: bool):
+    """
+    Une los chunks de una columna, dados como pares (codificado, arreglo), en un solo arreglo.
+    Los chunks codificados se vuelven una categórica (columnas de `CATEGORICAL_COLUMNS`) o un
+    arreglo de objetos que apunta a las etiquetas compartidas; los demás se concatenan con el
+    tipo común, como lo haría `pd.DataFrame`.
+    """
+    categories = np.array(list(labels) + [None], dtype=object)
+    if all(coded for coded, _ in parts):
+        codes = np.concatenate([values for _, values in parts])
+        if categorical:
+            return pd.Categorical.from_codes(codes, categories[:-1], validate=False)
+        return categories[codes]
+    if any(coded for coded, _ in parts):
+        # Texto y números en la misma columna: queda como objeto
+        parts = [(False, categories[values] if coded else values.astype(object)) for coded, values in parts]
+    arrays = [values for _, values in parts]
+    if all(isinstance(values, np.ndarray) for values in arrays):
+        return np.concatenate(arrays)
+    return pd.concat(arrays, ignore_index=True)
+
+
+def stream_json_to_dataframe(file_path: Path, schema: dict, chunk_rows: int = STREAM_CHUNK_ROWS,
+                             categorical_columns: tuple = ()) -> pd.DataFrame:
+    """
+    Carga un archivo JSON por chunks, codificando cada chunk en almacenamiento tipado compacto
+    antes de acumularlo, de modo que el pico de memoria escale con el tamaño del chunk y no con
+    el del archivo:
+     - "float": float64.
+     - "date": datetime64, parseado por chunk (ver `parse_dates`).
+     - "str": códigos int32 sobre las etiquetas vistas hasta el momento; al final las columnas de
+       `categorical_columns` quedan como categóricas y el resto como objetos que comparten las
+       cadenas. Los identificadores numéricos conservan su tipo numérico.
+    El DataFrame se arma con las columnas ya construidas, sin una segunda copia.
+
+    :param file_path: Ruta al archivo JSON.
+    :param schema: Diccionario {columna: tipo lógico} (ver `src.data_ingestion.schema`).
+    :param chunk_rows: Número de registros decodificados por chunk.
+    :param categorical_columns: Columnas que se entregan como categóricas.
+    :return: DataFrame con las columnas del esquema.
+    """
+    try:
+        start = time.perf_counter()
+        buffers = {col: [] for col in schema}
+        labels = {col: {} for col in schema}
+        n_rows = 0
+
+        with _traced_peak_mb() as memory:
+            for chunk in iter_json_array(file_path, chunk_rows):
+                for col, kind in schema.items():
+                    values = pd.Series([record.get(col) for record in chunk], dtype=object)
+                    if kind == "float":
+                        buffers[col].append((False, pd.to_numeric(values, errors="coerce").to_numpy(dtype="float64")))
+                    elif kind == "date":
+                        buffers[col].append((False, parse_dates(values, col)))
+                    else:
+                        inferred = values.infer_objects()
+                        if inferred.dtype == object:
+                            buffers[col].append((True, _encode_labels(inferred, labels[col])))
+                        else:
+                            buffers[col].append((False, inferred.to_numpy()))
+                n_rows += len(chunk)
+                del chunk
+
+            columns = {}
+            for col, kind in schema.items():
+                parts = buffers.pop(col)
+                if not parts:
+                    columns[col] = np.array([], dtype="float64" if kind == "float" else object)
+                    continue
+                columns[col] = _build_column(parts, labels.pop(col), col in categorical_columns)
+                del parts
+            df = pd.DataFrame(columns, copy=False)
+            del columns
+
+        elapsed = time.perf_counter() - start
+        rows_per_s = n_rows / elapsed if elapsed > 0 else float("inf")
+        peak = f", pico de memoria {memory['peak_mb']:,.1f} MB" if memory["peak_mb"] is not None else ""
+        logger.info(f"Archivo {file_path.name} cargado en streaming: {n_rows} filas, {rows_per_s:,.0f} filas/s{peak}.")
+        return df
+    except Exception as e:
+        logger.error(f"Error al cargar {file_path.name} en streaming: {e}")
+        return pd.DataFrame()
+
+
+def read_dataset_file(file_path: Path, dataset: str) -> pd.DataFrame:
+    """
+    Lee un JSON de un dataset (completo o delta) con el lector configurado.
+
+    :param file_path: Ruta al archivo JSON.
+    :param dataset: Nombre del dataset ("payments" o "pledges").
+    :return: DataFrame crudo.
+    """
+    if STREAMING_INGEST:
+        return stream_json_to_dataframe(file_path, SCHEMAS[dataset],
+                                        categorical_columns=tuple(CATEGORICAL_COLUMNS.get(dataset, [])))
+    return load_json_to_dataframe(file_path)
+
+
+@traced
 def read_data() -> dict:
     """Lee los archivos JSON y devuelve un diccionario con los DataFrames."""
     data_dir = Path(__file__).parent.parent.parent / 'data'
@@ -29,7 +242,7 @@ def read_data() -> dict:
         "pledges": data_dir / "one-for-the-world-pledges.json"
     }
 
-    dataframes = {key: load_json_to_dataframe(path) for key, path in files.items()}
+    dataframes = {key: read_dataset_file(path, key) for key, path in files.items()}
     return dataframes
 
 
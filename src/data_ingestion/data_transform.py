@@ -1,95 +1,213 @@
 import os
 from pathlib import Path
 import pandas as pd
-from src.data_ingestion.data_read import read_data
-from currency_converter import CurrencyConverter
+from src.data_ingestion.data_read import parse_dates, read_data
+from src.data_ingestion.fx_rates import FxRateMatrix
+from src.data_ingestion.schema import CATEGORICAL_COLUMNS, UNKNOWN_CATEGORY
 from log_config import get_logger
-from src.utils.cache import cache
+from src.utils.instrumentation import instrumented
 from src.utils.filtering import filter_dataframe
-from datetime import date
+from src.utils.financial import classify_donation_types
 
 logger = get_logger(__name__)
 
-# Inicializar el conversor de divisas
+# Inicializar el conversor de divisas (matriz de tasas cargada una sola vez)
 data_dir = Path(__file__).parent.parent.parent / 'data'
 exchange_rate_path = os.path.join(data_dir, 'eurofxref-hist.csv')
-currency_converter = CurrencyConverter(exchange_rate_path,
-                                       fallback_on_missing_rate=True,
-                                       fallback_on_missing_rate_method='last_known',
-                                       fallback_on_wrong_date=True)
+fx_rates = FxRateMatrix.from_csv(exchange_rate_path)
 
 def normalize_dates(df: pd.DataFrame, date_columns: list) -> pd.DataFrame:
-    """Convierte columnas de fecha al formato datetime."""
+    """Convierte columnas de fecha al formato datetime usando un formato explícito."""
     for col in date_columns:
         if col in df.columns:
-            df[col] = pd.to_datetime(df[col], errors='coerce')
+            df[col] = parse_dates(df[col], col)
             logger.info(f"Columna {col} convertida a formato datetime.")
     return df
 
 
 def convert_currency(df: pd.DataFrame, amount_col: str, currency_col: str, date_col: str, generated_col_name: str) -> pd.DataFrame:
-    """Convierte montos a USD usando el CurrencyConverterUtil."""
+    """Convierte montos a USD en una sola pasada vectorizada sobre la matriz de tasas."""
     if amount_col in df.columns and currency_col in df.columns:
         try:
-            df[generated_col_name] = df.apply(
-                lambda row: currency_converter.convert(row[amount_col],
-                                                       row[currency_col],
-                                                       "USD",
-                                                       date=row[date_col]) if pd.notna(row[amount_col]) and pd.notna(row[currency_col]) and (date(1999,1,4) <= row[date_col].date()) else None,
-                axis=1
-            )
+            df[generated_col_name] = fx_rates.convert(df[amount_col], df[currency_col], df[date_col], "USD")
             logger.info(f"Montos convertidos a USD en columna {generated_col_name}.")
         except Exception as e:
             logger.error(f'Problema transformando {amount_col}  a USD: {e}')
-            logger.info(f"Los límites de fechas de conversión son: {currency_converter.bounds['USD']}")
+            logger.info(f"Los límites de fechas de conversión son: {fx_rates.bounds['USD']}")
     return df
 
+def _unify_missing(values: pd.Series) -> pd.Series:
+    """Pasa las cadenas vacías (""), "n/a" y los nulos a 'Unknown', también en columnas categóricas."""
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        # Sin pasar por objeto: se quitan las categorías vacías (sus valores quedan nulos)
+        values = values.cat.remove_categories([c for c in ("", "n/a") if c in values.cat.categories])
+        if UNKNOWN_CATEGORY not in values.cat.categories:
+            values = values.cat.add_categories([UNKNOWN_CATEGORY])
+        return values.fillna(UNKNOWN_CATEGORY)
+    return values.replace({"": None, "n/a": None}).fillna(UNKNOWN_CATEGORY)
+
+
 def normalize_na(df, df_name):
     # --- Unificar notación de NaN, valores vacíos, etc. ---
     if df_name == "pledges":
-        # Reemplaza cadenas vacías ("") o "n/a" por None, para luego unificarlas
-        df.replace({"donor_chapter": {"": None, "n/a": None},
-                    "chapter_type": {"": None, "n/a": None}}, inplace=True)
-
-        # Ahora sí, lo que sea None pasará a "Unknown"
-        df["donor_chapter"] = df["donor_chapter"].fillna("Unknown")
-        df["chapter_type"] = df["chapter_type"].fillna("Unknown")
+        # Cadenas vacías, "n/a" y None pasan a "Unknown"
+        df["donor_chapter"] = _unify_missing(df["donor_chapter"])
+        df["chapter_type"] = _unify_missing(df["chapter_type"])
 
     elif df_name == "payments":
         # Igualmente para 'portfolio' y 'payment_platform', si aplica
-        df.replace({"portfolio": {"": None, "n/a": None},
-                    "payment_platform": {"": None, "n/a": None}}, inplace=True)
-
-        df["portfolio"] = df["portfolio"].fillna("Unknown")
-        df["payment_platform"] = df["payment_platform"].fillna("Unknown")
+        df["portfolio"] = _unify_missing(df["portfolio"])
+        df["payment_platform"] = _unify_missing(df["payment_platform"])
 
     logger.info(f"Notación NaN unificada para dataset {df_name}.")
     return df
 
 
-@cache.memoize(timeout=300)
+def optimize_dtypes(df: pd.DataFrame, df_name: str) -> pd.DataFrame:
+    """
+    Compacta los tipos de un DataFrame limpio:
+     - Columnas de baja cardinalidad -> `category` (con la categoría 'Unknown' disponible).
+     - Columnas enteras -> el entero más pequeño que las contenga.
+    Los montos se mantienen en float64 para no alterar las sumas.
+
+    :param df: DataFrame limpio.
+    :param df_name: Nombre del dataset ("payments" o "pledges").
+    :return: DataFrame con tipos compactos.
+    """
+    for col in CATEGORICAL_COLUMNS.get(df_name, []):
+        if col in df.columns:
+            if isinstance(df[col].dtype, pd.CategoricalDtype):
+                # Ya categórica (lector en streaming): mismas categorías que `astype` sobre el texto
+                values = df[col].cat.remove_unused_categories()
+                df[col] = values.cat.reorder_categories(sorted(values.cat.categories))
+            else:
+                df[col] = df[col].astype("category")
+            if UNKNOWN_CATEGORY not in df[col].cat.categories:
+                df[col] = df[col].cat.add_categories([UNKNOWN_CATEGORY])
+
+    for col in df.select_dtypes(include="integer").columns:
+        df[col] = pd.to_numeric(df[col], downcast="integer")
+
+    logger.info(f"Tipos compactados para dataset {df_name}.")
+    return df
+
+
+# Atributos de pledges que se materializan en cada pago
+PLEDGE_ATTRIBUTES = ["frequency", "donor_chapter", "chapter_type"]
+
+
+def enrich_payments(payments_df: pd.DataFrame, pledges_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Agrega a cada pago los atributos de su pledge (frequency, donation_type, donor_chapter, chapter_type)
+    con un lookup indexado por pledge_id, para que las métricas no tengan que hacer merge por request.
+
+    Registra contadores de validación en `payments_df.attrs["join_stats"]`.
+
+    :param payments_df: DataFrame de pagos limpio.
+    :param pledges_df: DataFrame de pledges limpio.
+    :return: DataFrame de pagos enriquecido.
+    """
+    if payments_df.empty or "pledge_id" not in payments_df.columns or "pledge_id" not in pledges_df.columns:
+        logger.warning("No se puede enriquecer payments: faltan datos o la columna pledge_id.")
+        return payments_df
+
+    # Un pledge_id duplicado multiplicaría pagos en un merge; se usa la primera ocurrencia
+    duplicated = pledges_df["pledge_id"].duplicated()
+    lookup = pledges_df[~duplicated]
+    indexer = pd.Index(lookup["pledge_id"]).get_indexer(payments_df["pledge_id"])
+
+    attributes = {
+        col: pd.Series(lookup[col].array.take(indexer, allow_fill=True), index=payments_df.index).fillna("Unknown")
+        for col in PLEDGE_ATTRIBUTES if col in lookup.columns
+    }
+    payments_df = payments_df.assign(**attributes)
+    payments_df = payments_df.assign(
+        donation_type=classify_donation_types(payments_df["frequency"]).astype("category")
+    )
+
+    missing_pledge_id = payments_df["pledge_id"].isna()
+    orphans = (indexer == -1) & ~missing_pledge_id.to_numpy()
+    join_stats = {
+        "payments": len(payments_df),
+        "matched_payments": int((indexer != -1).sum()),
+        "missing_pledge_id": int(missing_pledge_id.sum()),
+        "orphan_payments": int(orphans.sum()),
+        "orphan_pledge_ids": int(payments_df.loc[orphans, "pledge_id"].nunique()),
+        "duplicate_pledge_ids": int(duplicated.sum()),
+    }
+    payments_df.attrs["join_stats"] = join_stats
+
+    if join_stats["orphan_payments"] or join_stats["duplicate_pledge_ids"]:
+        logger.warning(f"Validación del join payments⇄pledges: {join_stats}")
+    else:
+        logger.info(f"Join payments⇄pledges materializado: {join_stats}")
+    return payments_df
+
+
+# Columnas de fecha en cada dataset
+DATE_COLUMNS = {
+    "pledges": ["pledge_created_at", "pledge_starts_at", "pledge_ended_at"],
+    "payments": ["date"]
+}
+
+
+def clean_frame(df: pd.DataFrame, name: str) -> pd.DataFrame:
+    """
+    Aplica las transformaciones de un dataset (fechas, USD, NaN y tipos compactos).
+
+    :param df: DataFrame crudo.
+    :param name: Nombre del dataset ("payments" o "pledges").
+    :return: DataFrame limpio.
+    """
+    # Los pasos escriben columnas: se trabaja sobre una copia (perezosa con Copy-on-Write)
+    df = df.copy()
+    df = normalize_dates(df, DATE_COLUMNS.get(name, []))
+    df = convert_currency(df, "amount", "currency", "date", "amount_usd")
+    df = convert_currency(df, "contribution_amount", "currency", "pledge_starts_at", "contribution_amount_usd")
+    df = normalize_na(df, name)
+    df = optimize_dtypes(df, name)
+    logger.info(f"Datos limpiados y transformados para {name}.")
+    return df
+
+
+def append_frames(base: pd.DataFrame, delta: pd.DataFrame) -> pd.DataFrame:
+    """
+    Agrega filas nuevas a un DataFrame limpio conservando las columnas categóricas
+    (une las categorías en vez de degradar la columna a objeto).
+
+    :param base: DataFrame limpio existente.
+    :param delta: DataFrame limpio con las filas nuevas.
+    :return: DataFrame concatenado con índice nuevo.
+    """
+    if delta.empty:
+        return base
+    if base.empty:
+        return delta.reset_index(drop=True)
+
+    base, delta = base.copy(), delta.copy()
+    for col in base.columns.intersection(delta.columns):
+        if isinstance(base[col].dtype, pd.CategoricalDtype) and isinstance(delta[col].dtype, pd.CategoricalDtype):
+            categories = base[col].cat.categories.union(delta[col].cat.categories)
+            base[col] = base[col].cat.set_categories(categories)
+            delta[col] = delta[col].cat.set_categories(categories)
+
+    return pd.concat([base, delta], ignore_index=True)
+
+
+@instrumented
 def clean_data(dfs: dict) -> dict:
     """Aplica transformaciones a los DataFrames."""
     if not dfs:
         logger.error("No hay datos para procesar.")
         return {}
 
-    # Columnas de fecha en cada dataset
-    date_columns = {
-        "pledges": ["pledge_created_at", "pledge_starts_at", "pledge_ended_at"],
-        "payments": ["date"]
-    }
+    # Procesar cada DataFrame (sin modificar el diccionario recibido)
+    cleaned = {name: clean_frame(df, name) for name, df in dfs.items()}
 
-    # Procesar cada DataFrame
-    for name, df in dfs.items():
-        df = normalize_dates(df, date_columns.get(name, []))
-        df = convert_currency(df, "amount", "currency", "date", "amount_usd")
-        df = convert_currency(df, "contribution_amount", "currency", "pledge_starts_at", "contribution_amount_usd")
-        df = normalize_na(df, name)
-        dfs[name] = df
-        logger.info(f"Datos limpiados y transformados para {name}.")
+    if "payments" in cleaned and "pledges" in cleaned:
+        cleaned["payments"] = enrich_payments(cleaned["payments"], cleaned["pledges"])
 
-    return dfs
+    return cleaned
 
 
 if __name__ == "__main__":
@@ -0,0 +1,184 @@
+"""
+Gestor de versiones de datos con recarga en caliente.
+
+Cada proceso mantiene dos buffers: la versión activa, con la que se responden los callbacks, y la
+anterior, que se conserva para las requests que todavía la estén usando. Un hilo vigía recalcula
+periódicamente la huella de los insumos (`compute_fingerprint`, que solo vuelve a hashear un archivo
+si cambió su mtime o tamaño); cuando cambia, la versión nueva se construye en segundo plano y se
+publica con una única asignación. Los datos que no cambian nunca se recalculan y ninguna request
+espera una reconstrucción, salvo la primera carga del proceso.
+"""
+
+import os
+import threading
+import time
+from dataclasses import dataclass
+from log_config import get_logger
+from src.utils.read_only import freeze_frames
+from src.utils.tracing import trace
+
+logger = get_logger(__name__)
+
+# Segundos entre revisiones de los archivos de data/ (0 desactiva el vigía)
+DATA_WATCH_INTERVAL = float(os.getenv("OFTW_DATA_WATCH_INTERVAL", "30"))
+
+
+@dataclass(frozen=True)
+class DataVersion:
+    """Una versión inmutable de los datos limpios (DataFrames de solo lectura, ver `read_only`)."""
+    fingerprint: str
+    dfs: dict
+    loaded_at: float
+
+
+class DataVersionManager:
+    """Publica versiones de datos con doble buffer y las reconstruye en segundo plano."""
+
+    def __init__(self, loader, fingerprinter, interval: float = DATA_WATCH_INTERVAL):
+        """
+        :param loader: Función huella -> diccionario de DataFrames limpios.
+        :param fingerprinter: Función sin argumentos que retorna la huella vigente de los insumos.
+        :param interval: Segundos entre revisiones del vigía (0 lo desactiva).
+        """
+        self._loader = loader
+        self._fingerprinter = fingerprinter
+        self.interval = interval
+        # (activa, anterior); se reemplaza completa para que la publicación sea atómica
+        self._buffers = (None, None)
+        self._lock = threading.Lock()
+        self._building = None
+        self._warmups = []
+        self._watcher_pid = None
+
+    def add_warmup(self, warmup) -> None:
+        """
+        Registra una función que prepara derivados en memoria (índices, etc.) de una versión
+        antes de publicarla.
+
+        :param warmup: Función que recibe un `DataVersion`.
+        """
+        self._warmups.append(warmup)
+
+    def load(self) -> DataVersion:
+        """
+        Carga la versión vigente si todavía no hay una activa, sin arrancar el vigía
+        (p.ej. en el proceso maestro de gunicorn antes del fork).
+
+        :return: `DataVersion` activa.
+        """
+        version = self._buffers[0]
+        if version is None:
+            with self._lock:
+                if self._buffers[0] is None:
+                    self._publish(self._build(self._fingerprinter()))
+            version = self._buffers[0]
+        return version
+
+    def current(self) -> DataVersion:
+        """
+        Versión activa. Solo la primera llamada del proceso bloquea mientras se carga.
+
+        :return: `DataVersion` activa.
+        """
+        version = self.load()
+        self._ensure_watcher()
+        return version
+
+    def get(self, fingerprint: str):
+        """
+        Busca una versión en los buffers (activa o anterior).
+
+        :param fingerprint: Huella de la versión.
+        :return: `DataVersion` o None si ya no está en memoria.
+        """
+        for version in self._buffers:
+            if version is not None and version.fingerprint == fingerprint:
+                return version
+        return None
+
+    def publish(self, fingerprint: str, dfs: dict) -> DataVersion:
+        """
+        Publica como activa una versión construida fuera de los insumos de data/ (p.ej. los datos
+        sintéticos del benchmark). Con el vigía activo, se reemplaza en la siguiente revisión.
+
+        :param fingerprint: Huella con la que se identifica la versión.
+        :param dfs: Diccionario de DataFrames limpios.
+        :return: `DataVersion` publicada.
+        """
+        with self._lock:
+            version = self._build(fingerprint, dfs)
+            self._publish(version)
+        return version
+
+    def check_for_updates(self, wait: bool = False) -> bool:
+        """
+        Compara la huella de los insumos con la versión activa y, si cambió, lanza la
+        construcción de la nueva versión en segundo plano.
+
+        :param wait: Si es True, espera a que la nueva versión quede publicada.
+        :return: True si se lanzó una reconstrucción.
+        """
+        fingerprint = self._fingerprinter()
+        active = self._buffers[0]
+        if active is not None and active.fingerprint == fingerprint:
+            return False
+
+        with self._lock:
+            if self._building is not None:
+                return False
+            self._building = fingerprint
+
+        logger.info(f"Insumos modificados: construyendo la versión {fingerprint} en segundo plano.")
+        builder = threading.Thread(target=self._build_and_publish, args=(fingerprint,),
+                                   name=f"data-version-{fingerprint}", daemon=True)
+        builder.start()
+        if wait:
+            builder.join()
+        return True
+
+    def _build(self, fingerprint: str, dfs: dict = None) -> DataVersion:
+        start = time.perf_counter()
+        with trace("data_version.build", fingerprint=fingerprint):
+            dfs = self._loader(fingerprint) if dfs is None else dfs
+            # Se comparte entre los hilos del worker: se publica de solo lectura
+            version = DataVersion(fingerprint, freeze_frames(dfs), time.time())
+            for warmup in self._warmups:
+                try:
+                    warmup(version)
+                except Exception as e:
+                    logger.error(f"Error preparando la versión {fingerprint}: {e}")
+        logger.info(f"Versión de datos {fingerprint} lista en {time.perf_counter() - start:.2f}s.")
+        return version
+
+    def _build_and_publish(self, fingerprint: str) -> None:
+        try:
+            self._publish(self._build(fingerprint))
+        except Exception as e:
+            logger.error(f"No se pudo construir la versión {fingerprint}; se mantiene la activa: {e}")
+        finally:
+            self._building = None
+
+    def _publish(self, version: DataVersion) -> None:
+        active = self._buffers[0]
+        if active is not None and active.fingerprint == version.fingerprint:
+            return
+        self._buffers = (version, active)
+        logger.info(f"Versión de datos activa: {version.fingerprint}.")
+
+    def _ensure_watcher(self) -> None:
+        # Los hilos no sobreviven a un fork: cada worker de gunicorn arranca su propio vigía
+        if self.interval <= 0 or self._watcher_pid == os.getpid():
+            return
+        with self._lock:
+            if self._watcher_pid == os.getpid():
+                return
+            self._watcher_pid = os.getpid()
+        threading.Thread(target=self._watch, name="data-version-watcher", daemon=True).start()
+
+    def _watch(self) -> None:
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.check_for_updates()
+            except Exception as e:
+                logger.error(f"Error revisando los insumos de datos: {e}")
@@ -0,0 +1,73 @@
+"""
+Reporte antes/después del esquema compacto de tipos (memoria y latencia de métricas).
+
+Uso:
+    python -m src.data_ingestion.dtype_report
+"""
+
+import time
+import pandas as pd
+from src.data_ingestion.data_read import read_data
+from src.data_ingestion.data_transform import clean_data
+from src.metrics_calculations.money_metrics import (
+    calculate_money_moved, calculate_counterfactual_money_moved, calculate_money_moved_by_platform,
+    calculate_money_moved_by_donation_type, calculate_money_moved_by_source
+)
+from src.metrics_calculations.performance_metrics import (
+    calculate_all_pledges, calculate_future_pledges, calculate_breakdown_by_channel
+)
+from src.utils.financial import calculate_arr, calculate_active_arr, calculate_pledge_attrition_rate
+
+
+def expand_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    """Revierte las columnas categóricas a strings de Python (esquema anterior)."""
+    categorical = df.select_dtypes(include="category").columns
+    return df.astype({col: object for col in categorical})
+
+
+def memory_mb(df: pd.DataFrame) -> float:
+    """Memoria total del DataFrame en MB, incluyendo el contenido de los objetos."""
+    return df.memory_usage(deep=True).sum() / (1024 * 1024)
+
+
+def time_metrics(payments_df: pd.DataFrame, pledges_df: pd.DataFrame, repeat: int = 5) -> dict:
+    """
+    Mide la latencia media (ms) de las métricas que dependen de columnas categóricas.
+    """
+    metrics = {
+        "calculate_money_moved": lambda: calculate_money_moved(payments_df),
+        "calculate_counterfactual_money_moved": lambda: calculate_counterfactual_money_moved(payments_df),
+        "calculate_money_moved_by_platform": lambda: calculate_money_moved_by_platform(payments_df),
+        "calculate_money_moved_by_donation_type": lambda: calculate_money_moved_by_donation_type(payments_df, pledges_df),
+        "calculate_money_moved_by_source": lambda: calculate_money_moved_by_source(payments_df, pledges_df),
+        "calculate_all_pledges": lambda: calculate_all_pledges(pledges_df),
+        "calculate_future_pledges": lambda: calculate_future_pledges(pledges_df),
+        "calculate_breakdown_by_channel": lambda: calculate_breakdown_by_channel(pledges_df),
+        "calculate_arr": lambda: calculate_arr(pledges_df.copy(), ["Active donor", "Pledged donor"]),
+        "calculate_active_arr": lambda: calculate_active_arr(pledges_df),
+        "calculate_pledge_attrition_rate": lambda: calculate_pledge_attrition_rate(pledges_df),
+    }
+
+    timings = {}
+    for name, fn in metrics.items():
+        start = time.perf_counter()
+        for _ in range(repeat):
+            fn()
+        timings[name] = (time.perf_counter() - start) / repeat * 1000
+    return timings
+
+
+if __name__ == "__main__":
+    compact = clean_data(read_data())
+    expanded = {name: expand_dtypes(df) for name, df in compact.items()}
+
+    print("\n--- memory_usage(deep=True) ---")
+    for name in compact:
+        before, after = memory_mb(expanded[name]), memory_mb(compact[name])
+        print(f"{name:10s} antes: {before:8.2f} MB  después: {after:8.2f} MB  ({after / before:.0%})")
+
+    print("\n--- Latencia de métricas (ms) ---")
+    before = time_metrics(expanded["payments"], expanded["pledges"])
+    after = time_metrics(compact["payments"], compact["pledges"])
+    for name in before:
+        print(f"{name:40s} antes: {before[name]:8.2f}  después: {after[name]:8.2f}  (x{before[name] / after[name]:.1f})")
@@ -0,0 +1,110 @@
+"""
+Motor vectorizado de conversión de divisas basado en el histórico del BCE (eurofxref-hist.csv).
+
+Reproduce la semántica de ``CurrencyConverter`` con ``fallback_on_missing_rate_method='last_known'``
+y ``fallback_on_wrong_date=True``, pero convierte columnas completas en una sola pasada de NumPy.
+"""
+
+from datetime import date
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from log_config import get_logger
+
+logger = get_logger(__name__)
+
+REF_CURRENCY = "EUR"
+
+# Límite inferior histórico de las conversiones (primer día del euro)
+MIN_CONVERSION_DATE = pd.Timestamp(date(1999, 1, 4))
+
+
+class FxRateMatrix:
+    """
+    Matriz densa fecha × divisa con las tasas EUR→divisa de cada día calendario.
+
+    - Los días sin tasa (fines de semana, feriados, N/A) toman la última tasa conocida.
+    - Las fechas fuera del rango de una divisa se acotan a su primera/última tasa conocida.
+    """
+
+    def __init__(self, rates: pd.DataFrame):
+        """
+        :param rates: DataFrame indexado por fecha con una columna por divisa (tasas por 1 EUR).
+        """
+        rates = rates.sort_index()
+        rates[REF_CURRENCY] = 1.0
+
+        # Límites por divisa (primer y último día con tasa conocida)
+        self.bounds = {
+            cur: (col.first_valid_index(), col.last_valid_index())
+            for cur, col in rates.items() if col.notna().any()
+        }
+        rates = rates[list(self.bounds)]
+
+        # Rejilla diaria: ffill = 'last_known'; bfill = acotar antes de la primera tasa conocida
+        self.origin = rates.index.min()
+        daily_index = pd.date_range(self.origin, rates.index.max(), freq="D")
+        dense = rates.reindex(daily_index).ffill().bfill()
+
+        self.currencies = {cur: i for i, cur in enumerate(dense.columns)}
+        self.matrix = dense.to_numpy(dtype="float64")
+        logger.info(f"Matriz de tasas construida: {self.matrix.shape[0]} días × {self.matrix.shape[1]} divisas.")
+
+    @classmethod
+    def from_csv(cls, path) -> "FxRateMatrix":
+        """
+        Carga el CSV histórico del BCE una sola vez.
+
+        :param path: Ruta a eurofxref-hist.csv.
+        :return: Instancia de FxRateMatrix.
+        """
+        rates = pd.read_csv(Path(path), na_values=["N/A"], parse_dates=["Date"], index_col="Date")
+        rates = rates.loc[:, ~rates.columns.str.startswith("Unnamed")].astype("float64")
+        return cls(rates)
+
+    def _rates_for(self, currencies: np.ndarray, day_idx: np.ndarray) -> np.ndarray:
+        """Obtiene la tasa de cada fila; NaN si la divisa no existe en la matriz."""
+        cur_idx = np.array([self.currencies.get(c, -1) for c in currencies], dtype="int64")
+        out = np.full(len(day_idx), np.nan)
+        known = cur_idx >= 0
+        out[known] = self.matrix[day_idx[known], cur_idx[known]]
+        return out
+
+    def convert(self, amounts: pd.Series, currencies: pd.Series, dates: pd.Series,
+                new_currency: str = "USD") -> pd.Series:
+        """
+        Convierte una columna de montos a ``new_currency`` en una sola pasada.
+
+        Las filas con monto/divisa nulos, fecha nula o anterior al 1999-01-04 quedan en NaN.
+
+        :param amounts: Serie de montos.
+        :param currencies: Serie de códigos de divisa.
+        :param dates: Serie de fechas (datetime64).
+        :param new_currency: Divisa de destino.
+        :return: Serie float64 con los montos convertidos.
+        """
+        amounts = pd.to_numeric(amounts, errors="coerce").to_numpy(dtype="float64")
+        currencies = currencies.to_numpy(dtype=object)
+        days = pd.to_datetime(dates, errors="coerce").dt.normalize()
+
+        valid = (
+            ~np.isnan(amounts)
+            & pd.notna(currencies)
+            & days.notna().to_numpy()
+            & (days >= MIN_CONVERSION_DATE).to_numpy()
+        )
+
+        result = np.full(len(amounts), np.nan)
+        if valid.any():
+            day_idx = (days[valid] - self.origin).dt.days.to_numpy()
+            day_idx = np.clip(day_idx, 0, self.matrix.shape[0] - 1)
+
+            r0 = self._rates_for(currencies[valid], day_idx)
+            r1 = self._rates_for(np.full(len(day_idx), new_currency, dtype=object), day_idx)
+            result[valid] = amounts[valid] / r0 * r1
+
+            unknown = set(currencies[valid][np.isnan(r0)])
+            if unknown:
+                logger.warning(f"Divisas sin tasas en el histórico: {unknown}")
+
+        return pd.Series(result, index=dates.index)
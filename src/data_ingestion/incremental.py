@@ -0,0 +1,174 @@
+"""
+Ingesta incremental de pagos y pledges.
+
+Los archivos delta de `data/deltas/` se leen, convierten y limpian por separado y se agregan al
+almacén limpio de la versión anterior; el cubo de Money Moved se actualiza sumando solo las celdas
+del delta. El costo de un refresco diario es proporcional al delta y no al histórico.
+
+Marcas de agua: por dataset se guarda la fecha máxima ya ingerida (`date` en payments,
+`pledge_created_at` en pledges). Las filas posteriores a la marca se agregan directamente; las
+anteriores o sin fecha solo se agregan si su id no está en el almacén (llegadas tardías), de modo
+que reaplicar un delta no duplica filas.
+
+Uso:
+    python -m src.data_ingestion.incremental
+"""
+
+import time
+import pandas as pd
+from log_config import get_logger
+from src.data_ingestion.data_read import read_dataset_file
+from src.data_ingestion.data_transform import clean_frame, append_frames, enrich_payments
+from src.data_ingestion.snapshot import DELTA_DIR
+from src.metrics_calculations.money_cube import fold_money_cube
+
+logger = get_logger(__name__)
+
+# Columna de marca de agua y clave única de cada dataset
+WATERMARK_COLUMNS = {
+    "payments": ("date", "id"),
+    "pledges": ("pledge_created_at", "pledge_id"),
+}
+
+
+def compute_watermarks(dfs: dict) -> dict:
+    """
+    Calcula las marcas de agua del almacén limpio.
+
+    :param dfs: Diccionario con los DataFrames limpios.
+    :return: Diccionario {dataset: {"column", "max", "rows"}} serializable a JSON.
+    """
+    watermarks = {}
+    for name, (date_col, _) in WATERMARK_COLUMNS.items():
+        df = dfs.get(name)
+        if df is None or date_col not in df.columns:
+            continue
+        max_date = df[date_col].max()
+        watermarks[name] = {
+            "column": date_col,
+            "max": None if pd.isna(max_date) else max_date.isoformat(),
+            "rows": len(df),
+        }
+    return watermarks
+
+
+def select_new_rows(store: pd.DataFrame, delta: pd.DataFrame, name: str) -> pd.DataFrame:
+    """
+    Filtra las filas del delta que todavía no están en el almacén, usando la marca de agua.
+
+    :param store: DataFrame limpio vigente.
+    :param delta: DataFrame limpio del delta.
+    :param name: Nombre del dataset.
+    :return: Filas nuevas del delta.
+    """
+    date_col, key_col = WATERMARK_COLUMNS[name]
+    watermark = store[date_col].max() if not store.empty else pd.NaT
+    if pd.isna(watermark):
+        after_watermark = pd.Series(True, index=delta.index)
+    else:
+        after_watermark = delta[date_col] > watermark
+
+    # Llegadas tardías: se comparan por clave solo las filas que no superan la marca de agua
+    late = delta[~after_watermark]
+    if not late.empty:
+        known = late[key_col].isin(store[key_col]) | late[key_col].duplicated()
+        if known.any():
+            logger.info(f"Delta de {name}: {int(known.sum())} filas ya ingeridas se descartan.")
+        keep = after_watermark.copy()
+        keep[late.index] = ~known
+    else:
+        keep = after_watermark
+
+    new_rows = delta[keep]
+    if new_rows[key_col].duplicated().any():
+        logger.warning(f"Delta de {name} con claves {key_col} repetidas.")
+    return new_rows
+
+
+def apply_pledges_delta(dfs: dict, delta: pd.DataFrame, cube: pd.DataFrame = None):
+    """
+    Agrega pledges nuevos y re-enriquece los pagos huérfanos que ahora tienen su pledge.
+
+    :param dfs: Diccionario con los DataFrames limpios.
+    :param delta: Pledges nuevos ya limpios.
+    :param cube: Cubo de Money Moved vigente (opcional).
+    :return: Tupla (dfs, cube) actualizados.
+    """
+    dfs = {**dfs, "pledges": append_frames(dfs["pledges"], delta)}
+
+    payments_df = dfs["payments"]
+    adopted = payments_df["pledge_id"].isin(delta["pledge_id"])
+    if adopted.any():
+        previous = payments_df[adopted]
+        updated = enrich_payments(previous, dfs["pledges"])
+        dfs["payments"] = append_frames(payments_df[~adopted], updated)
+        if cube is not None:
+            cube = fold_money_cube(cube, added=updated, removed=previous)
+        logger.info(f"{len(updated)} pagos huérfanos enlazados con pledges nuevos.")
+    return dfs, cube
+
+
+def apply_payments_delta(dfs: dict, delta: pd.DataFrame, cube: pd.DataFrame = None):
+    """
+    Enriquece los pagos nuevos contra todos los pledges y los agrega al almacén y al cubo.
+
+    :param dfs: Diccionario con los DataFrames limpios.
+    :param delta: Pagos nuevos ya limpios.
+    :param cube: Cubo de Money Moved vigente (opcional).
+    :return: Tupla (dfs, cube) actualizados.
+    """
+    delta = enrich_payments(delta, dfs["pledges"])
+    dfs = {**dfs, "payments": append_frames(dfs["payments"], delta)}
+    if cube is not None:
+        cube = fold_money_cube(cube, added=delta)
+    return dfs, cube
+
+
+def apply_deltas(dfs: dict, deltas: list, cube: pd.DataFrame = None):
+    """
+    Aplica en orden los deltas pendientes sobre el almacén limpio (no modifica `dfs`).
+
+    :param dfs: Diccionario con los DataFrames limpios de la versión anterior.
+    :param deltas: Deltas pendientes (ver `snapshot.list_delta_files`).
+    :param cube: Cubo de Money Moved de la versión anterior, o None para construirlo después.
+    :return: Tupla (dfs, cube) de la nueva versión.
+    """
+    for delta_info in deltas:
+        name = delta_info["dataset"]
+        start = time.perf_counter()
+
+        raw = read_dataset_file(DELTA_DIR / delta_info["file"], name)
+        if raw.empty:
+            logger.info(f"Delta {delta_info['file']} vacío.")
+            continue
+        new_rows = select_new_rows(dfs[name], clean_frame(raw, name), name)
+        if new_rows.empty:
+            logger.info(f"Delta {delta_info['file']} sin filas nuevas.")
+            continue
+
+        if name == "pledges":
+            dfs, cube = apply_pledges_delta(dfs, new_rows, cube)
+        else:
+            dfs, cube = apply_payments_delta(dfs, new_rows.copy(), cube)
+
+        logger.info(f"Delta {delta_info['file']} aplicado: {len(new_rows)}/{len(raw)} filas nuevas "
+                    f"en {time.perf_counter() - start:.2f}s.")
+    return dfs, cube
+
+
+if __name__ == "__main__":
+    from src.data_ingestion.snapshot import compute_fingerprint, list_delta_files, load_manifest
+
+    deltas = list_delta_files()
+    print(f"Deltas en {DELTA_DIR}:")
+    for delta in deltas:
+        print(f"  {delta['dataset']:<9} {delta['file']}")
+
+    fingerprint = compute_fingerprint()
+    manifest = load_manifest(fingerprint)
+    if manifest is None:
+        print(f"La versión {fingerprint} todavía no tiene snapshot.")
+    else:
+        print(f"Versión {fingerprint}: {len(manifest['deltas'])} deltas aplicados, marcas de agua:")
+        for name, watermark in manifest["watermarks"].items():
+            print(f"  {name:<9} {watermark['column']} <= {watermark['max']} ({watermark['rows']} filas)")
@@ -0,0 +1,49 @@
+"""
+Esquema de columnas de los datasets de OFTW (ver data/metadata.md).
+"""
+
+# Tipos lógicos: "str" (texto / identificadores, se conservan tal cual), "float" (montos y factores),
+# "date" (fechas en texto; se parsean con `parse_dates`)
+PAYMENTS_SCHEMA = {
+    "id": "str",
+    "donor_id": "str",
+    "payment_platform": "str",
+    "portfolio": "str",
+    "amount": "float",
+    "currency": "str",
+    "date": "date",
+    "counterfactuality": "float",
+    "pledge_id": "str",
+}
+
+PLEDGES_SCHEMA = {
+    "donor_id": "str",
+    "pledge_id": "str",
+    "donor_chapter": "str",
+    "chapter_type": "str",
+    "pledge_status": "str",
+    "pledge_created_at": "date",
+    "pledge_starts_at": "date",
+    "pledge_ended_at": "date",
+    "contribution_amount": "float",
+    "currency": "str",
+    "frequency": "str",
+    "payment_platform": "str",
+}
+
+SCHEMAS = {
+    "payments": PAYMENTS_SCHEMA,
+    "pledges": PLEDGES_SCHEMA,
+}
+
+# Columnas de baja cardinalidad que se guardan como `category` tras la limpieza
+CATEGORICAL_COLUMNS = {
+    "payments": ["portfolio", "payment_platform", "currency"],
+    "pledges": ["pledge_status", "frequency", "chapter_type", "donor_chapter", "payment_platform", "currency"],
+}
+
+# Categoría de relleno disponible en todas las columnas categóricas (fillna / merges)
+UNKNOWN_CATEGORY = "Unknown"
+
+# Formato explícito de las columnas de fecha
+DATE_FORMAT = "ISO8601"
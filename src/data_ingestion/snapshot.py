@@ -0,0 +1,266 @@
+"""
+Snapshot columnar (Parquet) de los datos limpios, indexado por la huella de sus insumos.
+
+La huella combina el contenido de los JSON de pagos/pledges, el CSV de tasas y el código
+de transformación; si nada cambia, los workers cargan los DataFrames limpios sin recalcular.
+Los archivos delta de `data/deltas/` se suman a la huella; cada snapshot guarda un `manifest.json`
+con la huella base, los deltas ya aplicados y las marcas de agua, para que una versión nueva se
+construya a partir de la anterior aplicando solo los deltas pendientes (ver `incremental`).
+"""
+
+import hashlib
+import json
+import os
+import shutil
+from pathlib import Path
+import pandas as pd
+from log_config import get_logger
+
+logger = get_logger(__name__)
+
+ROOT_DIR = Path(__file__).parent.parent.parent
+DATA_DIR = ROOT_DIR / 'data'
+SNAPSHOT_DIR = ROOT_DIR / 'cache-dir' / 'snapshots'
+
+SOURCE_FILES = [
+    DATA_DIR / "one-for-the-world-payments.json",
+    DATA_DIR / "one-for-the-world-pledges.json",
+    DATA_DIR / "eurofxref-hist.csv",
+]
+
+# Código cuyo cambio invalida el snapshot: todo el camino de lectura, limpieza, enriquecimiento
+# y cubo (agregar aquí cualquier módulo nuevo que cambie los DataFrames guardados)
+TRANSFORM_FILES = [
+    Path(__file__).parent / "data_read.py",
+    Path(__file__).parent / "schema.py",
+    Path(__file__).parent / "data_transform.py",
+    Path(__file__).parent / "fx_rates.py",
+    Path(__file__).parent / "incremental.py",
+    ROOT_DIR / "src" / "utils" / "financial.py",
+    ROOT_DIR / "src" / "utils" / "filtering.py",
+    ROOT_DIR / "src" / "utils" / "filter_engine.py",
+    ROOT_DIR / "src" / "metrics_calculations" / "money_cube.py",
+]
+
+DATASETS = ("payments", "pledges")
+
+# Deltas diarios: one-for-the-world-payments-<sufijo>.json / one-for-the-world-pledges-<sufijo>.json
+DELTA_DIR = DATA_DIR / 'deltas'
+DELTA_PATTERNS = {name: f"one-for-the-world-{name}-*.json" for name in DATASETS}
+
+MANIFEST_FILE = "manifest.json"
+
+# DataFrames derivados que se guardan junto al snapshot
+MONEY_CUBE_FRAME = "money_cube"
+
+# Hash por archivo, reutilizado mientras (mtime, tamaño) no cambien
+_file_hashes = {}
+
+
+def _file_digest(path: Path) -> str:
+    """Calcula el sha256 de un archivo, reutilizando el último valor si no fue modificado."""
+    if not path.exists():
+        return "missing"
+
+    stat = path.stat()
+    key = (stat.st_mtime_ns, stat.st_size)
+    cached = _file_hashes.get(path)
+    if cached and cached[0] == key:
+        return cached[1]
+
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    _file_hashes[path] = (key, digest.hexdigest())
+    return digest.hexdigest()
+
+
+def list_delta_files() -> list:
+    """
+    Lista los archivos delta presentes, en orden de aplicación (nombre de archivo, pledges antes que
+    payments dentro del mismo sufijo para que los pagos nuevos encuentren su pledge).
+
+    :return: Lista de dicts {"dataset", "file", "sha256"}.
+    """
+    if not DELTA_DIR.is_dir():
+        return []
+
+    deltas = []
+    for name in DATASETS:
+        for path in DELTA_DIR.glob(DELTA_PATTERNS[name]):
+            suffix = path.name[len(f"one-for-the-world-{name}-"):]
+            deltas.append((suffix, name != "pledges", {"dataset": name, "file": path.name,
+                                                       "sha256": _file_digest(path)}))
+    return [delta for *_, delta in sorted(deltas, key=lambda d: (d[0], d[1]))]
+
+
+def compute_base_fingerprint() -> str:
+    """
+    Huella de los insumos completos (JSON base, tasas y código), sin contar los deltas.
+
+    :return: Hash hexadecimal (16 caracteres).
+    """
+    digest = hashlib.sha256()
+    for path in SOURCE_FILES + TRANSFORM_FILES:
+        digest.update(path.name.encode())
+        digest.update(_file_digest(path).encode())
+    return digest.hexdigest()[:16]
+
+
+def compute_fingerprint() -> str:
+    """
+    Huella de los insumos de `load_clean_data`: la huella base más los deltas presentes.
+    Sin deltas coincide con `compute_base_fingerprint`.
+
+    :return: Hash hexadecimal (16 caracteres) de datos y código de transformación.
+    """
+    base = compute_base_fingerprint()
+    deltas = list_delta_files()
+    if not deltas:
+        return base
+
+    digest = hashlib.sha256(base.encode())
+    for delta in deltas:
+        digest.update(delta["file"].encode())
+        digest.update(delta["sha256"].encode())
+    return digest.hexdigest()[:16]
+
+
+def load_manifest(fingerprint: str):
+    """
+    Lee el manifiesto de un snapshot.
+
+    :param fingerprint: Huella del snapshot.
+    :return: Diccionario con base, deltas aplicados y marcas de agua, o None si no existe.
+    """
+    path = SNAPSHOT_DIR / fingerprint / MANIFEST_FILE
+    if not path.exists():
+        return None
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Manifiesto ilegible en el snapshot {fingerprint}: {e}")
+        return None
+
+
+def find_parent_snapshot(base_fingerprint: str, deltas: list):
+    """
+    Busca el snapshot más avanzado de la misma huella base cuyos deltas aplicados son un prefijo
+    de los deltas actuales, es decir, del que se puede partir aplicando solo los restantes.
+
+    :param base_fingerprint: Huella base actual.
+    :param deltas: Deltas presentes (ver `list_delta_files`).
+    :return: Tupla (huella, manifiesto) o (None, None).
+    """
+    if not SNAPSHOT_DIR.is_dir():
+        return None, None
+
+    best, best_manifest = None, None
+    for snapshot_dir in SNAPSHOT_DIR.iterdir():
+        if snapshot_dir.name.startswith("."):
+            continue
+        manifest = load_manifest(snapshot_dir.name)
+        if not manifest or manifest.get("base") != base_fingerprint:
+            continue
+        applied = manifest.get("deltas", [])
+        if applied != deltas[:len(applied)]:
+            continue
+        if best_manifest is None or len(applied) > len(best_manifest["deltas"]):
+            best, best_manifest = snapshot_dir.name, manifest
+    return best, best_manifest
+
+
+def load_snapshot(fingerprint: str):
+    """
+    Carga los DataFrames limpios desde el snapshot de la huella indicada.
+
+    :param fingerprint: Huella calculada con `compute_fingerprint`.
+    :return: Diccionario de DataFrames o None si no existe snapshot válido.
+    """
+    snapshot_dir = SNAPSHOT_DIR / fingerprint
+    paths = {name: snapshot_dir / f"{name}.parquet" for name in DATASETS}
+    if not all(path.exists() for path in paths.values()):
+        return None
+
+    try:
+        dfs = {name: pd.read_parquet(path) for name, path in paths.items()}
+        logger.info(f"Snapshot {fingerprint} cargado desde {snapshot_dir}.")
+        return dfs
+    except Exception as e:
+        logger.error(f"Error al leer el snapshot {fingerprint}: {e}")
+        return None
+
+
+def load_snapshot_frame(fingerprint: str, name: str):
+    """
+    Carga un DataFrame derivado (p.ej. el cubo de Money Moved) guardado junto al snapshot.
+
+    :param fingerprint: Huella del snapshot.
+    :param name: Nombre del DataFrame.
+    :return: DataFrame o None si no existe.
+    """
+    path = SNAPSHOT_DIR / fingerprint / f"{name}.parquet"
+    if not path.exists():
+        return None
+    try:
+        return pd.read_parquet(path)
+    except Exception as e:
+        logger.error(f"Error al leer {name} del snapshot {fingerprint}: {e}")
+        return None
+
+
+def write_snapshot_frame(fingerprint: str, name: str, df: pd.DataFrame) -> None:
+    """
+    Guarda un DataFrame derivado en un snapshot ya publicado (archivo temporal + rename atómico).
+
+    :param fingerprint: Huella del snapshot.
+    :param name: Nombre del DataFrame.
+    :param df: DataFrame a guardar.
+    """
+    snapshot_dir = SNAPSHOT_DIR / fingerprint
+    if not snapshot_dir.is_dir():
+        return
+
+    tmp_path = snapshot_dir / f".{name}.{os.getpid()}.tmp"
+    try:
+        df.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, snapshot_dir / f"{name}.parquet")
+    except Exception as e:
+        logger.error(f"Error al escribir {name} en el snapshot {fingerprint}: {e}")
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+
+def write_snapshot(fingerprint: str, dfs: dict, manifest: dict = None) -> None:
+    """
+    Escribe los DataFrames limpios como Parquet. Escribe en un directorio temporal
+    y lo renombra, para que otro worker nunca lea un snapshot a medio escribir.
+
+    :param fingerprint: Huella calculada con `compute_fingerprint`.
+    :param dfs: Diccionario con los DataFrames limpios.
+    :param manifest: Huella base, deltas aplicados y marcas de agua de esta versión.
+    """
+    if not all(name in dfs and not dfs[name].empty for name in DATASETS):
+        logger.warning("Datos incompletos, no se escribirá snapshot.")
+        return
+
+    snapshot_dir = SNAPSHOT_DIR / fingerprint
+    tmp_dir = SNAPSHOT_DIR / f".{fingerprint}.{os.getpid()}.tmp"
+    try:
+        tmp_dir.mkdir(parents=True, exist_ok=True)
+        for name in DATASETS:
+            dfs[name].to_parquet(tmp_dir / f"{name}.parquet", index=False)
+        if manifest is not None:
+            with open(tmp_dir / MANIFEST_FILE, "w", encoding="utf-8") as f:
+                json.dump(manifest, f, indent=2)
+        tmp_dir.rename(snapshot_dir)
+        logger.info(f"Snapshot {fingerprint} escrito en {snapshot_dir}.")
+    except OSError as e:
+        # Otro worker pudo haber publicado el mismo snapshot primero
+        logger.warning(f"No se pudo publicar el snapshot {fingerprint}: {e}")
+    except Exception as e:
+        logger.error(f"Error al escribir el snapshot {fingerprint}: {e}")
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
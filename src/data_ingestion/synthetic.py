@@ -0,0 +1,316 @@
+"""
+Generador determinista de datasets sintéticos con el esquema de OFTW (ver data/metadata.md).
+
+Escribe `one-for-the-world-payments.json` y `one-for-the-world-pledges.json` con distribuciones
+realistas y vínculos consistentes, para poder medir la app con volúmenes de producción o mayores:
+ - Cada donante tiene 1 a 4 pledges consecutivos (un cambio de monto o frecuencia cierra el pledge
+   anterior y crea uno nuevo); chapter, chapter_type y divisa son del donante.
+ - El estado del último pledge sale de su fecha de inicio (futuro = 'Pledged donor') y de una
+   distribución de estados; los anteriores terminan 'Churned donor' al crearse el siguiente.
+ - Cada pago pertenece a un pledge (un pequeño porcentaje no trae pledge_id) y hereda su donor_id,
+   divisa, plataforma, portfolio y counterfactuality; su fecha cae dentro de la vigencia del pledge
+   y la cantidad de pagos de cada pledge es proporcional a su duración × frecuencia.
+
+Con la misma semilla y los mismos tamaños, los archivos son idénticos byte a byte. Los pagos se
+generan y escriben por bloques de tamaño fijo, así que el pico de memoria no crece con el número de
+pagos (los pledges sí se generan completos).
+
+Uso:
+    python -m src.data_ingestion.synthetic --rows 1M --seed 42
+    python -m src.data_ingestion.synthetic --rows 50M --pledges 2M --out /tmp/oftw-50m
+"""
+
+import argparse
+import os
+import time
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from log_config import get_logger
+
+logger = get_logger(__name__)
+
+DATA_DIR = Path(__file__).parent.parent.parent / 'data'
+
+# Rango de fechas de los datos (el final coincide con la última tasa de eurofxref-hist.csv)
+START_DATE = "2014-07-01"
+END_DATE = "2025-03-14"
+
+# Pagos por bloque de generación/escritura (fijo: forma parte de la secuencia aleatoria)
+CHUNK_ROWS = 250_000
+
+# Pagos por pledge cuando no se indica el número de pledges
+PAYMENTS_PER_PLEDGE = 10
+
+# (chapter, chapter_type, peso); los vacíos representan chapters desconocidos
+CHAPTERS = [
+    ("Harvard", "UG", 0.08), ("Yale", "UG", 0.05), ("Columbia", "UG", 0.05), ("Princeton", "UG", 0.04),
+    ("UPenn", "UG", 0.04), ("Oxford", "UG", 0.04), ("LSE", "UG", 0.03), ("Toronto", "UG", 0.03),
+    ("Harvard Business School", "MBA", 0.07), ("Wharton", "MBA", 0.06), ("Columbia Business School", "MBA", 0.04),
+    ("Stanford GSB", "MBA", 0.04), ("Harvard Law School", "Law", 0.03), ("Yale Law School", "Law", 0.02),
+    ("NYU Law", "Law", 0.02), ("Google", "Corporate", 0.05), ("Microsoft", "Corporate", 0.03),
+    ("Bain", "Corporate", 0.03), ("McKinsey", "Corporate", 0.03), ("OFTW Website", "Other", 0.12),
+    ("Giving What We Can", "Other", 0.02), ("", "", 0.04), ("n/a", "n/a", 0.04),
+]
+
+CURRENCIES = {"USD": 0.58, "GBP": 0.14, "CAD": 0.08, "AUD": 0.08, "EUR": 0.07, "CHF": 0.02, "SGD": 0.03}
+
+PLATFORMS = {"Stripe": 0.35, "Benevity": 0.22, "PayPal": 0.18, "Donational": 0.15, "Bank Transfer": 0.10}
+
+# Frecuencias de los pledges recurrentes (None = sin informar) y pagos por año de cada una
+FREQUENCIES = {"Monthly": 0.78, "Annually": 0.09, "Quarterly": 0.05, "Semi-Monthly": 0.04, None: 0.04}
+PAYMENTS_PER_YEAR = {"Monthly": 12, "Annually": 1, "Quarterly": 4, "Semi-Monthly": 24, None: 12, "One-Time": 0}
+
+# Estado del último pledge de cada donante ya iniciado
+FINAL_STATUSES = {"Active donor": 0.62, "Churned donor": 0.18, "Payment failure": 0.08, "One-time donor": 0.12}
+
+PORTFOLIOS = {
+    "OFTW Top Picks": 0.45, "Entire OFTW Portfolio": 0.13,
+    "OFTW Top Pick: Against Malaria Foundation": 0.07, "OFTW Top Pick: GiveDirectly": 0.06,
+    "OFTW Top Pick: Helen Keller International": 0.04, "OFTW Top Pick: Malaria Consortium": 0.04,
+    "OFTW Top Pick: New Incentives": 0.04, "One for the World Discretionary Fund": 0.08,
+    "One for the World Operating Costs": 0.06, "": 0.03,
+}
+
+COUNTERFACTUALITY = {0.0: 0.10, 0.25: 0.10, 0.5: 0.25, 0.75: 0.25, 1.0: 0.30}
+
+# Proporción de pagos sin pledge_id, de pagos con plataforma vacía y de pagos con monto distinto al
+# comprometido
+MISSING_PLEDGE_RATE = 0.02
+MISSING_PLATFORM_RATE = 0.03
+AMOUNT_CHANGE_RATE = 0.10
+
+
+def parse_size(value: str) -> int:
+    """
+    :param value: Número de filas, con sufijo opcional k/M (p.ej. '10k', '2.5M', '50000').
+    :return: Número de filas.
+    """
+    value = str(value).strip()
+    multiplier = {"k": 1_000, "m": 1_000_000}.get(value[-1:].lower(), 1)
+    number = value[:-1] if multiplier > 1 else value
+    return int(float(number) * multiplier)
+
+
+def _choice(rng: np.random.Generator, options: dict, size: int) -> np.ndarray:
+    """Muestra `size` valores de {valor: peso} como arreglo de objetos."""
+    values = np.empty(len(options), dtype=object)
+    values[:] = list(options)
+    weights = np.array(list(options.values()), dtype="float64")
+    return values[rng.choice(len(values), size=size, p=weights / weights.sum())]
+
+
+def _days(date: str) -> int:
+    return int(np.datetime64(date, "D").astype("int64"))
+
+
+def _format_dates(days: np.ndarray, unit: str = "D") -> np.ndarray:
+    """Días (o segundos) desde 1970 a texto ISO; los NaN quedan como None."""
+    missing = np.isnan(days) if days.dtype.kind == "f" else np.zeros(len(days), dtype=bool)
+    values = np.datetime64("1970-01-01", unit) + np.where(missing, 0, days).astype("int64").astype(f"timedelta64[{unit}]")
+    text = np.datetime_as_string(values, unit=unit).astype(object)
+    if unit == "s":
+        text = np.char.replace(text.astype(str), "T", " ").astype(object)
+    text[missing] = None
+    return text
+
+
+def generate_pledges(n_pledges: int, rng: np.random.Generator, end_date: str = END_DATE) -> pd.DataFrame:
+    """
+    Genera los pledges y sus donantes.
+
+    :param n_pledges: Número de pledges.
+    :param rng: Generador aleatorio.
+    :param end_date: Fecha de corte de los datos (YYYY-MM-DD).
+    :return: DataFrame con las columnas de pledges, más `_start_day`, `_end_day` y `_weight`
+             (vigencia y pagos esperados de cada pledge, para generar los pagos).
+    """
+    start_day, end_day = _days(START_DATE), _days(end_date)
+
+    # Donantes con 1 a 4 pledges consecutivos
+    counts = np.minimum(rng.geometric(0.75, size=n_pledges + 1), 4)
+    n_donors = int(np.searchsorted(np.cumsum(counts), n_pledges)) + 1
+    donor = np.repeat(np.arange(n_donors), counts[:n_donors])[:n_pledges]
+    first = np.r_[True, donor[1:] != donor[:-1]]
+    last = np.r_[donor[1:] != donor[:-1], True]
+    group_start = np.maximum.accumulate(np.where(first, np.arange(n_pledges), 0))
+
+    # Atributos del donante
+    chapter_index = rng.choice(len(CHAPTERS), size=n_donors, p=np.array([c[2] for c in CHAPTERS]) / sum(c[2] for c in CHAPTERS))
+    chapters = np.array([c[0] for c in CHAPTERS], dtype=object)[chapter_index][donor]
+    chapter_types = np.array([c[1] for c in CHAPTERS], dtype=object)[chapter_index][donor]
+    currency = _choice(rng, CURRENCIES, n_donors)[donor]
+    # Altas crecientes en el tiempo (densidad lineal); un pledge nuevo cada 2 meses a 2 años
+    first_day = start_day + (np.sqrt(rng.random(n_donors)) * (end_day - start_day)).astype("int64")
+    gaps = np.where(first, 0, rng.integers(60, 730, size=n_pledges))
+    cumulative = np.cumsum(gaps)
+    created = np.minimum(first_day[donor] + cumulative - cumulative[group_start], end_day)
+    created_seconds = created * 86400 + rng.integers(0, 86400, size=n_pledges)
+
+    # Inicio: en los 2 meses siguientes; algunos (estudiantes) comienzan al graduarse
+    delay = np.where(rng.random(n_pledges) < 0.15, rng.integers(90, 540, size=n_pledges),
+                     rng.integers(0, 60, size=n_pledges))
+    starts = created + delay
+
+    # Estado y término
+    status = np.where(last, _choice(rng, FINAL_STATUSES, n_pledges), "Churned donor").astype(object)
+    status[starts > end_day] = "Pledged donor"
+    duration = 30 + rng.exponential(540, size=n_pledges).astype("int64")
+    next_created = np.r_[created[1:], end_day]
+    ended = np.where(last, np.minimum(starts + duration, end_day), np.maximum(next_created, starts)).astype("float64")
+    ended[np.isin(status, ["Active donor", "Pledged donor"])] = np.nan
+    one_time = status == "One-time donor"
+    ended[one_time] = starts[one_time]
+
+    # Frecuencia y monto por pago (monto anual log-normal, mediana ~600)
+    frequency = _choice(rng, FREQUENCIES, n_pledges)
+    frequency[one_time] = "One-Time"
+    per_year = np.array([PAYMENTS_PER_YEAR[f] for f in frequency], dtype="float64")
+    annual = rng.lognormal(np.log(600), 0.8, size=n_pledges)
+    amount = np.where(one_time, rng.lognormal(np.log(250), 0.9, size=n_pledges), annual / np.maximum(per_year, 1))
+    amount = np.round(np.maximum(amount, 1.0), 2)
+
+    platform = _choice(rng, PLATFORMS, n_pledges)
+    platform[(chapter_types == "Corporate") & (rng.random(n_pledges) < 0.7)] = "Benevity"
+
+    # Vigencia de los pagos y pagos esperados (los pledges futuros no tienen pagos)
+    paid_until = np.where(np.isnan(ended), end_day, ended).astype("int64")
+    weight = np.where(one_time, 1.0, np.maximum(paid_until - starts, 0) / 365.25 * per_year)
+    weight[status == "Pledged donor"] = 0.0
+
+    ids = np.arange(n_pledges)
+    pledges_df = pd.DataFrame({
+        "donor_id": "d" + pd.Series(donor).astype(str),
+        "pledge_id": "p" + pd.Series(ids).astype(str),
+        "donor_chapter": chapters,
+        "chapter_type": chapter_types,
+        "pledge_status": status,
+        "pledge_created_at": _format_dates(created_seconds, "s"),
+        "pledge_starts_at": _format_dates(starts),
+        "pledge_ended_at": _format_dates(ended),
+        "contribution_amount": amount,
+        "currency": currency,
+        "frequency": frequency,
+        "payment_platform": platform,
+    })
+    return pledges_df.assign(_start_day=starts, _end_day=np.maximum(paid_until, starts), _weight=weight)
+
+
+def generate_payments(pledges_df: pd.DataFrame, n_payments: int, rng: np.random.Generator,
+                      chunk_rows: int = CHUNK_ROWS):
+    """
+    Genera los pagos por bloques, repartidos entre los pledges según sus pagos esperados.
+
+    :param pledges_df: Resultado de `generate_pledges`.
+    :param n_payments: Número de pagos.
+    :param rng: Generador aleatorio.
+    :param chunk_rows: Pagos por bloque.
+    :return: Generador de DataFrames con las columnas de payments.
+    """
+    n_pledges = len(pledges_df)
+    cdf = np.cumsum(pledges_df["_weight"].to_numpy())
+    cdf /= cdf[-1]
+    # Atributos fijos de cada pledge
+    portfolio = _choice(rng, PORTFOLIOS, n_pledges)
+    counterfactuality = _choice(rng, COUNTERFACTUALITY, n_pledges).astype("float64")
+    columns = {col: pledges_df[col].to_numpy() for col in
+               ["donor_id", "pledge_id", "currency", "payment_platform", "contribution_amount", "_start_day", "_end_day"]}
+
+    for offset in range(0, n_payments, chunk_rows):
+        size = min(chunk_rows, n_payments - offset)
+        pledge = np.minimum(np.searchsorted(cdf, rng.random(size), side="right"), n_pledges - 1)
+
+        start, end = columns["_start_day"][pledge], columns["_end_day"][pledge]
+        days = start + (rng.random(size) * (end - start + 1)).astype("int64")
+
+        amount = columns["contribution_amount"][pledge]
+        changed = rng.random(size) < AMOUNT_CHANGE_RATE
+        amount = np.round(np.where(changed, amount * rng.uniform(0.5, 2.0, size=size), amount), 2)
+
+        platform = columns["payment_platform"][pledge].copy()
+        platform[rng.random(size) < MISSING_PLATFORM_RATE] = ""
+        pledge_id = columns["pledge_id"][pledge].copy()
+        pledge_id[rng.random(size) < MISSING_PLEDGE_RATE] = None
+
+        yield pd.DataFrame({
+            "id": np.arange(offset, offset + size),
+            "donor_id": columns["donor_id"][pledge],
+            "payment_platform": platform,
+            "portfolio": portfolio[pledge],
+            "amount": amount,
+            "currency": columns["currency"][pledge],
+            "date": _format_dates(days),
+            "counterfactuality": counterfactuality[pledge],
+            "pledge_id": pledge_id,
+        })
+
+
+def write_json_records(path: Path, chunks) -> int:
+    """
+    Escribe un arreglo JSON de registros por bloques, en un archivo temporal que reemplaza al
+    destino al terminar (el watcher de datos nunca ve un archivo a medio escribir).
+
+    :param path: Archivo de destino.
+    :param chunks: Iterable de DataFrames.
+    :return: Registros escritos.
+    """
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    rows = 0
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write("[")
+        for chunk in chunks:
+            if chunk.empty:
+                continue
+            f.write("," if rows else "")
+            f.write(chunk.to_json(orient="records")[1:-1])
+            rows += len(chunk)
+        f.write("]")
+    os.replace(tmp_path, path)
+    return rows
+
+
+def generate_dataset(n_payments: int, n_pledges: int = None, seed: int = 0, out_dir: Path = DATA_DIR,
+                     end_date: str = END_DATE) -> dict:
+    """
+    Genera y escribe ambos datasets.
+
+    :param n_payments: Número de pagos.
+    :param n_pledges: Número de pledges (por defecto, uno cada `PAYMENTS_PER_PLEDGE` pagos).
+    :param seed: Semilla; la misma semilla y tamaños producen los mismos archivos.
+    :param out_dir: Directorio de salida.
+    :param end_date: Fecha de corte de los datos (YYYY-MM-DD).
+    :return: Diccionario {dataset: ruta del archivo}.
+    """
+    n_pledges = n_pledges or max(100, n_payments // PAYMENTS_PER_PLEDGE)
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    # Secuencias independientes: los pledges no dependen del número de pagos
+    pledges_rng, payments_rng = (np.random.default_rng(s) for s in np.random.SeedSequence(seed).spawn(2))
+
+    start = time.perf_counter()
+    pledges_df = generate_pledges(n_pledges, pledges_rng, end_date)
+    paths = {
+        "payments": out_dir / "one-for-the-world-payments.json",
+        "pledges": out_dir / "one-for-the-world-pledges.json",
+    }
+    n_pay = write_json_records(paths["payments"], generate_payments(pledges_df, n_payments, payments_rng))
+    pledge_columns = [col for col in pledges_df.columns if not col.startswith("_")]
+    n_pl = write_json_records(paths["pledges"], (pledges_df.iloc[i:i + CHUNK_ROWS][pledge_columns]
+                                                 for i in range(0, n_pledges, CHUNK_ROWS)))
+
+    logger.info(f"Datos sintéticos (seed={seed}): {n_pay} pagos y {n_pl} pledges de "
+                f"{pledges_df['donor_id'].nunique()} donantes en {out_dir} ({time.perf_counter() - start:.1f}s).")
+    return paths
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Genera datasets sintéticos de OFTW (payments y pledges).")
+    parser.add_argument("--rows", default="10k", help="Pagos a generar, p.ej. 10k, 1M, 50M.")
+    parser.add_argument("--pledges", default=None, help=f"Pledges (por defecto, rows / {PAYMENTS_PER_PLEDGE}).")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default=str(DATA_DIR), help="Directorio de salida (por defecto, data/).")
+    parser.add_argument("--end-date", default=END_DATE, help="Fecha de corte de los datos.")
+    args = parser.parse_args()
+
+    generate_dataset(parse_size(args.rows), parse_size(args.pledges) if args.pledges else None,
+                     args.seed, Path(args.out), args.end_date)
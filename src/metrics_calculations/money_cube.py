@@ -0,0 +1,131 @@
+"""
+Cubo pre-agregado de Money Moved.
+
+Resume los pagos en celdas mes × portfolio × payment_platform × chapter_type × donor_chapter × donation_type
+con las medidas sum(amount_usd), sum(counterfactual_amount) y count. Se construye una vez por versión
+de los datos; las métricas de `money_metrics` y la página Money Moved se responden desde el cubo.
+"""
+
+import pandas as pd
+from log_config import get_logger
+from src.utils.instrumentation import instrumented
+from src.utils.financial import classify_donation_types
+
+logger = get_logger(__name__)
+
+CUBE_DIMENSIONS = ["month", "portfolio", "payment_platform", "chapter_type", "donor_chapter", "donation_type"]
+CUBE_MEASURES = ["amount_usd", "counterfactual_amount", "payment_count"]
+
+PLEDGE_ATTRIBUTES = ["pledge_id", "frequency", "donor_chapter", "chapter_type"]
+
+# Columnas que `clean_data` ya materializa en payments (ver `enrich_payments`)
+ENRICHED_COLUMNS = ["frequency", "donation_type", "donor_chapter", "chapter_type"]
+
+
+def is_money_cube(df: pd.DataFrame) -> bool:
+    """Indica si el DataFrame ya es un cubo de Money Moved."""
+    return "payment_count" in df.columns and "month" in df.columns
+
+
+@instrumented
+def build_money_cube(payments_df: pd.DataFrame, pledges_df: pd.DataFrame = None) -> pd.DataFrame:
+    """
+    Construye el cubo de Money Moved a partir de los pagos y (opcionalmente) los pledges.
+
+    :param payments_df: DataFrame de pagos.
+    :param pledges_df: DataFrame de pledges (para chapter_type, donor_chapter y donation_type).
+    :return: DataFrame con una fila por celda no vacía del cubo.
+    """
+    if payments_df is None or payments_df.empty:
+        return pd.DataFrame(columns=CUBE_DIMENSIONS + CUBE_MEASURES)
+
+    base_columns = ["date", "portfolio", "payment_platform", "amount_usd", "counterfactuality", "pledge_id"]
+
+    if set(ENRICHED_COLUMNS).issubset(payments_df.columns):
+        # Join ya materializado en la ingesta: no hay merge por request
+        df = payments_df[base_columns + ENRICHED_COLUMNS]
+    elif pledges_df is not None and not pledges_df.empty and set(PLEDGE_ATTRIBUTES).issubset(pledges_df.columns):
+        df = payments_df[base_columns].merge(pledges_df[PLEDGE_ATTRIBUTES], on="pledge_id", how="left")
+    else:
+        df = payments_df[base_columns].assign(frequency=None, donor_chapter=None, chapter_type=None)
+
+    df = df.fillna({"frequency": "Unknown", "donor_chapter": "Unknown", "chapter_type": "Unknown"})
+    if "donation_type" not in df.columns:
+        df = df.assign(donation_type=classify_donation_types(df["frequency"]))
+
+    # Las fechas nulas se conservan (mes NaT) para que los totales no cambien
+    df = df.assign(
+        month=df["date"].dt.to_period("M").dt.to_timestamp(),
+        counterfactual_amount=df["amount_usd"] * df["counterfactuality"],
+        payment_count=1,
+    )
+
+    cube = (
+        df.groupby(CUBE_DIMENSIONS, observed=True, dropna=False)
+        .agg(amount_usd=("amount_usd", "sum"),
+             counterfactual_amount=("counterfactual_amount", "sum"),
+             payment_count=("payment_count", "sum"))
+        .reset_index()
+    )
+
+    logger.info(f"Cubo de Money Moved construido: {len(payments_df)} pagos -> {len(cube)} celdas.")
+    return cube
+
+
+@instrumented
+def fold_money_cube(cube: pd.DataFrame, added: pd.DataFrame = None, removed: pd.DataFrame = None) -> pd.DataFrame:
+    """
+    Incorpora pagos nuevos (o re-enriquecidos) a un cubo existente sin recorrer el histórico:
+    suma las celdas de `added`, resta las de `removed` y re-agrega por dimensión.
+
+    :param cube: Cubo de Money Moved vigente.
+    :param added: Pagos enriquecidos a sumar.
+    :param removed: Versión anterior de pagos que cambian de celda (se restan).
+    :return: Cubo actualizado.
+    """
+    parts = [cube]
+    if added is not None and not added.empty:
+        parts.append(build_money_cube(added))
+    if removed is not None and not removed.empty:
+        negated = build_money_cube(removed)
+        negated[CUBE_MEASURES] = -negated[CUBE_MEASURES]
+        parts.append(negated)
+    if len(parts) == 1:
+        return cube
+
+    # Dimensiones como texto para que categorías distintas entre partes no se pierdan al concatenar
+    parts = [part.astype({dim: "object" for dim in CUBE_DIMENSIONS if dim != "month"}) for part in parts]
+    folded = (
+        pd.concat(parts, ignore_index=True)
+        .groupby(CUBE_DIMENSIONS, dropna=False)[CUBE_MEASURES].sum()
+        .reset_index()
+    )
+    folded = folded[folded["payment_count"] > 0].reset_index(drop=True)
+    folded = folded.astype({dim: "category" for dim in CUBE_DIMENSIONS if dim != "month"})
+    logger.info(f"Cubo de Money Moved actualizado: {len(cube)} -> {len(folded)} celdas.")
+    return folded
+
+
+@instrumented
+def filter_money_cube(cube: pd.DataFrame, date_ranges: list = None, portfolios: list = None) -> pd.DataFrame:
+    """
+    Filtra el cubo por rangos de fechas (alineados a meses) y portfolios.
+
+    :param cube: Cubo de Money Moved.
+    :param date_ranges: Lista de (start_dt, end_dt), ver `get_date_ranges_from_years`.
+    :param portfolios: Lista de portfolios a conservar.
+    :return: Sub-cubo filtrado.
+    """
+    if cube.empty:
+        return cube
+
+    mask = pd.Series(True, index=cube.index)
+    if date_ranges:
+        in_range = pd.Series(False, index=cube.index)
+        for (start_dt, end_dt) in date_ranges:
+            in_range |= (cube["month"] >= start_dt) & (cube["month"] <= end_dt)
+        mask &= in_range
+    if portfolios:
+        mask &= cube["portfolio"].isin(portfolios)
+
+    return cube[mask]
@@ -3,8 +3,9 @@ Calcula las métricas de 'Money Moved' basadas en el dataset de pagos.
 """
 
 import pandas as pd
-from src.utils.financial import classify_donation_type
+from src.metrics_calculations.money_cube import build_money_cube, is_money_cube
 from log_config import get_logger
+from src.utils.instrumentation import instrumented
 
 logger = get_logger(__name__)
 
@@ -23,218 +24,196 @@ FISCAL_LABELS = {
     7: "Jan", 8: "Feb", 9: "Mar", 10: "Apr", 11: "May", 12: "Jun"
 }
 
+def as_money_cube(payments_df: pd.DataFrame, pledges_df: pd.DataFrame = None) -> pd.DataFrame:
+    """
+    Devuelve el cubo de Money Moved del input. Si ya es un cubo (ver `get_filtered_money_cube`),
+    se usa tal cual; si es un DataFrame de pagos, se agrega al vuelo.
+
+    :param payments_df: Cubo de Money Moved o DataFrame de pagos.
+    :param pledges_df: DataFrame de pledges (solo si `payments_df` son pagos).
+    :return: Cubo de Money Moved sin los portfolios excluidos.
+    """
+    cube = payments_df if is_money_cube(payments_df) else build_money_cube(payments_df, pledges_df)
+    return cube[~cube["portfolio"].isin(EXCLUDED_PORTFOLIOS)]
+
+
+@instrumented
 def calculate_money_moved(df: pd.DataFrame) -> pd.DataFrame:
     """
     Calcula el total de dinero movido excluyendo ciertos valores del portfolio.
 
-    :param df: DataFrame de pagos.
+    :param df: Cubo de Money Moved o DataFrame de pagos.
     :return: DataFrame con Money Moved agregado por mes y total.
     """
     if df.empty:
         logger.warning("El DataFrame de pagos está vacío. No se calculará Money Moved.")
         return pd.DataFrame()
 
-    # Filtrar portafolios excluidos
-    df_filtered = df[~df["portfolio"].isin(EXCLUDED_PORTFOLIOS)].copy()
+    cube = as_money_cube(df)
 
     # Calcular Money Moved por mes
     # Convertir `Period` a `str` para evitar errores con Plotly
-    df_filtered["year_month"] = df_filtered["date"].dt.to_period("M").astype(str)
-
-    monthly_money_moved = df_filtered.groupby("year_month")["amount_usd"].sum().reset_index()
+    monthly_money_moved = (
+        cube.groupby(cube["month"].dt.strftime("%Y-%m").rename("year_month"))["amount_usd"].sum().reset_index()
+    )
 
     # Calcular Money Moved total
-    total_money_moved = df_filtered["amount_usd"].sum()
+    total_money_moved = cube["amount_usd"].sum()
 
     logger.info(f"Money Moved total: ${total_money_moved:,.2f}")
 
     return monthly_money_moved, total_money_moved
 
 
+@instrumented
 def calculate_counterfactual_money_moved(df: pd.DataFrame) -> pd.DataFrame:
     """
     Calcula el Money Moved contrafactual basado en la columna 'counterfactuality'.
 
-    :param df: DataFrame de pagos.
+    :param df: Cubo de Money Moved o DataFrame de pagos.
     :return: DataFrame con Money Moved contrafactual por mes y total.
     """
     if df.empty:
         logger.warning("El DataFrame de pagos está vacío. No se calculará Money Moved contrafactual.")
         return pd.DataFrame()
 
-    # Filtrar portafolios excluidos
-    df_filtered = df[~df["portfolio"].isin(EXCLUDED_PORTFOLIOS)].copy()
-
-    # Aplicar el factor contrafactual
-    df_filtered["counterfactual_amount"] = df_filtered["amount_usd"] * df_filtered["counterfactuality"]
+    cube = as_money_cube(df)
 
     # Calcular Money Moved contrafactual por mes
     # Convertir `Period` a `str` para evitar errores con Plotly
-    df_filtered["year_month"] = df_filtered["date"].dt.to_period("M").astype(str)
-
-    monthly_counterfactual_money_moved = df_filtered.groupby("year_month")["counterfactual_amount"].sum().reset_index()
+    monthly_counterfactual_money_moved = (
+        cube.groupby(cube["month"].dt.strftime("%Y-%m").rename("year_month"))["counterfactual_amount"].sum().reset_index()
+    )
 
     # Calcular Money Moved contrafactual total
-    total_counterfactual_money_moved = df_filtered["counterfactual_amount"].sum()
+    total_counterfactual_money_moved = cube["counterfactual_amount"].sum()
 
     logger.info(f"Money Moved contrafactual total: ${total_counterfactual_money_moved:,.2f}")
 
     return monthly_counterfactual_money_moved, total_counterfactual_money_moved
 
 
+@instrumented
 def calculate_money_moved_by_platform(df: pd.DataFrame) -> pd.DataFrame:
     """
     Calcula Money Moved total, agrupado por plataforma de pago.
 
-    :param df: DataFrame de pagos.
+    :param df: Cubo de Money Moved o DataFrame de pagos.
     :return: DataFrame con Money Moved por plataforma.
     """
     if df.empty or "payment_platform" not in df.columns or "amount_usd" not in df.columns:
         logger.warning("El DataFrame de pagos está vacío o faltan columnas necesarias.")
         return pd.DataFrame(columns=["payment_platform", "amount_usd"])
 
-    df_filtered = df[~df["portfolio"].isin(EXCLUDED_PORTFOLIOS)].copy()
+    cube = as_money_cube(df)
 
-    platform_money_moved = df_filtered.groupby("payment_platform")["amount_usd"].sum().reset_index()
+    platform_money_moved = cube.groupby("payment_platform", observed=True)["amount_usd"].sum().reset_index()
 
     logger.info("Calculado Money Moved por plataforma.")
     return platform_money_moved
 
-def calculate_money_moved_by_donation_type(payments_df: pd.DataFrame, pledges_df: pd.DataFrame) -> pd.DataFrame:
+@instrumented
+def calculate_money_moved_by_donation_type(payments_df: pd.DataFrame, pledges_df: pd.DataFrame = None) -> pd.DataFrame:
     """
     Calcula Money Moved separado en donaciones 'One-Time' y 'Recurring',
     basándose en la columna 'frequency' de pledges.
 
-    :param payments_df: DataFrame de pagos.
-    :param pledges_df: DataFrame de pledges (para obtener la frecuencia de pago).
+    :param payments_df: Cubo de Money Moved o DataFrame de pagos.
+    :param pledges_df: DataFrame de pledges (solo si `payments_df` son pagos).
     :return: DataFrame con Money Moved por tipo de donación.
     """
-    if payments_df.empty or pledges_df.empty:
-        logger.warning("Uno de los DataFrames está vacío. No se calculará Money Moved por tipo de donación.")
+    if not is_money_cube(payments_df):
+        if payments_df.empty or pledges_df is None or pledges_df.empty:
+            logger.warning("Uno de los DataFrames está vacío. No se calculará Money Moved por tipo de donación.")
+            return pd.DataFrame()
+
+        # Verificar que 'pledge_id' está en ambos DataFrames
+        if "pledge_id" not in payments_df.columns or "pledge_id" not in pledges_df.columns:
+            logger.error("No se encontró 'pledge_id' en los DataFrames, no se puede hacer merge.")
+            return pd.DataFrame()
+    elif payments_df.empty:
+        logger.warning("El cubo de Money Moved está vacío. No se calculará Money Moved por tipo de donación.")
         return pd.DataFrame()
 
-    # Verificar que 'pledge_id' está en ambos DataFrames
-    if "pledge_id" not in payments_df.columns or "pledge_id" not in pledges_df.columns:
-        logger.error("No se encontró 'pledge_id' en los DataFrames, no se puede hacer merge.")
-        return pd.DataFrame()
-
-    # Unir `payments` con `pledges` en `pledge_id` para obtener la frecuencia
-    df_merged = payments_df.merge(pledges_df[['pledge_id', 'frequency']], on='pledge_id', how='left')
-
-    # Filtrar portafolios excluidos
-    df_filtered = df_merged[~df_merged["portfolio"].isin(EXCLUDED_PORTFOLIOS)].copy()
-
-    # Manejar valores NaN en 'frequency'
-    df_filtered.fillna({"frequency": "Unknown"}, inplace=True)
-
-    # Determinar si es Recurring o One-Time
-    df_filtered["donation_type"] = df_filtered["frequency"].apply(classify_donation_type)
-
+    cube = as_money_cube(payments_df, pledges_df)
 
     # Agrupar Money Moved por tipo de donación
-    donation_type_money_moved = df_filtered.groupby("donation_type")["amount_usd"].sum().reset_index()
+    donation_type_money_moved = cube.groupby("donation_type", observed=True)["amount_usd"].sum().reset_index()
     logger.info("Calculado Money Moved por tipo de donación.")
 
     return donation_type_money_moved
 
 
-def calculate_money_moved_by_source(payments_df: pd.DataFrame, pledges_df: pd.DataFrame) -> pd.DataFrame:
+@instrumented
+def calculate_money_moved_by_source(payments_df: pd.DataFrame, pledges_df: pd.DataFrame = None) -> pd.DataFrame:
     """
     Calcula Money Moved por fuente (capítulo de donante y tipo de capítulo).
 
-    :param payments_df: DataFrame de pagos.
-    :param pledges_df: DataFrame de pledges.
+    :param payments_df: Cubo de Money Moved o DataFrame de pagos.
+    :param pledges_df: DataFrame de pledges (solo si `payments_df` son pagos).
     :return: DataFrame con Money Moved por fuente.
     """
-    if payments_df.empty or pledges_df.empty:
-        logger.warning("Uno de los DataFrames está vacío. No se calculará Money Moved por fuente.")
-        return pd.DataFrame()
-
-    # Verificar que las columnas necesarias existan antes de hacer merge
-    required_columns = {"pledge_id", "donor_chapter", "chapter_type"}
-    if not required_columns.issubset(set(pledges_df.columns)):
-        logger.error(f"Faltan columnas necesarias en pledges_df: {required_columns - set(pledges_df.columns)}")
+    if not is_money_cube(payments_df):
+        if payments_df.empty or pledges_df is None or pledges_df.empty:
+            logger.warning("Uno de los DataFrames está vacío. No se calculará Money Moved por fuente.")
+            return pd.DataFrame()
+
+        # Verificar que las columnas necesarias existan antes de hacer merge
+        required_columns = {"pledge_id", "donor_chapter", "chapter_type"}
+        if not required_columns.issubset(set(pledges_df.columns)):
+            logger.error(f"Faltan columnas necesarias en pledges_df: {required_columns - set(pledges_df.columns)}")
+            return pd.DataFrame()
+    elif payments_df.empty:
+        logger.warning("El cubo de Money Moved está vacío. No se calculará Money Moved por fuente.")
         return pd.DataFrame()
 
-    # Merge entre payments y pledges para obtener donor_chapter y chapter_type
-    df_merged = payments_df.merge(
-        pledges_df[["pledge_id", "donor_chapter", "chapter_type"]],
-        on="pledge_id",
-        how="left"
-    )
-
-    # Filtrar portafolios excluidos
-    df_filtered = df_merged[~df_merged["portfolio"].isin(EXCLUDED_PORTFOLIOS)].copy()
-
-    # Manejar valores nulos en donor_chapter y chapter_type
-    df_filtered.fillna({"donor_chapter": "Unknown",
-                        "chapter_type": "Unknown"}, inplace=True)
+    cube = as_money_cube(payments_df, pledges_df)
 
     # Agrupar por fuente y sumar Money Moved
-    money_moved_by_source = df_filtered.groupby(["donor_chapter", "chapter_type"])["amount_usd"].sum().reset_index()
+    money_moved_by_source = cube.groupby(["donor_chapter", "chapter_type"], observed=True)["amount_usd"].sum().reset_index()
+    # El treemap de Plotly espera etiquetas de texto, no categorías. Las categorías ya son texto:
+    # astype(object) evita astype(str), que falla en un resultado vacío cuyas categorías son de solo
+    # lectura (datos compartidos, ver `read_only`)
+    money_moved_by_source = money_moved_by_source.astype({"donor_chapter": object, "chapter_type": object})
 
     logger.info("Calculado Money Moved por fuente.")
 
     return money_moved_by_source
 
 
+@instrumented
 def calculate_accumulated_money_moved(df: pd.DataFrame, year_mode: str) -> pd.DataFrame:
     """
     Calcula el monto movido de forma acumulada POR AÑO
     (sea fiscal o calendario), retornando un DF para graficar.
+
+    :param df: Cubo de Money Moved o DataFrame de pagos.
+    :param year_mode: 'calendar' o 'fiscal'.
     """
 
     if df.empty:
         return pd.DataFrame()
 
-    # Excluir portfolios no deseados
-    df_filtered = df[~df["portfolio"].isin(EXCLUDED_PORTFOLIOS)].copy()
-
-    # Asumiendo que ya has filtrado este DF a un año o varios (en el callback).
-    # Aun así, necesitamos "año contable" y "mes contable".
-    # Dependerá de year_mode: 'calendar' vs 'fiscal'.
+    # Excluir portfolios no deseados y sumar por mes (las celdas sin fecha no entran en el acumulado)
+    cube = as_money_cube(df)
+    monthly = cube.dropna(subset=["month"]).groupby("month", as_index=False)["amount_usd"].sum()
 
-    # 1) Crear col. year y col. month reales
-    df_filtered["actual_year"] = df_filtered["date"].dt.year
-    df_filtered["month"] = df_filtered["date"].dt.month
-
-    # 2) Crear "contable_year"
-    if year_mode == "calendar":
-        # contable_year = actual_year
-        df_filtered["contable_year"] = df_filtered["actual_year"]
-    else:
-        # year_mode == "fiscal"
-        # Si month >= 7 => contable_year = actual_year
-        # Si month < 7  => contable_year = actual_year - 1
-        df_filtered["contable_year"] = df_filtered.apply(
-            lambda row: row["actual_year"] if row["month"] >= 7 else row["actual_year"] - 1,
-            axis=1
-        )
-
-    # 3) Agrupar por contable_year, y contable_month para resumir
-    # contable_month = 1..12 en orden: 1=Jul, 2=Aug,... si es fiscal?
-    #   eso se hace con un offset, si deseas.
-    #   O a veces, para graficar, basta con "fecha" ordenada.
-    #
-    # Ejemplo simple: agrupar por (contable_year, date) => monthly sums
-    # luego en plot, mostrar un label year-month.
-    # Si quieres un "mes contable" estilo 1..12, se hace un shift.
-
-    # Generemos un "contable_month" sin shift:
-    if year_mode == "calendar":
-        df_filtered["contable_month"] = df_filtered["month"]
-    else:
-        # fiscal: mes 7 -> contable_month=1, mes 8 -> 2, ... mes 6->12
-        # => contable_month = (month - 7 + 12) % 12 + 1
-        df_filtered["contable_month"] = ((df_filtered["month"] - 7) % 12) + 1
+    # 1) Año y mes reales
+    actual_year = monthly["month"].dt.year.astype(int)
+    month = monthly["month"].dt.month.astype(int)
 
+    # 2) "contable_year" y "contable_month" según year_mode
     if year_mode == "calendar":
-        df_filtered["month_label"] = df_filtered["contable_month"].map(CALENDAR_LABELS)
+        monthly["contable_year"] = actual_year
+        monthly["contable_month"] = month
     else:
-        df_filtered["month_label"] = df_filtered["contable_month"].map(FISCAL_LABELS)
+        # fiscal: Si month >= 7 => contable_year = actual_year, si no actual_year - 1
+        # mes 7 -> contable_month=1, mes 8 -> 2, ... mes 6->12
+        monthly["contable_year"] = actual_year.where(month >= 7, actual_year - 1)
+        monthly["contable_month"] = ((month - 7) % 12) + 1
 
     # Sumar amount_usd por contable_year y contable_month
-    grouped = df_filtered.groupby(["contable_year", "contable_month"], as_index=False)["amount_usd"].sum()
+    grouped = monthly.groupby(["contable_year", "contable_month"], as_index=False)["amount_usd"].sum()
 
     # Ordenar
     grouped.sort_values(["contable_year", "contable_month"], inplace=True)
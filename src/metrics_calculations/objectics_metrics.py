@@ -5,10 +5,12 @@ Calcula métricas relacionadas con Objectives and Key Results (OKRs).
 import pandas as pd
 from src.utils.financial import calculate_arr
 from log_config import get_logger
+from src.utils.instrumentation import instrumented
 
 logger = get_logger(__name__)
 
 
+@instrumented
 def calculate_total_active_donors(df: pd.DataFrame) -> int:
     """
     Calcula el total de donantes activos.
@@ -26,6 +28,7 @@ def calculate_total_active_donors(df: pd.DataFrame) -> int:
     return active_donors
 
 
+@instrumented
 def calculate_chapter_arr(df: pd.DataFrame) -> pd.DataFrame:
     """
     Calcula el ARR por tipo de capítulo.
@@ -34,7 +37,7 @@ def calculate_chapter_arr(df: pd.DataFrame) -> pd.DataFrame:
         logger.warning("El DataFrame de pledges está vacío o faltan columnas necesarias.")
         return pd.DataFrame(columns=["chapter_type", "ARR_USD"])
 
-    chapter_arr = df.groupby("chapter_type").apply(
+    chapter_arr = df.groupby("chapter_type", observed=True).apply(
         lambda x: calculate_arr(x, ["Active donor", "Pledged donor"])
     ).reset_index()
 
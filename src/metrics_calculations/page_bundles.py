@@ -0,0 +1,207 @@
+"""
+Bundles de cálculo por página.
+
+Cada bundle deriva todas las métricas de una página a partir de un solo slice filtrado y en una sola
+pasada. Está memoizado por (versión de datos, filtros), de modo que los callbacks de una misma página
+que se disparan con el mismo cambio de filtros comparten el resultado en vez de recalcularlo, y
+el resultado es válido hasta que se publique otra versión de los datos.
+
+Uso del benchmark:
+    python -m src.metrics_calculations.page_bundles
+"""
+
+from src.data_ingestion.data_loader import data_versions
+from src.metrics_calculations.money_metrics import (
+    calculate_money_moved, calculate_counterfactual_money_moved, calculate_money_moved_by_platform,
+    calculate_money_moved_by_donation_type, calculate_money_moved_by_source, calculate_accumulated_money_moved
+)
+from src.metrics_calculations.objectics_metrics import calculate_chapter_arr, calculate_total_active_donors
+from src.metrics_calculations.performance_metrics import (
+    calculate_all_pledges, calculate_future_pledges, calculate_breakdown_by_channel, calculate_monthly_churn_series
+)
+from src.utils.financial import calculate_arr, calculate_pledge_attrition_rate
+from src.utils.callbacks_filter import get_filtered_data_version, get_filtered_money_cube
+from src.utils.cache import cache, VERSIONED_TIMEOUT
+from src.utils.single_flight import single_flight_memoize
+from log_config import get_logger
+
+logger = get_logger(__name__)
+
+# Años contables que se muestran en el gráfico acumulado
+ACCUMULATED_YEARS_SHOWN = 5
+
+
+@single_flight_memoize(timeout=VERSIONED_TIMEOUT)
+def _money_moved_bundle(fingerprint, selected_years, selected_portfolios, year_mode):
+    money_cube = get_filtered_money_cube(selected_years, selected_portfolios, year_mode, fingerprint)
+    if money_cube is None or money_cube.empty:
+        return None
+
+    df_accum = calculate_accumulated_money_moved(money_cube, year_mode)
+    # Si hay más de 5 años contables, nos quedamos con los más recientes
+    unique_years = sorted(df_accum["contable_year"].unique())
+    if len(unique_years) > ACCUMULATED_YEARS_SHOWN:
+        df_accum = df_accum[df_accum["contable_year"].isin(unique_years[-ACCUMULATED_YEARS_SHOWN:])]
+
+    return {
+        "money_moved": calculate_money_moved(money_cube),
+        "counterfactual_money_moved": calculate_counterfactual_money_moved(money_cube),
+        "by_platform": calculate_money_moved_by_platform(money_cube),
+        "by_donation_type": calculate_money_moved_by_donation_type(money_cube),
+        "by_source": calculate_money_moved_by_source(money_cube),
+        "accumulated": df_accum,
+    }
+
+
+@single_flight_memoize(timeout=VERSIONED_TIMEOUT)
+def _objectics_bundle(fingerprint, selected_years, selected_portfolios, year_mode):
+    _, pledges_df = get_filtered_data_version(fingerprint, selected_years, selected_portfolios, year_mode)
+    if pledges_df is None or pledges_df.empty:
+        return None
+
+    return {
+        "total_active_donors": calculate_total_active_donors(pledges_df),
+        "total_active_pledges": pledges_df[pledges_df["pledge_status"] == "Active donor"]["donor_id"].nunique(),
+        "pledge_attrition_rate": calculate_pledge_attrition_rate(pledges_df),
+        "chapter_arr": calculate_chapter_arr(pledges_df),
+    }
+
+
+@single_flight_memoize(timeout=VERSIONED_TIMEOUT)
+def _pledge_perf_bundle(fingerprint, selected_years, selected_portfolios, year_mode):
+    _, pledges_df = get_filtered_data_version(fingerprint, selected_years, selected_portfolios, year_mode)
+    if pledges_df is None or pledges_df.empty:
+        return None
+
+    monthly_churn = calculate_monthly_churn_series(pledges_df)
+    return {
+        "total_pledges": calculate_all_pledges(pledges_df),
+        "future_pledges": calculate_future_pledges(pledges_df),
+        "all_arr": calculate_arr(pledges_df, ["Pledged donor", "Active donor"]),
+        "future_arr": calculate_arr(pledges_df, ["Pledged donor"]),
+        "active_arr": calculate_arr(pledges_df, ["Active donor"]),
+        "monthly_attrition_rate": float(monthly_churn["churn_rate"].mean()) if not monthly_churn.empty else 0.0,
+        "monthly_churn": monthly_churn,
+        "breakdown_by_channel": calculate_breakdown_by_channel(pledges_df),
+    }
+
+
+def get_money_moved_bundle(selected_years, selected_portfolios, year_mode, fingerprint: str = None):
+    """
+    Métricas de la página Money Moved para los filtros dados.
+
+    :param fingerprint: Versión de datos a usar; por defecto la activa.
+    :return: Diccionario con los DataFrames/valores de cada gráfico, o None si no hay datos.
+    """
+    return _money_moved_bundle(fingerprint or data_versions.current().fingerprint, selected_years, selected_portfolios,
+                               year_mode)
+
+
+def get_objectics_bundle(selected_years, selected_portfolios, year_mode, fingerprint: str = None):
+    """
+    Métricas de la página Objectives & Key Results para los filtros dados.
+
+    :param fingerprint: Versión de datos a usar; por defecto la activa.
+    :return: Diccionario con las métricas de la página, o None si no hay datos.
+    """
+    return _objectics_bundle(fingerprint or data_versions.current().fingerprint, selected_years, selected_portfolios,
+                             year_mode)
+
+
+def get_pledge_perf_bundle(selected_years, selected_portfolios, year_mode, fingerprint: str = None):
+    """
+    Métricas de la página Pledge Performance para los filtros dados.
+
+    :param fingerprint: Versión de datos a usar; por defecto la activa.
+    :return: Diccionario con las métricas de la página, o None si no hay datos.
+    """
+    return _pledge_perf_bundle(fingerprint or data_versions.current().fingerprint, selected_years, selected_portfolios,
+                               year_mode)
+
+
+if __name__ == "__main__":
+    import time
+    import pandas as pd
+    from flask import Flask
+    from src.data_ingestion.data_loader import load_clean_data
+    from src.utils.filtering import filter_dataframe, get_date_ranges_from_years
+
+    app = Flask(__name__)
+    cache.init_app(app)
+
+    def legacy_filtered_data(selected_years, selected_portfolios, year_mode):
+        """Filtro previo a los bundles: máscaras de fecha y `filter_dataframe` sobre los datos completos."""
+        dfs = load_clean_data()
+        payments_df, pledges_df = dfs["payments"], dfs["pledges"]
+        if selected_years:
+            payments_mask = pledges_mask = False
+            for start_dt, end_dt in get_date_ranges_from_years(selected_years, year_mode):
+                payments_mask |= (payments_df["date"] >= start_dt) & (payments_df["date"] <= end_dt)
+                pledges_mask |= (pledges_df["pledge_created_at"] >= start_dt) & (pledges_df["pledge_created_at"] <= end_dt)
+            payments_df, pledges_df = payments_df[payments_mask], pledges_df[pledges_mask]
+        if selected_portfolios:
+            payments_df = filter_dataframe(payments_df, {"portfolio": selected_portfolios})
+        return payments_df, pledges_df
+
+    def legacy_money_moved_graphs(payments_df, pledges_df, year_mode):
+        calculate_money_moved(payments_df)
+        calculate_counterfactual_money_moved(payments_df)
+
+    def legacy_money_moved_additional(payments_df, pledges_df, year_mode):
+        calculate_money_moved_by_platform(payments_df)
+        calculate_money_moved_by_donation_type(payments_df, pledges_df)
+        calculate_money_moved_by_source(payments_df, pledges_df)
+
+    def legacy_money_moved_accumulated(payments_df, pledges_df, year_mode):
+        calculate_accumulated_money_moved(payments_df, year_mode)
+
+    def legacy_objectics(payments_df, pledges_df, year_mode):
+        calculate_total_active_donors(pledges_df)
+        pledges_df[pledges_df["pledge_status"] == "Active donor"]["donor_id"].nunique()
+        calculate_pledge_attrition_rate(pledges_df)
+        calculate_chapter_arr(pledges_df)
+
+    def legacy_pledge_perf(payments_df, pledges_df, year_mode):
+        calculate_all_pledges(pledges_df)
+        calculate_future_pledges(pledges_df)
+        for statuses in (["Pledged donor", "Active donor"], ["Pledged donor"], ["Active donor"]):
+            calculate_arr(pledges_df, statuses)
+        calculate_monthly_churn_series(pledges_df)
+        calculate_breakdown_by_channel(pledges_df)
+
+    # Por página: callbacks sin bundle (cada uno filtra y calcula por su cuenta) y el bundle que
+    # los reemplaza (un llamado por callback: el primero calcula, los demás leen del caché)
+    pages = {
+        "Money Moved": ([legacy_money_moved_graphs, legacy_money_moved_additional, legacy_money_moved_accumulated],
+                        get_money_moved_bundle),
+        "Objectives & Key Results": ([legacy_objectics], get_objectics_bundle),
+        "Pledge Performance": ([legacy_pledge_perf], get_pledge_perf_bundle),
+    }
+
+    with app.app_context():
+        cache.clear()
+        payments_df = load_clean_data()["payments"]
+        years = sorted(payments_df["date"].dt.year.dropna().astype(int).astype(str).unique())
+        filter_changes = [(None, None, "calendar")] + [([y], None, mode) for y in years for mode in ("calendar", "fiscal")]
+
+        rows = []
+        for page, (legacy_callbacks, get_bundle) in pages.items():
+            for selected_years, selected_portfolios, year_mode in filter_changes:
+                start = time.perf_counter()
+                for callback in legacy_callbacks:
+                    callback(*legacy_filtered_data(selected_years, selected_portfolios, year_mode), year_mode)
+                before = time.perf_counter() - start
+
+                start = time.perf_counter()
+                for _ in legacy_callbacks:
+                    get_bundle(selected_years, selected_portfolios, year_mode)
+                after = time.perf_counter() - start
+                rows.append({"page": page, "years": selected_years, "year_mode": year_mode,
+                             "before_ms": before * 1000, "after_ms": after * 1000})
+
+        report = pd.DataFrame(rows)
+        print(report.to_string(index=False))
+        print("\nTiempo promedio por cambio de filtro:")
+        for page, page_report in report.groupby("page", sort=False):
+            print(f"  {page}: antes {page_report['before_ms'].mean():.1f} ms, "
+                  f"después {page_report['after_ms'].mean():.1f} ms")
@@ -2,11 +2,14 @@
 Calcula métricas relacionadas con Pledge Performance.
 """
 
+import numpy as np
 import pandas as pd
 from log_config import get_logger
+from src.utils.instrumentation import instrumented
 
 logger = get_logger(__name__)
 
+@instrumented
 def calculate_all_pledges(df: pd.DataFrame) -> int:
     """
     Calcula el total de pledges (activos + futuros).
@@ -23,6 +26,7 @@ def calculate_all_pledges(df: pd.DataFrame) -> int:
 
     return total_pledges
 
+@instrumented
 def calculate_future_pledges(df: pd.DataFrame) -> int:
     """
     Calcula el número de pledges futuros (no activos todavía).
@@ -40,72 +44,96 @@ def calculate_future_pledges(df: pd.DataFrame) -> int:
     return future_pledges
 
 
-def calculate_monthly_attrition_rate(df: pd.DataFrame) -> float:
+def _month_index(dates: pd.Series) -> np.ndarray:
+    """Convierte fechas en un índice entero de mes (año * 12 + mes - 1); NaN si la fecha es nula."""
+    return (dates.dt.year * 12 + dates.dt.month - 1).to_numpy(dtype="float64")
+
+
+@instrumented
+def calculate_monthly_churn_series(df: pd.DataFrame) -> pd.DataFrame:
     """
-    Calcula la tasa de pérdida de pledges por mes de forma más realista:
+    Serie mensual de churn calculada con un barrido de eventos:
       churn_rate(M) = ( pledges que terminan en M ) / ( pledges que estaban activos durante M )
+
+    Cada pledge aporta +1 en su mes de inicio y -1 en el mes siguiente a su término; los activos de
+    cada mes son la suma acumulada de esos deltas. Costo O(n log n) en vez de O(meses × pledges).
+
+    :param df: DataFrame de pledges.
+    :return: DataFrame con year_month, active_pledges, churned_pledges y churn_rate.
     """
+    columns = ["year_month", "active_pledges", "churned_pledges", "churn_rate"]
     if df.empty:
-        return 0.0
+        return pd.DataFrame(columns=columns)
 
-    df = df.copy()  # Para no alterar el original
-    df["pledge_starts_at"] = pd.to_datetime(df["pledge_starts_at"], errors="coerce")
-    df["pledge_ended_at"] = pd.to_datetime(df["pledge_ended_at"], errors="coerce")
+    starts = pd.to_datetime(df["pledge_starts_at"], errors="coerce")
+    ends = pd.to_datetime(df["pledge_ended_at"], errors="coerce")
 
     # Opcional: podríamos excluir “One-time donor” si no queremos que entren al churn
     # df = df[~(df["pledge_status"] == "One-time donor")].copy()
 
-    # Generamos un rango de meses desde la más antigua pledge_starts_at hasta la más reciente pledge_ended_at
-    min_month = df["pledge_starts_at"].min().to_period("M")
-    max_month = df["pledge_ended_at"].max().to_period("M") if df["pledge_ended_at"].notna().any() else pd.Period.now("M")
-
-    if pd.isna(min_month) or pd.isna(max_month):
+    # Rango de meses desde la más antigua pledge_starts_at hasta la más reciente pledge_ended_at
+    if starts.isna().all():
         # No hay datos de fechas
-        return 0.0
-
-    monthly_churn_rates = []
-
-    # Recorremos cada mes en el rango
-    current_month = min_month
-    while current_month <= max_month:
-        # pledges activas en current_month → pledges que:
-        # - tienen pledge_starts_at <= fin del current_month
-        # - no terminaron antes de comienzo de current_month
-        month_start = current_month.to_timestamp()
-        month_end   = (current_month + 1).to_timestamp() - pd.Timedelta("1ns")  # fin del mes
-
-        # Activos = starts_at <= month_end AND (ended_at >= month_start OR ended_at is null)
-        # Nota: pledges que no tienen pledge_ended_at => ended_at is null => consideramos que siguen activos
-        active_mask = (
-            (df["pledge_starts_at"] <= month_end) &
-            (
-                df["pledge_ended_at"].isna() |
-                (df["pledge_ended_at"] >= month_start)
-            )
-        )
-        active_this_month = df[active_mask]
-
-        # Churn en este mes = pledges que cambian a Payment failure/Churned donor con ended_at en [month_start, month_end]
-        churn_mask = (
-            df["pledge_status"].isin(["Payment failure", "Churned donor"]) &
-            (df["pledge_ended_at"] >= month_start) &
-            (df["pledge_ended_at"] <= month_end)
-        )
-        churned_this_month = df[churn_mask]
-
-        n_active = len(active_this_month)
-        n_churned = len(churned_this_month)
-        churn_rate = n_churned / n_active if n_active > 0 else 0.0
-
-        monthly_churn_rates.append(churn_rate)
-        current_month += 1  # pasar al siguiente mes
+        return pd.DataFrame(columns=columns)
+    start_m = _month_index(starts)
+    end_m = _month_index(ends)
+    min_month = int(np.nanmin(start_m))
+    if ends.notna().any():
+        max_month = int(np.nanmax(end_m))
+    else:
+        now = pd.Timestamp.now()
+        max_month = now.year * 12 + now.month - 1
+
+    n_months = max_month - min_month + 1
+    if n_months <= 0:
+        return pd.DataFrame(columns=columns)
+
+    # Activos en M: starts_at <= fin de M AND (ended_at es nulo OR ended_at >= inicio de M).
+    # Un pledge que termina antes de su mes de inicio nunca está activo.
+    has_start = ~np.isnan(start_m)
+    has_end = ~np.isnan(end_m)
+    counted = has_start & (~has_end | (end_m >= start_m))
+
+    entries = (start_m[counted] - min_month).astype(int)
+    exits = (end_m[counted & has_end] - min_month + 1).astype(int)
+    deltas = (np.bincount(entries[entries < n_months], minlength=n_months)
+              - np.bincount(exits[exits < n_months], minlength=n_months))
+    active = np.cumsum(deltas)
+
+    # Churn en M: pledges en Payment failure/Churned donor con ended_at dentro de M
+    churn_mask = df["pledge_status"].isin(["Payment failure", "Churned donor"]).to_numpy() & has_end
+    churn_offsets = (end_m[churn_mask] - min_month).astype(int)
+    churn_offsets = churn_offsets[(churn_offsets >= 0) & (churn_offsets < n_months)]
+    churned = np.bincount(churn_offsets, minlength=n_months)
+
+    churn_rate = np.divide(churned, active, out=np.zeros(n_months), where=active > 0)
+
+    months = pd.period_range(
+        start=pd.Period(year=min_month // 12, month=min_month % 12 + 1, freq="M"), periods=n_months, freq="M"
+    )
+    return pd.DataFrame({
+        "year_month": months.astype(str),
+        "active_pledges": active,
+        "churned_pledges": churned,
+        "churn_rate": churn_rate,
+    })
+
+
+@instrumented
+def calculate_monthly_attrition_rate(df: pd.DataFrame) -> float:
+    """
+    Calcula la tasa de pérdida de pledges por mes de forma más realista:
+      churn_rate(M) = ( pledges que terminan en M ) / ( pledges que estaban activos durante M )
+    y devuelve el promedio de la serie mensual (ver `calculate_monthly_churn_series`).
+    """
+    monthly_churn = calculate_monthly_churn_series(df)
 
     # Devolvemos el promedio de churn
-    if monthly_churn_rates:
-        return float(pd.Series(monthly_churn_rates).mean())
-    else:
+    if monthly_churn.empty:
         return 0.0
+    return float(monthly_churn["churn_rate"].mean())
 
+@instrumented
 def calculate_breakdown_by_channel(df: pd.DataFrame) -> pd.DataFrame:
     """
     Calcula el desglose de pledges por tipo de capítulo.
@@ -117,7 +145,7 @@ def calculate_breakdown_by_channel(df: pd.DataFrame) -> pd.DataFrame:
         logger.warning("El DataFrame de pledges está vacío. No se calculará breakdown por canal.")
         return pd.DataFrame()
 
-    breakdown = df.groupby("chapter_type")["pledge_id"].count().reset_index()
+    breakdown = df.groupby("chapter_type", observed=True)["pledge_id"].count().reset_index()
     breakdown.rename(columns={"pledge_id": "pledge_count"}, inplace=True)
 
     logger.info("Breakdown por canal calculado.")
@@ -6,11 +6,13 @@ import plotly.express as px
 import plotly.graph_objects as go
 import pandas as pd
 from log_config import get_logger
+from src.utils.tracing import traced
 from src.metrics_calculations.money_metrics import calculate_money_moved, calculate_counterfactual_money_moved
 from src.metrics_vizualizations.theme import OFTW_COLOR_SCALES
 
 logger = get_logger(__name__)
 
+@traced
 def plot_money_moved(monthly_money_moved: pd.DataFrame, total_money_moved: float) -> go.Figure:
     """
     Genera un gráfico de Money Moved a lo largo del tiempo.
@@ -39,6 +41,7 @@ def plot_money_moved(monthly_money_moved: pd.DataFrame, total_money_moved: float
 
     return fig
 
+@traced
 def plot_counterfactual_money_moved(monthly_counterfactual_money_moved: pd.DataFrame, total_counterfactual_money_moved: float) -> go.Figure:
     """
     Genera un gráfico de Counterfactual Money Moved a lo largo del tiempo.
@@ -68,6 +71,7 @@ def plot_counterfactual_money_moved(monthly_counterfactual_money_moved: pd.DataF
     return fig
 
 
+@traced
 def plot_money_moved_by_platform(df):
     """
     Genera un gráfico de barras para Money Moved por plataforma de pago.
@@ -79,8 +83,8 @@ def plot_money_moved_by_platform(df):
         logger.warning("El DataFrame para Money Moved por plataforma está vacío o faltan columnas necesarias.")
         return go.Figure()
 
-    # Rellenar valores NaN y convertir a float
-    df["amount_usd"] = pd.to_numeric(df["amount_usd"], errors="coerce").fillna(0)
+    # Rellenar valores NaN y convertir a float (sin modificar el DataFrame recibido)
+    df = df.assign(amount_usd=pd.to_numeric(df["amount_usd"], errors="coerce").fillna(0))
 
     fig = px.bar(
         df,
@@ -97,6 +101,7 @@ def plot_money_moved_by_platform(df):
     return fig
 
 
+@traced
 def plot_money_moved_by_donation_type(df: pd.DataFrame) -> go.Figure:
     """
     Genera un gráfico de pastel para Money Moved por tipo de donación (One-Time vs Recurring).
@@ -120,6 +125,7 @@ def plot_money_moved_by_donation_type(df: pd.DataFrame) -> go.Figure:
     return fig
 
 
+@traced
 def plot_money_moved_treemap(df: pd.DataFrame) -> go.Figure:
     """
     Genera un Treemap para visualizar Money Moved por fuente.
@@ -144,6 +150,7 @@ def plot_money_moved_treemap(df: pd.DataFrame) -> go.Figure:
     return fig
 
 
+@traced
 def plot_accumulated_money_moved(accumulated_df: pd.DataFrame,
                                  target_value: float = None,
                                  year_mode: str = "calendar") -> go.Figure:
@@ -7,9 +7,11 @@ import plotly.graph_objects as go
 import pandas as pd
 from src.metrics_vizualizations.theme import OFTW_COLOR_SCALES
 from log_config import get_logger
+from src.utils.tracing import traced
 
 logger = get_logger(__name__)
 
+@traced
 def plot_chapter_arr(df):
     """
     Genera un gráfico de barras para Chapter ARR.
@@ -21,8 +23,8 @@ def plot_chapter_arr(df):
         logger.warning("El DataFrame para Chapter ARR está vacío o faltan columnas necesarias.")
         return go.Figure()
 
-    # Rellenar valores NaN y forzar float en ARR_USD
-    df["ARR_USD"] = pd.to_numeric(df["ARR_USD"], errors="coerce").fillna(0)
+    # Rellenar valores NaN y forzar float en ARR_USD (sin modificar el DataFrame recibido)
+    df = df.assign(ARR_USD=pd.to_numeric(df["ARR_USD"], errors="coerce").fillna(0))
 
     fig = px.bar(
         df,
@@ -5,8 +5,10 @@ Genera visualizaciones para Pledge Performance Metrics.
 import plotly.express as px
 import plotly.graph_objects as go
 from src.metrics_vizualizations.theme import OFTW_COLOR_SCALES
+from src.utils.tracing import traced
 
 
+@traced
 def plot_breakdown_by_channel(df):
     """
     Genera un gráfico de barras para el breakdown de pledges por canal.
@@ -30,3 +32,29 @@ def plot_breakdown_by_channel(df):
     fig.update_layout(template="oftw_template")
 
     return fig
+
+
+@traced
+def plot_monthly_churn(df):
+    """
+    Genera un gráfico de línea con la tasa de churn mensual.
+
+    :param df: DataFrame con year_month y churn_rate (ver `calculate_monthly_churn_series`).
+    :return: Figura de Plotly.
+    """
+    if df.empty:
+        return go.Figure()
+
+    fig = px.line(
+        df,
+        x="year_month",
+        y="churn_rate",
+        labels={"year_month": "Month", "churn_rate": "Churn Rate"},
+        markers=True,
+        hover_data=["active_pledges", "churned_pledges"],
+        color_discrete_sequence=OFTW_COLOR_SCALES['discrete'],
+    )
+
+    fig.update_layout(template="oftw_template", yaxis_tickformat=".1%")
+
+    return fig
@@ -22,26 +22,31 @@ def chat_llm_layout():
             dbc.Col([
                 html.Div([
 
-                    # Envolvemos el contenedor de mensajes en un dcc.Loading
-                    dcc.Loading(
-                        id="chat-llm-loading",
-                        type="circle",  # o "circle", "dot", etc.
-                        overlay_style={"visibility": "visible", "filter": "blur(2px)"},
-                        children=[
-                            html.Div(
-                                id="chat-messages-container",
-                                className="chat-messages-container mb-4",
-                                style={
-                                    "height": "400px",
-                                    "overflowY": "auto",
-                                    "padding": "1rem",
-                                    "borderRadius": "var(--border-radius)",
-                                    "backgroundColor": "var(--background-card)",
-                                    "boxShadow": "var(--shadow-light)"
-                                }
-                            )
+                    # Historial (se carga del servidor al mostrar la página y luego solo recibe los
+                    # mensajes nuevos) y, debajo, el mensaje de espera donde se escribe la respuesta
+                    html.Div(
+                        [
+                            html.Div(id="chat-messages-container", className="chat-messages-container"),
+                            html.Div(id="chat-llm-pending")
                         ],
+                        className="mb-4",
+                        style={
+                            "height": "400px",
+                            "overflowY": "auto",
+                            "padding": "1rem",
+                            "borderRadius": "var(--border-radius)",
+                            "backgroundColor": "var(--background-card)",
+                            "boxShadow": "var(--shadow-light)"
+                        }
                     ),
+                    dcc.Store(id="chat-llm-restore"),
+
+                    # Trabajo del LLM en curso: la respuesta llega por SSE (assets/chat_llm_stream.js);
+                    # el intervalo solo la recoge si el stream no está disponible
+                    dcc.Store(id="chat-llm-job"),
+                    dcc.Store(id="chat-llm-stream"),
+                    dcc.Store(id="chat-llm-stream-end"),
+                    dcc.Interval(id="chat-llm-poll", interval=3000, disabled=True),
 
                     # Input Area
                     html.Div([
@@ -79,6 +84,15 @@ def chat_llm_layout():
                                     "boxShadow": "var(--shadow-light)",
                                     "transition": "all var(--transition-normal)"
                                 }
+                            ),
+                            dbc.Button(
+                                "Cancel",
+                                id="chat-llm-cancel",
+                                color="secondary",
+                                outline=True,
+                                disabled=True,
+                                className="mt-3 ms-2",
+                                style={"borderRadius": "30px", "padding": "0.5rem 1.5rem"}
                             )
                         ], className="text-end")
                     ], className="chat-input-container")
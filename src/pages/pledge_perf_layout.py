@@ -97,6 +97,27 @@ def pledge_perf_layout():
                     ], className="graph-section")
                 ], className="card graph-card")
             ], width=12)
+        ], className="mb-5"),
+
+        # Monthly Churn Graph
+        dbc.Row([
+            dbc.Col([
+                html.Div([
+                    html.Div([
+                        html.I(className="fas fa-chart-line fa-2x mb-3"),
+                        html.H3("Monthly Churn Rate", className="mb-4"),
+                        html.P(
+                            "Shows, for each month, the share of pledges active that month that ended with a payment failure or churn. The Monthly Attrition Rate card is the average of this series.",
+                            className="graph-explanation"
+                        ),
+                        dcc.Graph(
+                            id="monthly-churn-graph",
+                            figure=go.Figure(),
+                            className="graph-container fade-in"
+                        )
+                    ], className="graph-section")
+                ], className="card graph-card")
+            ], width=12)
         ]),
 
     ], fluid=True, className="py-4")
@@ -0,0 +1,163 @@
+"""
+Caché de respuestas del Chat LLM.
+
+La clave combina la pregunta normalizada (minúsculas, espacios colapsados, sin puntuación final),
+una huella canónica de los filtros (años y portfolios ordenados, lista vacía = sin filtro), el hash
+del contexto de datos que recibe el modelo y el modelo/prompt usados. Así, la misma pregunta sobre
+el mismo corte de datos se responde al instante y sin costo de API, y un cambio en los datos o en el
+prompt invalida la respuesta.
+
+Cada proceso mantiene un LRU de `OFTW_LLM_ANSWER_CACHE_SIZE` entradas (512 por defecto) que vencen a
+los `OFTW_LLM_ANSWER_CACHE_TTL` segundos (un día por defecto). Con `OFTW_LLM_ANSWER_CACHE_FILE`
+(p.ej. `cache-dir/llm_answers.json`) las entradas se guardan además en un archivo JSON y se
+recuperan al reiniciar. `stats()` entrega los contadores de aciertos y fallos.
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from log_config import get_logger
+
+logger = get_logger(__name__)
+
+ANSWER_CACHE_SIZE = int(os.getenv("OFTW_LLM_ANSWER_CACHE_SIZE", "512"))
+ANSWER_CACHE_TTL = float(os.getenv("OFTW_LLM_ANSWER_CACHE_TTL", str(24 * 3600)))
+# Archivo de persistencia (vacío = solo en memoria), p.ej. cache-dir/llm_answers.json
+ANSWER_CACHE_FILE = os.getenv("OFTW_LLM_ANSWER_CACHE_FILE", "")
+
+
+def normalize_question(question: str) -> str:
+    """
+    Forma canónica de una pregunta: minúsculas, espacios colapsados y sin puntuación final.
+
+    :param question: Pregunta tal como la escribió el usuario.
+    :return: Pregunta normalizada.
+    """
+    return re.sub(r"\s+", " ", question).strip().casefold().rstrip("?!.¿¡ ")
+
+
+def filter_fingerprint(selected_years, selected_portfolios, year_mode) -> str:
+    """
+    Huella de los filtros independiente del orden de selección (None y [] son equivalentes).
+
+    :return: Cadena JSON canónica.
+    """
+    return json.dumps({
+        "years": sorted(str(year) for year in selected_years or []),
+        "portfolios": sorted(selected_portfolios or []),
+        "year_mode": year_mode,
+    }, sort_keys=True)
+
+
+def answer_cache_key(question: str, selected_years, selected_portfolios, year_mode,
+                     context_text: str, model: str = "", prompt: str = "") -> str:
+    """
+    Clave de caché de una respuesta.
+
+    :param question: Pregunta del usuario.
+    :param selected_years: Años seleccionados.
+    :param selected_portfolios: Portfolios seleccionados.
+    :param year_mode: 'calendar' o 'fiscal'.
+    :param context_text: Contexto de datos enviado al modelo (ver `create_rich_context`).
+    :param model: Modelo que responde.
+    :param prompt: Prompt de sistema.
+    :return: Hash sha256 de los componentes.
+    """
+    parts = [
+        normalize_question(question),
+        filter_fingerprint(selected_years, selected_portfolios, year_mode),
+        hashlib.sha256(context_text.encode()).hexdigest(),
+        model,
+        hashlib.sha256(prompt.encode()).hexdigest(),
+    ]
+    return hashlib.sha256("\x1f".join(parts).encode()).hexdigest()
+
+
+class AnswerCache:
+    """LRU con vencimiento por antigüedad y persistencia opcional en un archivo JSON."""
+
+    def __init__(self, max_entries: int = ANSWER_CACHE_SIZE, ttl: float = ANSWER_CACHE_TTL,
+                 path: str = ANSWER_CACHE_FILE):
+        """
+        :param max_entries: Respuestas que se conservan (se descarta la usada hace más tiempo).
+        :param ttl: Segundos de vigencia de cada respuesta.
+        :param path: Archivo JSON de persistencia, o vacío para no persistir.
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.path = path
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "expired": 0}
+        if path:
+            self._load()
+
+    def get(self, key: str):
+        """
+        :param key: Clave (ver `answer_cache_key`).
+        :return: Respuesta guardada o None si no existe o venció.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.time() - entry[1] > self.ttl:
+                del self._entries[key]
+                self._stats["expired"] += 1
+                entry = None
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return entry[0]
+
+    def set(self, key: str, answer: str) -> None:
+        """
+        Guarda una respuesta (y el archivo de persistencia, si está configurado).
+
+        :param key: Clave (ver `answer_cache_key`).
+        :param answer: Respuesta del modelo.
+        """
+        with self._lock:
+            self._entries[key] = (answer, time.time())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+            entries = list(self._entries.items())
+        if self.path:
+            self._save(entries)
+
+    def stats(self) -> dict:
+        """Contadores de hits, misses, descartes y vencidas, más el tamaño actual."""
+        with self._lock:
+            return {**self._stats, "size": len(self._entries)}
+
+    def _load(self) -> None:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                stored = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.warning(f"No se pudo leer el caché de respuestas {self.path}: {e}")
+            return
+
+        now = time.time()
+        fresh = sorted(((key, (answer, stored_at)) for key, (answer, stored_at) in stored.items()
+                        if now - stored_at <= self.ttl), key=lambda item: item[1][1])
+        self._entries.update(fresh[-self.max_entries:])
+        logger.info(f"Caché de respuestas: {len(self._entries)} respuestas recuperadas de {self.path}.")
+
+    def _save(self, entries: list) -> None:
+        tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({key: [answer, stored_at] for key, (answer, stored_at) in entries}, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f"No se pudo guardar el caché de respuestas {self.path}: {e}")
@@ -0,0 +1,381 @@
+"""
+Suite de benchmarks de la ingesta, las métricas, el filtrado y los callbacks de los dashboards.
+
+Para cada tamaño genera (una vez, ver `src.data_ingestion.synthetic`) un dataset sintético con la
+semilla dada y mide:
+ - la lectura de los JSON y `clean_data`;
+ - cada función de `money_metrics`, `performance_metrics`, `objectics_metrics` y `financial` sobre los
+   datos completos;
+ - `get_filtered_data` y cada callback registrado de los dashboards (vía `/_dash-update-component`,
+   sin filtros), con el caché vacío (cold) y con el caché caliente (warm);
+ - los callbacks de Chat LLM contra `src.utils.fake_openai_server` (levantado en un hilo, sin
+   demoras, como en `src.utils.load_test`): el envío de una pregunta (`run_chat_llm`), la respuesta
+   completa (envío, trabajo del LLM y `poll_chat_llm`) y `restore_chat_history`. Cada pregunta es
+   distinta, para no medir aciertos del caché de respuestas, y se miden con el caché caliente (el
+   historial vive en el caché).
+
+Los datos sintéticos se publican como versión activa (`data_versions.publish`), así que los
+callbacks corren sobre ellos sin tocar data/. El caché configurado se vacía entre mediciones.
+
+De cada caso se reporta la mediana y el mínimo del tiempo de pared, el pico de memoria asignada
+durante una ejecución (tracemalloc) y las filas procesadas por segundo. Los resultados se guardan
+en JSON y se comparan con un baseline guardado: un caso es una regresión si su mediana supera la del
+baseline en más de `--tolerance` (y en más de 1 ms).
+
+Uso:
+    python -m src.utils.benchmark --sizes 10k,100k,1M --save-baseline
+    python -m src.utils.benchmark --sizes 10k,100k,1M
+"""
+
+import argparse
+import itertools
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from log_config import get_logger
+
+logger = get_logger(__name__)
+
+BENCHMARK_DIR = Path(__file__).parent.parent.parent / 'cache-dir' / 'benchmarks'
+RESULTS_FILE = BENCHMARK_DIR / "results.json"
+BASELINE_FILE = BENCHMARK_DIR / "baseline.json"
+
+# Diferencia mínima (ms) para considerar una regresión: por debajo, es ruido de medición
+NOISE_FLOOR_MS = 1.0
+
+
+def measure(fn, repeat: int, setup=None) -> dict:
+    """
+    Mide una función: `repeat` ejecuciones cronometradas y una más con tracemalloc.
+
+    :param fn: Función sin argumentos.
+    :param repeat: Ejecuciones cronometradas.
+    :param setup: Función que se llama antes de cada ejecución, fuera del tiempo medido.
+    :return: {"median_ms", "min_ms", "peak_mb"}.
+    """
+    times = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+
+    if setup:
+        setup()
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"median_ms": statistics.median(times), "min_ms": min(times), "peak_mb": peak / (1024 * 1024)}
+
+
+def dataset_dir(rows: int, seed: int) -> Path:
+    """
+    Directorio del dataset sintético de un tamaño y semilla; lo genera si no existe.
+
+    :param rows: Número de pagos.
+    :param seed: Semilla.
+    :return: Directorio con los JSON de payments y pledges.
+    """
+    from src.data_ingestion.synthetic import generate_dataset
+
+    path = BENCHMARK_DIR / "data" / f"seed{seed}-{rows}"
+    if not (path / "one-for-the-world-pledges.json").exists():
+        generate_dataset(rows, seed=seed, out_dir=path)
+    return path
+
+
+def start_fake_llm() -> str:
+    """
+    Levanta `src.utils.fake_openai_server` sin demoras en un hilo y apunta el cliente de OpenAI a él.
+    Debe llamarse antes de importar la app: el cliente toma OPENAI_BASE_URL al crearse.
+
+    :return: URL base de la API falsa.
+    """
+    from werkzeug.serving import make_server
+    from src.utils.fake_openai_server import create_app
+
+    # Sin una línea de log por request de la API falsa
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    llm_server = make_server("127.0.0.1", 0, create_app(delay=0, token_delay=0), threaded=True)
+    threading.Thread(target=llm_server.serve_forever, name="fake-llm", daemon=True).start()
+    base_url = f"http://127.0.0.1:{llm_server.server_port}/v1"
+    os.environ["OPENAI_BASE_URL"] = base_url
+    os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+    return base_url
+
+
+def chat_body(app, trigger: str, values: dict) -> dict:
+    """
+    Cuerpo de `/_dash-update-component` del callback que dispara `trigger` ("id.propiedad").
+
+    :param values: Valores de entradas y estados {"id.propiedad": valor} (los que falten van como None).
+    """
+    from src.utils.load_test import callback_body
+
+    for output, spec in app.callback_map.items():
+        if trigger in (f"{i['id']}.{i['property']}" for i in spec["inputs"]):
+            return callback_body({**spec, "output": output}, values, [trigger])
+    raise KeyError(f"Ningún callback tiene la entrada {trigger}")
+
+
+def metric_cases(payments_df: pd.DataFrame, pledges_df: pd.DataFrame) -> list:
+    """
+    Casos de las funciones de métricas sobre los datos completos.
+
+    :return: Lista de (grupo, nombre, filas de entrada, función).
+    """
+    from src.metrics_calculations import money_metrics as mm
+    from src.metrics_calculations import objectics_metrics as om
+    from src.metrics_calculations import performance_metrics as pm
+    from src.metrics_calculations.money_cube import build_money_cube
+    from src.utils import financial as fin
+
+    n_pay, n_pl = len(payments_df), len(pledges_df)
+    return [
+        ("money_metrics", "build_money_cube", n_pay + n_pl, lambda: build_money_cube(payments_df, pledges_df)),
+        ("money_metrics", "calculate_money_moved", n_pay, lambda: mm.calculate_money_moved(payments_df)),
+        ("money_metrics", "calculate_counterfactual_money_moved", n_pay,
+         lambda: mm.calculate_counterfactual_money_moved(payments_df)),
+        ("money_metrics", "calculate_money_moved_by_platform", n_pay,
+         lambda: mm.calculate_money_moved_by_platform(payments_df)),
+        ("money_metrics", "calculate_money_moved_by_donation_type", n_pay + n_pl,
+         lambda: mm.calculate_money_moved_by_donation_type(payments_df, pledges_df)),
+        ("money_metrics", "calculate_money_moved_by_source", n_pay + n_pl,
+         lambda: mm.calculate_money_moved_by_source(payments_df, pledges_df)),
+        ("money_metrics", "calculate_accumulated_money_moved", n_pay,
+         lambda: mm.calculate_accumulated_money_moved(payments_df, "fiscal")),
+        ("performance_metrics", "calculate_all_pledges", n_pl, lambda: pm.calculate_all_pledges(pledges_df)),
+        ("performance_metrics", "calculate_future_pledges", n_pl, lambda: pm.calculate_future_pledges(pledges_df)),
+        ("performance_metrics", "calculate_monthly_churn_series", n_pl,
+         lambda: pm.calculate_monthly_churn_series(pledges_df)),
+        ("performance_metrics", "calculate_monthly_attrition_rate", n_pl,
+         lambda: pm.calculate_monthly_attrition_rate(pledges_df)),
+        ("performance_metrics", "calculate_breakdown_by_channel", n_pl,
+         lambda: pm.calculate_breakdown_by_channel(pledges_df)),
+        ("objectics_metrics", "calculate_total_active_donors", n_pl,
+         lambda: om.calculate_total_active_donors(pledges_df)),
+        ("objectics_metrics", "calculate_chapter_arr", n_pl, lambda: om.calculate_chapter_arr(pledges_df)),
+        ("financial", "calculate_arr", n_pl, lambda: fin.calculate_arr(pledges_df, ["Active donor", "Pledged donor"])),
+        ("financial", "calculate_active_arr", n_pl, lambda: fin.calculate_active_arr(pledges_df)),
+        ("financial", "calculate_pledge_attrition_rate", n_pl, lambda: fin.calculate_pledge_attrition_rate(pledges_df)),
+        ("financial", "classify_donation_types", n_pay,
+         lambda: fin.classify_donation_types(payments_df["frequency"])),
+    ]
+
+
+def run_size(rows: int, seed: int, repeat: int) -> list:
+    """
+    Ejecuta todos los casos sobre el dataset sintético de un tamaño.
+
+    :param rows: Número de pagos.
+    :param seed: Semilla del dataset.
+    :param repeat: Ejecuciones cronometradas por caso.
+    :return: Lista de resultados (un diccionario por caso).
+    """
+    from main import app, server
+    from src.data_ingestion.data_loader import data_versions
+    from src.data_ingestion.data_read import load_json_to_dataframe
+    from src.data_ingestion.data_transform import clean_data
+    from src.utils.cache import cache
+    from src.utils.callbacks_filter import get_filtered_data
+    from src.utils.filtering import get_available_years
+    from src.utils.thread_stress import build_requests
+
+    # Sin vigía: volvería a publicar la versión de data/ en la siguiente revisión
+    data_versions.interval = 0
+    path = dataset_dir(rows, seed)
+    files = {"payments": path / "one-for-the-world-payments.json",
+             "pledges": path / "one-for-the-world-pledges.json"}
+
+    def clear_cache():
+        with server.app_context():
+            cache.clear()
+
+    results = []
+
+    def record(group, name, n_rows, fn, setup=None):
+        stats = measure(fn, repeat, setup)
+        results.append({"size": rows, "group": group, "name": name, "rows": n_rows, **stats,
+                        "rows_per_s": n_rows / stats["median_ms"] * 1000 if stats["median_ms"] else None})
+        logger.info(f"[{rows}] {group}/{name}: {stats['median_ms']:.1f} ms, {stats['peak_mb']:.1f} MB")
+
+    # Ingesta
+    raw = {name: load_json_to_dataframe(file) for name, file in files.items()}
+    n_raw = sum(len(df) for df in raw.values())
+    record("ingestion", "read_json", n_raw, lambda: {name: load_json_to_dataframe(file) for name, file in files.items()})
+    record("ingestion", "clean_data", n_raw, lambda: clean_data(raw))
+
+    # Versión de datos sintética (de solo lectura, como en la app)
+    version = data_versions.publish(f"bench-seed{seed}-{rows}", clean_data(raw))
+    payments_df, pledges_df = version.dfs["payments"], version.dfs["pledges"]
+    n_rows = len(payments_df) + len(pledges_df)
+
+    for group, name, n, fn in metric_cases(payments_df, pledges_df):
+        record(group, name, n, fn)
+
+    # Filtrado (memoizado: se mide con el caché vacío)
+    last_year = get_available_years(payments_df)[-1]
+    portfolios = sorted(payments_df["portfolio"].dropna().unique())[:2]
+    filter_cases = {"all": (None, None, "fiscal"), "year": ([last_year], None, "fiscal"),
+                    "year_portfolio": ([last_year], portfolios, "fiscal")}
+    for label, filters in filter_cases.items():
+        with server.app_context():
+            record("filtering", f"get_filtered_data[{label}]", n_rows, lambda: get_filtered_data(*filters),
+                   setup=clear_cache)
+
+    # Callbacks de los dashboards, sin filtros (el caso más pesado)
+    client = server.test_client()
+
+    def post(body):
+        response = client.post("/_dash-update-component", json=body)
+        if response.status_code not in (200, 204):
+            raise RuntimeError(f"HTTP {response.status_code} en {body['output']}")
+
+    for body in build_requests(app, [(None, None, "fiscal")]):
+        # Callbacks con varias salidas: la primera y cuántas más
+        outputs = body["output"].strip(".").split("...")
+        name = outputs[0] + (f"+{len(outputs) - 1}" if len(outputs) > 1 else "")
+        if body["changedPropIds"] == ["url.pathname"]:
+            name = f"{name}[{body['inputs'][0]['value']}]"
+        record("callbacks", f"{name}:cold", n_rows, lambda: post(body), setup=clear_cache)
+        record("callbacks", f"{name}:warm", n_rows, lambda: post(body))
+
+    # Chat LLM (servidor falso, ver `start_fake_llm`), en una sesión de chat propia
+    from src.callbacks.chat_llm_callbacks import llm_jobs
+    from src.utils.chat_history import CHAT_SESSION_COOKIE
+    from src.utils.job_queue import FINAL_STATES
+
+    client.set_cookie(CHAT_SESSION_COOKIE, f"benchmark-{rows}")
+    filters = {"year-filter.value": None, "portfolio-filter.value": None, "year-mode.value": "fiscal"}
+    questions = itertools.count(1)
+    pending = []
+
+    def submit():
+        n = next(questions)
+        body = chat_body(app, "chat-llm-submit.n_clicks", {
+            **filters, "chat-llm-submit.n_clicks": n, "chat-llm-job.data": None,
+            "chat-llm-input.value": f"What is the total money moved? (benchmark #{n})"})
+        response = client.post("/_dash-update-component", json=body)
+        if response.status_code != 200:
+            raise RuntimeError(f"HTTP {response.status_code} en run_chat_llm")
+        job_id = response.get_json()["response"]["chat-llm-job"]["data"]
+        pending.append(job_id)
+        return job_id
+
+    def wait_for_jobs():
+        while pending:
+            job = llm_jobs.get(pending[-1])
+            if job is None or job["status"] in FINAL_STATES:
+                pending.pop()
+            else:
+                time.sleep(0.001)
+
+    def answer():
+        job_id = submit()
+        wait_for_jobs()
+        post(chat_body(app, "chat-llm-stream-end.data", {"chat-llm-stream-end.data": job_id,
+                                                         "chat-llm-job.data": job_id}))
+
+    record("chat", "run_chat_llm:submit", n_rows, submit, setup=wait_for_jobs)
+    record("chat", "run_chat_llm+poll_chat_llm:answer", n_rows, answer, setup=wait_for_jobs)
+    record("chat", "restore_chat_history", 1, lambda: post(chat_body(app, "chat-llm-restore.data", {})))
+    wait_for_jobs()
+
+    clear_cache()
+    return results
+
+
+def compare(results: list, baseline: list, tolerance: float) -> list:
+    """
+    Compara resultados con un baseline.
+
+    :param results: Resultados actuales.
+    :param baseline: Resultados del baseline.
+    :param tolerance: Aumento relativo de la mediana tolerado (0.25 = 25%).
+    :return: Resultados con `baseline_ms`, `ratio` y `regression` (si el caso está en el baseline).
+    """
+    reference = {(r["size"], r["group"], r["name"]): r for r in baseline}
+    compared = []
+    for result in results:
+        base = reference.get((result["size"], result["group"], result["name"]))
+        if base is not None and base["median_ms"] > 0:
+            ratio = result["median_ms"] / base["median_ms"]
+            result = {**result, "baseline_ms": base["median_ms"], "ratio": ratio,
+                      "regression": ratio > 1 + tolerance
+                      and result["median_ms"] - base["median_ms"] > NOISE_FLOOR_MS}
+        compared.append(result)
+    return compared
+
+
+def environment() -> dict:
+    """Versiones y commit con que se obtuvieron los resultados."""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {"timestamp": datetime.now().isoformat(timespec="seconds"), "commit": commit,
+            "python": platform.python_version(), "pandas": pd.__version__, "numpy": np.__version__,
+            "platform": platform.platform(), "cache_backend": os.getenv("OFTW_CACHE_BACKEND", "simple")}
+
+
+def print_report(results: list) -> None:
+    """Tabla de resultados (con la comparación contra el baseline, si la hay)."""
+    print(f"{'size':>9} {'case':<64} {'median ms':>10} {'peak MB':>8} {'rows/s':>12} {'vs base':>8}")
+    for r in results:
+        versus = f"{r['ratio']:.2f}x" if "ratio" in r else "-"
+        flag = "  REGRESSION" if r.get("regression") else ""
+        rows_per_s = f"{r['rows_per_s']:,.0f}" if r["rows_per_s"] else "-"
+        print(f"{r['size']:>9} {r['group'] + '/' + r['name']:<64.64} {r['median_ms']:>10.1f} "
+              f"{r['peak_mb']:>8.1f} {rows_per_s:>12} {versus:>8}{flag}")
+
+
+if __name__ == "__main__":
+    from src.data_ingestion.synthetic import parse_size
+
+    parser = argparse.ArgumentParser(description="Benchmarks de ingesta, métricas, filtrado y callbacks.")
+    parser.add_argument("--sizes", default="10k,100k,1M", help="Pagos de cada dataset sintético, separados por comas.")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=3, help="Ejecuciones cronometradas por caso.")
+    parser.add_argument("--output", default=str(RESULTS_FILE), help="Archivo JSON de resultados.")
+    parser.add_argument("--baseline", default=str(BASELINE_FILE), help="Baseline con el que se compara.")
+    parser.add_argument("--save-baseline", action="store_true", help="Guarda los resultados como baseline.")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Aumento relativo tolerado (0.25 = 25%%).")
+    args = parser.parse_args()
+
+    sizes = [parse_size(size) for size in args.sizes.split(",")]
+    start_fake_llm()
+    results = [result for rows in sizes for result in run_size(rows, args.seed, args.repeat)]
+
+    baseline_path = Path(args.baseline)
+    if baseline_path.exists() and not args.save_baseline:
+        with open(baseline_path, encoding="utf-8") as f:
+            results = compare(results, json.load(f)["results"], args.tolerance)
+
+    report = {"environment": environment(), "seed": args.seed, "repeat": args.repeat, "results": results}
+    for path in [Path(args.output)] + ([baseline_path] if args.save_baseline else []):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    print_report(results)
+    regressions = [r for r in results if r.get("regression")]
+    print(f"\nResultados en {args.output}" + (f"; baseline guardado en {baseline_path}" if args.save_baseline else ""))
+    if regressions:
+        print(f"{len(regressions)} regresiones respecto de {baseline_path}.")
+    sys.exit(1 if regressions else 0)
@@ -1,9 +1,24 @@
+import os
 from flask_caching import Cache
 
-from flask_caching import Cache
+# Backend de caché: 'simple' (por proceso, por defecto), 'filesystem' (compartido entre workers del
+# host) o 'redis'. Con más de un worker gunicorn usa 'filesystem' si no se indica otro (gunicorn_config.py)
+CACHE_BACKEND = os.getenv("OFTW_CACHE_BACKEND", "simple")
+
+CACHE_TYPES = {
+    "simple": "SimpleCache",
+    "filesystem": "src.utils.cache_backends.DataFrameFileSystemCache",
+    "redis": "src.utils.cache_backends.DataFrameRedisCache",
+}
 
 cache = Cache(config={
-    'CACHE_TYPE': 'simple',
-    'CACHE_DIR': 'cache-dir',
+    'CACHE_TYPE': CACHE_TYPES[CACHE_BACKEND],
+    'CACHE_DIR': 'cache-dir/flask',
+    'CACHE_THRESHOLD': 5000,
+    'CACHE_REDIS_URL': os.getenv("OFTW_CACHE_REDIS_URL", "redis://localhost:6379/0"),
     "CACHE_DEFAULT_TIMEOUT": 300
 })
+
+# Las entradas indexadas por huella de datos no caducan: una versión nueva de los datos usa claves
+# nuevas y las anteriores salen por CACHE_THRESHOLD
+VERSIONED_TIMEOUT = 0
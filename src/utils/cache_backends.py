@@ -0,0 +1,113 @@
+"""
+Backends de caché compartidos entre workers de gunicorn, con serialización eficiente de DataFrames.
+
+Los DataFrames dentro de los valores cacheados (dicts, tuplas, etc.) se serializan como Arrow IPC
+en lugar de pickle, lo que evita recorrer columnas de texto objeto por objeto.
+"""
+
+import io
+import os
+import pickle
+import struct
+import tempfile
+import pandas as pd
+import pyarrow as pa
+from cachelib.serializers import BaseSerializer
+from flask_caching.backends.filesystemcache import FileSystemCache
+from flask_caching.backends.rediscache import RedisCache
+
+
+def dataframe_to_ipc(df: pd.DataFrame) -> bytes:
+    """Serializa un DataFrame (incluido su índice) en formato Arrow IPC."""
+    table = pa.Table.from_pandas(df, preserve_index=True)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def dataframe_from_ipc(data: bytes) -> pd.DataFrame:
+    """Reconstruye un DataFrame desde bytes Arrow IPC."""
+    return pa.ipc.open_stream(data).read_all().to_pandas()
+
+
+class _DataFramePickler(pickle.Pickler):
+    """Pickler que delega los DataFrames a Arrow IPC."""
+
+    def persistent_id(self, obj):
+        if isinstance(obj, pd.DataFrame):
+            return "arrow-ipc", dataframe_to_ipc(obj)
+        return None
+
+
+class _DataFrameUnpickler(pickle.Unpickler):
+    """Unpickler complementario de `_DataFramePickler`."""
+
+    def persistent_load(self, pid):
+        kind, data = pid
+        if kind != "arrow-ipc":
+            raise pickle.UnpicklingError(f"Objeto persistente desconocido: {kind}")
+        return dataframe_from_ipc(data)
+
+
+class DataFrameSerializer(BaseSerializer):
+    """Serializador de cachelib que usa Arrow IPC para los DataFrames y pickle para el resto."""
+
+    def dumps(self, value, protocol: int = pickle.HIGHEST_PROTOCOL) -> bytes:
+        buffer = io.BytesIO()
+        self.dump(value, buffer, protocol)
+        return buffer.getvalue()
+
+    def dump(self, value, f, protocol: int = pickle.HIGHEST_PROTOCOL) -> None:
+        try:
+            _DataFramePickler(f, protocol).dump(value)
+        except (pickle.PickleError, pa.ArrowException) as e:
+            self._warn(e)
+
+    def loads(self, bvalue: bytes):
+        if bvalue is None:
+            return None
+        return self.load(io.BytesIO(bvalue))
+
+    def load(self, f):
+        try:
+            return _DataFrameUnpickler(f).load()
+        except (pickle.PickleError, pa.ArrowException) as e:
+            self._warn(e)
+            return None
+
+
+class DataFrameFileSystemCache(FileSystemCache):
+    """Caché en disco compartida por todos los workers de un mismo host."""
+
+    serializer = DataFrameSerializer()
+
+    def add(self, key: str, value, timeout=None) -> bool:
+        """
+        Como `set`, pero solo si la clave no existe. El archivo se publica con `os.link`, que falla
+        si otro proceso lo creó primero, de modo que sirve como lock entre workers.
+        """
+        filename = self._get_filename(key)
+        if os.path.exists(filename) and not self.has(key):
+            # Entrada vencida: se descarta para poder volver a tomarla
+            self.delete(key)
+
+        fd, tmp = tempfile.mkstemp(suffix=self._fs_transaction_suffix, dir=self._path)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(struct.pack("I", self._normalize_timeout(timeout)))
+                self.serializer.dump(value, f)
+            os.link(tmp, filename)
+        except OSError:
+            return False
+        finally:
+            os.unlink(tmp)
+
+        self._update_count(delta=1)
+        return True
+
+
+class DataFrameRedisCache(RedisCache):
+    """Caché Redis (o cualquier servidor compatible con el protocolo) compartida entre hosts."""
+
+    serializer = DataFrameSerializer()
@@ -1,45 +1,113 @@
-from src.data_ingestion.data_loader import load_clean_data
-from src.utils.filtering import get_date_ranges_from_years, filter_dataframe
-from src.utils.cache import cache
+import threading
+from src.data_ingestion.data_loader import data_versions, load_clean_data_version
+from src.data_ingestion.snapshot import MONEY_CUBE_FRAME, load_snapshot_frame, write_snapshot_frame
+from src.metrics_calculations.money_cube import build_money_cube, filter_money_cube
+from src.utils.filtering import get_date_ranges_from_years
+from src.utils.filter_engine import DateIndexedFrame
+from src.utils.cache import VERSIONED_TIMEOUT
+from src.utils.single_flight import single_flight_memoize
 
-@cache.memoize(timeout=300)
-def get_filtered_data(selected_years, selected_portfolios, year_mode):
-    """
-    Retorna payments_df y pledges_df ya filtrados según los filtros recibidos.
-    Está memoizado, de modo que si se llama repetidamente con los mismos
-    parámetros, no vuelve a recalcular.
-    """
-    dfs = load_clean_data()  # Este también está cacheado, así que es doble capa de caching
+# Motores de filtrado de las versiones en memoria (activa y anterior): {huella: (payments, pledges)}
+_filter_engines = {}
+# Lo modifican los hilos de los requests y el que construye las versiones nuevas
+_filter_engines_lock = threading.Lock()
+
+
+def _index_frames(dfs: dict):
+    """Indexa payments y pledges por fecha; retorna (None, None) si faltan datos."""
     payments_df = dfs.get("payments", None)
     pledges_df = dfs.get("pledges", None)
+    if payments_df is None or pledges_df is None or payments_df.empty or pledges_df.empty:
+        return None, None
+    return DateIndexedFrame(payments_df, "date"), DateIndexedFrame(pledges_df, "pledge_created_at")
+
+
+def _remember_engines(fingerprint: str, engines) -> None:
+    """Guarda los motores de una versión conservando solo los de los dos buffers de datos."""
+    with _filter_engines_lock:
+        _filter_engines[fingerprint] = engines
+        while len(_filter_engines) > 2:
+            _filter_engines.pop(next(iter(_filter_engines)))
+
+
+def get_filter_engines(fingerprint: str):
+    """
+    Retorna los DataFrames de payments y pledges indexados por fecha para una versión de datos.
+    Se construyen una vez por proceso y versión (normalmente antes de publicarla).
+    """
+    with _filter_engines_lock:
+        engines = _filter_engines.get(fingerprint)
+    if engines is None:
+        version = data_versions.get(fingerprint)
+        dfs = version.dfs if version is not None else load_clean_data_version(fingerprint)
+        engines = _index_frames(dfs)
+        if engines[0] is not None:
+            _remember_engines(fingerprint, engines)
+    return engines
+
+
+# Las versiones nuevas se publican con sus índices ya construidos
+data_versions.add_warmup(lambda version: _remember_engines(version.fingerprint, _index_frames(version.dfs)))
+
+
+@single_flight_memoize(timeout=VERSIONED_TIMEOUT)
+def get_filtered_data_version(fingerprint, selected_years, selected_portfolios, year_mode):
+    """
+    Retorna payments_df y pledges_df de una versión de datos, filtrados según los filtros recibidos.
+    Está memoizado por (huella, filtros): la entrada es válida mientras la versión exista.
+    """
+    payments_engine, pledges_engine = get_filter_engines(fingerprint)
 
-    if payments_df is None or pledges_df is None:
+    if payments_engine is None or pledges_engine is None:
         return (None, None)
 
-    # 1) Filtrar payments por fechas:
-    if selected_years:
-        date_ranges = get_date_ranges_from_years(selected_years, year_mode)
-        mask = False
-        for (start_dt, end_dt) in date_ranges:
-            mask |= (payments_df["date"] >= start_dt) & (payments_df["date"] <= end_dt)
-        payments_df = payments_df[mask]
-
-    # 2) Filtrar payments por portfolio
-    if selected_portfolios:
-        payments_df = filter_dataframe(payments_df, {"portfolio": selected_portfolios})
-
-    # 3) Filtrar pledges por fecha (si corresponde)
-    if selected_years:
-        p_mask = False
-        for (start_dt, end_dt) in date_ranges:
-            p_mask |= (
-                (pledges_df["pledge_created_at"] >= start_dt)
-                & (pledges_df["pledge_created_at"] <= end_dt)
-            )
-        pledges_df = pledges_df[p_mask]
+    date_ranges = get_date_ranges_from_years(selected_years, year_mode) if selected_years else None
+
+    # 1) y 2) Filtrar payments por fechas (searchsorted) y por portfolio (bitmap de códigos)
+    payments_df = payments_engine.select(date_ranges, {"portfolio": selected_portfolios})
 
+    # 3) Filtrar pledges por fecha de creación (si corresponde)
     # 4) (Opcional) filtrar pledges por portfolio si tu lógica lo requiere
     #    p.ej. si el 'portfolio' no está en pledges, puedes hacer un merge
     #    o simplemente ignorarlo.
+    pledges_df = pledges_engine.select(date_ranges)
 
     return payments_df, pledges_df
+
+
+def get_filtered_data(selected_years, selected_portfolios, year_mode):
+    """
+    Retorna payments_df y pledges_df de la versión activa ya filtrados según los filtros recibidos.
+    Si se llama repetidamente con los mismos parámetros y la misma versión, no vuelve a recalcular.
+    """
+    return get_filtered_data_version(data_versions.current().fingerprint, selected_years, selected_portfolios,
+                                     year_mode)
+
+
+@single_flight_memoize(timeout=VERSIONED_TIMEOUT)
+def load_money_cube(fingerprint: str):
+    """
+    Construye el cubo de Money Moved sobre los datos completos de una versión.
+    Se calcula una vez por huella de datos y queda en el caché compartido y en el snapshot
+    (la ingesta incremental lo actualiza a partir del de la versión anterior).
+    """
+    cube = load_snapshot_frame(fingerprint, MONEY_CUBE_FRAME)
+    if cube is None:
+        version = data_versions.get(fingerprint)
+        dfs = version.dfs if version is not None else load_clean_data_version(fingerprint)
+        cube = build_money_cube(dfs.get("payments"), dfs.get("pledges"))
+        write_snapshot_frame(fingerprint, MONEY_CUBE_FRAME, cube)
+    return cube
+
+
+def get_filtered_money_cube(selected_years, selected_portfolios, year_mode, fingerprint: str = None):
+    """
+    Retorna el cubo de Money Moved filtrado según los filtros recibidos.
+    Los rangos de años (fiscal o calendario) están alineados a meses, por lo que
+    filtrar las celdas por mes equivale a filtrar los pagos por fecha.
+
+    :param fingerprint: Versión de datos a usar; por defecto la activa.
+    """
+    cube = load_money_cube(fingerprint or data_versions.current().fingerprint)
+    date_ranges = get_date_ranges_from_years(selected_years, year_mode) if selected_years else None
+    return filter_money_cube(cube, date_ranges, selected_portfolios)
@@ -0,0 +1,141 @@
+"""
+Historial del Chat LLM guardado en el servidor, por sesión del navegador.
+
+La sesión se identifica con una cookie; los mensajes se guardan en el caché compartido (así
+cualquier worker de gunicorn los ve) como texto plano, no como componentes. Los callbacks solo
+envían al navegador los mensajes nuevos (`dash.Patch`), de modo que el tamaño de cada request y
+respuesta no crece con la conversación; el historial completo se envía una vez, al abrir la página.
+
+Al abrir la página se muestran los últimos `OFTW_CHAT_HISTORY_MAX_MESSAGES` mensajes (100 por
+defecto), y el historial vence `OFTW_CHAT_HISTORY_TTL` segundos (una semana por defecto) después del
+último mensaje. Cada escritura toma un lock corto por sesión (un `add` atómico en el caché, como en
+single-flight), de modo que la pregunta y la respuesta no se pisan aunque se guarden desde hilos o
+workers distintos.
+"""
+
+import contextlib
+import os
+import threading
+import time
+import uuid
+from datetime import datetime
+from flask import has_request_context, request
+from dash import callback_context
+from log_config import get_logger
+from src.utils.cache import cache
+
+logger = get_logger(__name__)
+
+CHAT_SESSION_COOKIE = "oftw_chat_session"
+# Vigencia del historial (y de la cookie) desde el último mensaje
+CHAT_HISTORY_TTL = int(os.getenv("OFTW_CHAT_HISTORY_TTL", str(7 * 24 * 3600)))
+# Mensajes que se muestran al volver a abrir la página
+CHAT_HISTORY_MAX_MESSAGES = int(os.getenv("OFTW_CHAT_HISTORY_MAX_MESSAGES", "100"))
+# Vigencia máxima del lock de escritura entre workers (si el dueño muere, el lock vence solo) y
+# espera máxima para tomarlo
+HISTORY_LOCK_TIMEOUT = 5
+HISTORY_LOCK_POLL_INTERVAL = 0.01
+HISTORY_LOCK_STRIPES = 64
+
+# Las escrituras son leer-modificar-escribir de toda la lista: el mensaje del usuario y la respuesta
+# pueden guardarse desde hilos o workers distintos (callback y trabajo del LLM). En el proceso, cada
+# sesión usa uno de HISTORY_LOCK_STRIPES locks, para que sesiones distintas no se esperen entre sí
+_local_locks = [threading.Lock() for _ in range(HISTORY_LOCK_STRIPES)]
+
+
+def get_chat_session_id() -> str:
+    """
+    Id de la sesión de chat del navegador. Si aún no tiene, se crea y se envía la cookie en la
+    respuesta del callback en curso.
+
+    :return: Id de la sesión.
+    """
+    session_id = request.cookies.get(CHAT_SESSION_COOKIE) if has_request_context() else None
+    if session_id:
+        return session_id
+
+    session_id = uuid.uuid4().hex
+    try:
+        callback_context.response.set_cookie(CHAT_SESSION_COOKIE, session_id, max_age=CHAT_HISTORY_TTL,
+                                             httponly=True, samesite="Lax")
+    except (AttributeError, KeyError, RuntimeError):
+        pass
+    return session_id
+
+
+def _history_key(session_id: str) -> str:
+    return f"chat-history:{session_id}"
+
+
+@contextlib.contextmanager
+def _history_lock(session_id: str):
+    """
+    Excluye otras escrituras al historial de la sesión, en este proceso y entre workers.
+    Entrega True si se obtuvo el lock dentro de HISTORY_LOCK_TIMEOUT; si no, False y quien
+    lo usa no debe escribir.
+    """
+    lock_key = f"chat-history-lock:{session_id}"
+    local_lock = _local_locks[hash(session_id) % HISTORY_LOCK_STRIPES]
+    deadline = time.monotonic() + HISTORY_LOCK_TIMEOUT
+    if not local_lock.acquire(timeout=HISTORY_LOCK_TIMEOUT):
+        logger.warning(f"Se agotó la espera del lock del historial {session_id}; no se escribe.")
+        yield False
+        return
+    acquired = False
+    try:
+        acquired = cache.add(lock_key, os.getpid(), timeout=HISTORY_LOCK_TIMEOUT)
+        while not acquired and time.monotonic() < deadline:
+            time.sleep(HISTORY_LOCK_POLL_INTERVAL)
+            acquired = cache.add(lock_key, os.getpid(), timeout=HISTORY_LOCK_TIMEOUT)
+        if not acquired:
+            logger.warning(f"Se agotó la espera del lock del historial {session_id}; no se escribe.")
+        yield acquired
+    finally:
+        if acquired:
+            cache.delete(lock_key)
+        local_lock.release()
+
+
+def load_history(session_id: str) -> list:
+    """
+    :param session_id: Id de la sesión.
+    :return: Lista de mensajes {"role", "content", "time"} (vacía si no hay historial).
+    """
+    return cache.get(_history_key(session_id)) or []
+
+
+def trim_history(session_id: str, max_messages: int = CHAT_HISTORY_MAX_MESSAGES) -> list:
+    """
+    Descarta los mensajes más antiguos. Se llama solo al renderizar el historial completo, para que
+    lo guardado coincida siempre con lo que muestra la página.
+
+    :param session_id: Id de la sesión.
+    :param max_messages: Mensajes que se conservan.
+    :return: Mensajes conservados.
+    """
+    with _history_lock(session_id) as locked:
+        messages = load_history(session_id)
+        if len(messages) > max_messages:
+            messages = messages[-max_messages:]
+            # Sin el lock solo se recorta lo que se muestra; lo guardado se recorta la próxima vez
+            if locked:
+                cache.set(_history_key(session_id), messages, timeout=CHAT_HISTORY_TTL)
+    return messages
+
+
+def append_history(session_id: str, role: str, content: str) -> dict:
+    """
+    Agrega un mensaje al historial de la sesión. Si no se obtiene el lock a tiempo, el mensaje
+    no se guarda (se muestra igual en la página) en vez de pisar una escritura concurrente.
+
+    :param session_id: Id de la sesión.
+    :param role: 'user' o 'assistant'.
+    :param content: Texto del mensaje.
+    :return: Mensaje guardado.
+    """
+    message = {"role": role, "content": content, "time": datetime.now().strftime("%H:%M")}
+    with _history_lock(session_id) as locked:
+        if locked:
+            messages = load_history(session_id) + [message]
+            cache.set(_history_key(session_id), messages, timeout=CHAT_HISTORY_TTL)
+    return message
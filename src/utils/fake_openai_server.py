@@ -0,0 +1,95 @@
+"""
+Servidor local compatible con la API de Chat Completions de OpenAI, para probar la página Chat LLM
+sin costo ni red.
+
+Responde con un texto fijo que repite la pregunta, después de una demora configurable. Con
+`"stream": true` emite la respuesta palabra por palabra como eventos SSE (igual que la API real),
+con una demora configurable entre palabras.
+
+Uso:
+    python -m src.utils.fake_openai_server --port 8090 --delay 0.3 --token-delay 0.05
+    OPENAI_BASE_URL=http://127.0.0.1:8090/v1 OPENAI_API_KEY=sk-local python main.py
+"""
+
+import argparse
+import json
+import re
+import time
+import uuid
+from flask import Flask, Response, jsonify, request
+
+
+def fake_answer(messages: list) -> str:
+    """Respuesta determinista a partir del último mensaje del usuario."""
+    question = messages[-1]["content"].rsplit("User Question:\n", 1)[-1] if messages else ""
+    return (f"This is a local test answer to: {question.strip()}\n\n"
+            "It is generated by the fake OpenAI-compatible server, one word at a time when streaming, "
+            "so the chat page can be tested without network access or API costs.")
+
+
+def stream_chunks(completion_id: str, model: str, answer: str, delay: float, token_delay: float):
+    """Eventos SSE en el formato `chat.completion.chunk` de OpenAI."""
+    def chunk(delta: dict, finish_reason=None) -> str:
+        payload = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+        }
+        return f"data: {json.dumps(payload)}\n\n"
+
+    time.sleep(delay)
+    yield chunk({"role": "assistant", "content": ""})
+    for token in re.findall(r"\S+\s*", answer):
+        yield chunk({"content": token})
+        time.sleep(token_delay)
+    yield chunk({}, finish_reason="stop")
+    yield "data: [DONE]\n\n"
+
+
+def create_app(delay: float = 1.0, token_delay: float = 0.05) -> Flask:
+    """
+    Crea la app del servidor falso.
+
+    :param delay: Segundos de espera antes de responder (o antes del primer fragmento).
+    :param token_delay: Segundos entre palabras en modo streaming.
+    """
+    app = Flask(__name__)
+
+    @app.post("/v1/chat/completions")
+    def chat_completions():
+        body = request.get_json(force=True)
+        answer = fake_answer(body.get("messages", []))
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        if body.get("stream"):
+            return Response(stream_chunks(completion_id, body.get("model", "fake"), answer, delay, token_delay),
+                            mimetype="text/event-stream")
+
+        time.sleep(delay)
+        return jsonify({
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "fake"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": answer},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": 0, "completion_tokens": len(answer.split()), "total_tokens": 0},
+        })
+
+    return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servidor local compatible con OpenAI Chat Completions.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--delay", type=float, default=1.0, help="Segundos de espera antes de responder.")
+    parser.add_argument("--token-delay", type=float, default=0.05,
+                        help="Segundos entre palabras en modo streaming.")
+    args = parser.parse_args()
+
+    create_app(args.delay, args.token_delay).run(host=args.host, port=args.port, threaded=True)
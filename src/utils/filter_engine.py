@@ -0,0 +1,137 @@
+"""
+Motor de filtrado indexado para payments y pledges.
+
+Cada DataFrame se ordena una sola vez por su columna de fecha; los filtros por año se resuelven con
+`searchsorted` sobre ese orden (O(log n + k)) y la pertenencia a portfolios con un bitmap sobre los
+códigos de la columna categórica, sin construir máscaras sobre todas las filas ni strings de query.
+
+Uso del benchmark:
+    python -m src.utils.filter_engine 10000 100000 1000000 10000000
+"""
+
+import numpy as np
+import pandas as pd
+from log_config import get_logger
+from src.utils.read_only import freeze_frame
+
+logger = get_logger(__name__)
+
+
+def merge_date_ranges(date_ranges: list) -> list:
+    """Une rangos (start, end) superpuestos para que ninguna fila se seleccione dos veces."""
+    merged = []
+    for start_dt, end_dt in sorted(date_ranges):
+        if merged and start_dt <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end_dt))
+        else:
+            merged.append((start_dt, end_dt))
+    return merged
+
+
+def isin_mask(series: pd.Series, values) -> np.ndarray:
+    """
+    Máscara booleana de pertenencia. En columnas categóricas se evalúa un bitmap sobre los
+    códigos enteros; en el resto se usa `isin`.
+
+    :param series: Columna a evaluar.
+    :param values: Valores aceptados.
+    :return: Arreglo booleano del largo de la serie.
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        categories = series.cat.categories
+        # Posición extra (falsa) para el código -1 de los nulos
+        bitmap = np.zeros(len(categories) + 1, dtype=bool)
+        positions = categories.get_indexer(list(values))
+        bitmap[positions[positions >= 0]] = True
+        return bitmap[series.cat.codes.to_numpy()]
+    return series.isin(values).to_numpy()
+
+
+class DateIndexedFrame:
+    """DataFrame ordenado por una columna de fecha, con slicing por rangos en O(log n + k)."""
+
+    def __init__(self, df: pd.DataFrame, date_col: str):
+        """
+        :param df: DataFrame a indexar (no se modifica).
+        :param date_col: Columna datetime por la que se ordena.
+        """
+        self.date_col = date_col
+        # Orden estable; las fechas nulas quedan al final y nunca entran en un rango
+        self.df = freeze_frame(df.sort_values(date_col, kind="stable", na_position="last"))
+        dates = self.df[date_col]
+        self.n_dated = int(dates.notna().sum())
+        self.dates = dates.to_numpy(dtype="datetime64[ns]")[:self.n_dated]
+
+    def positions_in_ranges(self, date_ranges: list) -> np.ndarray:
+        """
+        Posiciones (en el orden interno) de las filas cuya fecha cae en alguno de los rangos.
+
+        :param date_ranges: Lista de (start_dt, end_dt), ambos inclusivos.
+        """
+        slices = []
+        for start_dt, end_dt in merge_date_ranges(date_ranges):
+            lo = np.searchsorted(self.dates, np.datetime64(start_dt, "ns"), side="left")
+            hi = np.searchsorted(self.dates, np.datetime64(end_dt, "ns"), side="right")
+            if hi > lo:
+                slices.append(np.arange(lo, hi))
+        return np.concatenate(slices) if slices else np.array([], dtype="int64")
+
+    def select(self, date_ranges: list = None, filters: dict = None) -> pd.DataFrame:
+        """
+        Filtra por rangos de fechas y por pertenencia de columnas a listas de valores.
+
+        :param date_ranges: Lista de (start_dt, end_dt) o None para no filtrar por fecha.
+        :param filters: Diccionario {columna: lista de valores}; listas vacías se ignoran.
+        :return: DataFrame filtrado.
+        """
+        df = self.df
+        if date_ranges:
+            df = df.iloc[self.positions_in_ranges(date_ranges)]
+
+        for col, values in (filters or {}).items():
+            if values and col in df.columns:
+                df = df[isin_mask(df[col], values)]
+
+        # Sin filtros, un objeto propio: agregarle columnas no debe tocar el DataFrame indexado
+        return df.copy(deep=False) if df is self.df else df
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+    from src.utils.filtering import get_date_ranges_from_years
+
+    sizes = [int(n) for n in sys.argv[1:]] or [10_000, 100_000, 1_000_000, 10_000_000]
+    portfolios = ["OFTW Top Picks", "Entire OFTW Portfolio", "OFTW Top Pick: AMF",
+                  "One for the World Discretionary Fund", "One for the World Operating Costs"]
+    selected_years, selected_portfolios = ["2021", "2022"], ["OFTW Top Picks", "OFTW Top Pick: AMF"]
+    date_ranges = get_date_ranges_from_years(selected_years, "fiscal")
+    rng = np.random.default_rng(0)
+
+    def legacy_filter(df):
+        """Implementación anterior: máscaras OR por año + df.query con la lista inline."""
+        mask = False
+        for (start_dt, end_dt) in date_ranges:
+            mask |= (df["date"] >= start_dt) & (df["date"] <= end_dt)
+        df = df[mask]
+        return df.query(f"portfolio in {selected_portfolios}")
+
+    print(f"{'filas':>12} {'legacy (ms)':>12} {'engine (ms)':>12} {'speedup':>8}")
+    for n in sizes:
+        df = pd.DataFrame({
+            "date": pd.Timestamp("2016-01-01") + pd.to_timedelta(rng.integers(0, 3300 * 86400, n), unit="s"),
+            "portfolio": pd.Categorical(rng.choice(portfolios, n)),
+            "amount_usd": rng.uniform(1, 1000, n),
+        })
+        engine = DateIndexedFrame(df, "date")
+
+        start = time.perf_counter()
+        expected = legacy_filter(df)
+        legacy_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        result = engine.select(date_ranges, {"portfolio": selected_portfolios})
+        engine_ms = (time.perf_counter() - start) * 1000
+
+        assert len(result) == len(expected)
+        print(f"{n:>12,} {legacy_ms:>12.2f} {engine_ms:>12.2f} {legacy_ms / engine_ms:>7.1f}x")
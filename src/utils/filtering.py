@@ -3,10 +3,14 @@ Funciones optimizadas para filtrar datos en función de criterios definidos.
 """
 
 import pandas as pd
+from src.utils.filter_engine import isin_mask
+from src.utils.tracing import traced
 
+@traced
 def filter_dataframe(df: pd.DataFrame, filters: dict) -> pd.DataFrame:
     """
-    Filtra un DataFrame basado en un conjunto de filtros optimizados usando query().
+    Filtra un DataFrame basado en un conjunto de filtros, sin construir strings de query.
+    Las listas se evalúan como pertenencia (bitmap de códigos si la columna es categórica).
 
     :param df: DataFrame a filtrar.
     :param filters: Diccionario de filtros con formato {"columna": valor}.
@@ -15,16 +19,18 @@ def filter_dataframe(df: pd.DataFrame, filters: dict) -> pd.DataFrame:
     if df.empty:
         return df
 
-    conditions = []
+    mask = None
     for col, value in filters.items():
         if col in df.columns:
             if isinstance(value, list) and value:
-                conditions.append(f"{col} in {value}")
-            elif value is not None:
-                conditions.append(f"{col} == '{value}'")
+                condition = isin_mask(df[col], value)
+            elif value is not None and not isinstance(value, list):
+                condition = (df[col] == value).to_numpy()
+            else:
+                continue
+            mask = condition if mask is None else mask & condition
 
-    query_str = " & ".join(conditions)
-    return df.query(query_str) if query_str else df
+    return df[mask] if mask is not None else df
 
 def get_date_ranges_from_years(years, year_mode):
     """
@@ -47,3 +53,13 @@ def get_date_ranges_from_years(years, year_mode):
         date_ranges.append((start_dt, end_dt))
 
     return date_ranges
+
+
+def get_available_years(payments_df: pd.DataFrame) -> list:
+    """
+    Años (como texto) con pagos registrados, tal como se ofrecen en el filtro de años.
+
+    :param payments_df: DataFrame de pagos limpio.
+    :return: Lista ordenada de años.
+    """
+    return sorted(payments_df["date"].dt.year.astype(str).unique())
@@ -4,11 +4,40 @@ utils/financial.py
 Módulo de utilidades financieras y cálculos de métricas compartidas.
 """
 
+import numpy as np
 import pandas as pd
 from log_config import get_logger
+from src.utils.instrumentation import instrumented
 
 logger = get_logger(__name__)
 
+# Factor de anualización por frecuencia
+FREQUENCY_FACTORS = {
+    "Semi-Monthly": 24,
+    "Monthly": 12,
+    "Quarterly": 4,
+    "Annually": 1
+}
+
+RECURRING_FREQUENCIES = ["Monthly", "Annually", "Quarterly"]
+
+
+def map_values(series: pd.Series, mapping: dict, default: float = 0.0) -> pd.Series:
+    """
+    Mapea una serie a valores numéricos. Si la serie es categórica, el mapeo se hace
+    sobre las categorías y se expande con los códigos enteros (sin recorrer strings).
+
+    :param series: Serie a mapear (categórica u objeto).
+    :param mapping: Diccionario {valor: número}.
+    :param default: Valor para nulos y valores fuera del mapeo.
+    :return: Serie float64 con el mismo índice.
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        lookup = np.array([mapping.get(c, default) for c in series.cat.categories] + [default], dtype="float64")
+        # Código -1 (nulo) apunta al último elemento: el valor por defecto
+        return pd.Series(lookup[series.cat.codes.to_numpy()], index=series.index)
+    return series.map(mapping).fillna(default).astype("float64")
+
 def annualize_amount(frequency: str, amount: float) -> float:
     """
     Convierte montos de contribución en valores anuales según la frecuencia.
@@ -27,6 +56,7 @@ def annualize_amount(frequency: str, amount: float) -> float:
         return 0
 
 
+@instrumented
 def calculate_active_arr(df: pd.DataFrame) -> float:
     """
     Calcula el Active Annualized Run Rate (ARR) basado en pledges activos.
@@ -41,9 +71,9 @@ def calculate_active_arr(df: pd.DataFrame) -> float:
     active_pledges = df[df["pledge_status"] == "Active donor"].copy()
     active_pledges.fillna({"frequency": "Unknown"}, inplace=True)
 
-    active_pledges["annualized_amount"] = active_pledges.apply(
-        lambda row: annualize_amount(row["frequency"], row["contribution_amount_usd"]), axis=1
-    )
+    active_pledges["annualized_amount"] = map_values(
+        active_pledges["frequency"], {f: FREQUENCY_FACTORS[f] for f in RECURRING_FREQUENCIES}
+    ) * active_pledges["contribution_amount_usd"]
 
     total_arr = active_pledges["annualized_amount"].sum()
     logger.info(f"Active ARR calculado: ${total_arr:,.2f}")
@@ -51,6 +81,7 @@ def calculate_active_arr(df: pd.DataFrame) -> float:
     return total_arr
 
 
+@instrumented
 def calculate_pledge_attrition_rate(df: pd.DataFrame) -> float:
     """
     Cálculo global de churn:
@@ -78,6 +109,7 @@ def calculate_pledge_attrition_rate(df: pd.DataFrame) -> float:
     return attrition_rate
 
 
+@instrumented
 def calculate_arr(df: pd.DataFrame, status_filter: list = None) -> float:
     """
     Calcula el ARR total o filtrado por estados específicos.
@@ -90,25 +122,17 @@ def calculate_arr(df: pd.DataFrame, status_filter: list = None) -> float:
         return 0.0
 
     if status_filter:
-        df = df[df["pledge_status"].isin(status_filter)].copy()
+        df = df[df["pledge_status"].isin(status_filter)]
 
     # Verificar valores desconocidos en `frequency`
-    valid_frequencies = {"Semi-Monthly", "Monthly", "Quarterly", "Annually"}
-    unexpected_frequencies = set(df["frequency"].dropna().unique()) - valid_frequencies
+    unexpected_frequencies = set(df["frequency"].dropna().unique()) - set(FREQUENCY_FACTORS)
 
     if unexpected_frequencies:
         logger.warning(f"Valores inesperados en frequency: {unexpected_frequencies}")
 
-    frequency_map = {
-        "Semi-Monthly": 24,
-        "Monthly": 12,
-        "Quarterly": 4,
-        "Annually": 1
-    }
+    annualized_amount = map_values(df["frequency"], FREQUENCY_FACTORS) * df["contribution_amount_usd"]
 
-    df["annualized_amount"] = df["frequency"].map(frequency_map).fillna(0) * df["contribution_amount_usd"]
-
-    return df["annualized_amount"].sum()
+    return annualized_amount.sum()
 
 
 
@@ -119,4 +143,17 @@ def classify_donation_type(frequency: str) -> str:
     :param frequency: Frecuencia de la donación.
     :return: 'Recurring' o 'One-Time'.
     """
-    return "Recurring" if frequency in ["Monthly", "Annually", "Quarterly"] else "One-Time"
+    return "Recurring" if frequency in RECURRING_FREQUENCIES else "One-Time"
+
+
+def classify_donation_types(frequencies: pd.Series) -> pd.Series:
+    """
+    Versión vectorizada de `classify_donation_type` para una columna completa.
+
+    :param frequencies: Serie de frecuencias (categórica u objeto).
+    :return: Serie con 'Recurring' o 'One-Time'.
+    """
+    return pd.Series(
+        np.where(frequencies.isin(RECURRING_FREQUENCIES), "Recurring", "One-Time"),
+        index=frequencies.index
+    )
@@ -0,0 +1,268 @@
+"""
+Instrumentación de la app, expuesta en formato Prometheus en `/metrics` (sin dependencias externas).
+
+Se registra:
+ - Cada callback de Dash (hooks de Flask sobre `/_dash-update-component`): duración, bytes de la
+   request y de la respuesta, y errores, con el nombre de la función del callback y su salida.
+ - Cada función memoizada (`single_flight_memoize`): duración y resultado (hit, cálculo o duplicado
+   evitado, ver `single_flight_stats`).
+ - Cada función de cálculo marcada con `@instrumented`: duración y filas de entrada y de salida
+   (además de un span en la traza del request, ver `tracing`).
+ - Colectores registrados con `add_collector` (p.ej. trabajos y caché de respuestas del Chat LLM).
+
+Cada proceso acumula sus métricas en memoria y publica una copia en el caché compartido cada
+`OFTW_METRICS_PUBLISH_INTERVAL` segundos; `/metrics` suma las copias de todos los workers vivos, así
+que da el mismo resultado sea cual sea el worker que atiende el scrape. `OFTW_METRICS=0` lo desactiva.
+
+Comparar `oftw_callback_duration_seconds` por `callback` (p.ej. `update_graphs` contra
+`update_performance_metrics`) muestra qué callbacks dominan; `oftw_memoized_calls_total` da los
+aciertos del caché por función.
+"""
+
+import bisect
+import functools
+import os
+import socket
+import threading
+import time
+from collections import defaultdict
+import pandas as pd
+from flask import Response, g, request
+from log_config import get_logger
+from src.utils.cache import cache
+from src.utils.tracing import callback_label, span
+
+logger = get_logger(__name__)
+
+METRICS_ENABLED = os.getenv("OFTW_METRICS", "1") == "1"
+METRICS_PUBLISH_INTERVAL = float(os.getenv("OFTW_METRICS_PUBLISH_INTERVAL", "5"))
+# Vigencia de la copia de un worker en el caché (un worker que muere desaparece de /metrics)
+METRICS_TTL = 300
+
+DURATION_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+BYTES_BUCKETS = (1e3, 1e4, 1e5, 1e6, 1e7)
+
+# Nombre: (tipo, descripción, buckets)
+METRICS = {
+    "oftw_callback_duration_seconds": ("histogram", "Duración de los callbacks de Dash.", DURATION_BUCKETS),
+    "oftw_callback_request_bytes": ("histogram", "Tamaño de la request de cada callback.", BYTES_BUCKETS),
+    "oftw_callback_response_bytes": ("histogram", "Tamaño de la respuesta de cada callback.", BYTES_BUCKETS),
+    "oftw_callback_errors_total": ("counter", "Callbacks que respondieron con error.", None),
+    "oftw_memoized_duration_seconds": ("histogram", "Duración de las funciones memoizadas (con caché).",
+                                       DURATION_BUCKETS),
+    "oftw_function_duration_seconds": ("histogram", "Duración de las funciones de cálculo.", DURATION_BUCKETS),
+    "oftw_function_rows_in_total": ("counter", "Filas de los DataFrames recibidos por las funciones de cálculo.", None),
+    "oftw_function_rows_out_total": ("counter", "Filas de los resultados de las funciones de cálculo.", None),
+}
+
+_lock = threading.Lock()
+# {(nombre, etiquetas)}: valor (counter) o [conteos por bucket..., +Inf, suma] (histogram)
+_values = {}
+_collectors = []
+_last_publish = 0.0
+
+
+def _labels_key(labels: dict) -> tuple:
+    return tuple(sorted(labels.items()))
+
+
+def inc(name: str, amount: float = 1, **labels) -> None:
+    """Suma `amount` a un contador."""
+    key = (name, _labels_key(labels))
+    with _lock:
+        _values[key] = _values.get(key, 0) + amount
+
+
+def observe(name: str, value: float, **labels) -> None:
+    """Registra una observación en un histograma."""
+    buckets = METRICS[name][2]
+    key = (name, _labels_key(labels))
+    with _lock:
+        state = _values.get(key)
+        if state is None:
+            state = _values[key] = [0] * (len(buckets) + 1) + [0.0]
+        state[bisect.bisect_left(buckets, value)] += 1
+        state[-1] += value
+
+
+def add_collector(collector) -> None:
+    """
+    Registra una función que retorna métricas calculadas al publicar (estado de otros módulos).
+
+    :param collector: Función sin argumentos que retorna una lista de
+                      (nombre, tipo, descripción, etiquetas, valor).
+    """
+    _collectors.append(collector)
+
+
+def _count_rows(value) -> int:
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return len(value)
+    if isinstance(value, (tuple, list)):
+        return sum(_count_rows(item) for item in value)
+    if isinstance(value, dict):
+        return sum(_count_rows(item) for item in value.values())
+    return 0
+
+
+def instrumented(f):
+    """Decorador para funciones de cálculo: duración y filas de entrada y salida."""
+    if not METRICS_ENABLED:
+        return f
+    name = f"{f.__module__.rsplit('.', 1)[-1]}.{f.__name__}"
+
+    @functools.wraps(f)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        with span(name):
+            result = f(*args, **kwargs)
+        observe("oftw_function_duration_seconds", time.perf_counter() - start, function=name)
+        inc("oftw_function_rows_in_total", _count_rows(args) + _count_rows(kwargs), function=name)
+        inc("oftw_function_rows_out_total", _count_rows(result), function=name)
+        return result
+    return wrapper
+
+
+def snapshot() -> dict:
+    """
+    Copia de las métricas de este proceso, con los colectores evaluados.
+
+    :return: {"values": {(nombre, etiquetas): valor}, "meta": {nombre: (tipo, descripción, buckets)}}.
+    """
+    with _lock:
+        values = {key: list(value) if isinstance(value, list) else value for key, value in _values.items()}
+    meta = {}
+    for collector in _collectors:
+        try:
+            for name, kind, help_text, labels, value in collector():
+                meta[name] = (kind, help_text, None)
+                values[(name, _labels_key(labels))] = value
+        except Exception as e:
+            logger.warning(f"Error en un colector de métricas: {e}")
+    return {"values": values, "meta": meta}
+
+
+def _worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _is_alive(worker: str) -> bool:
+    """False si el worker es de este host y su proceso ya no existe (su copia vencería recién con el TTL)."""
+    host, pid = worker.rsplit(":", 1)
+    if host != socket.gethostname():
+        return True
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        pass
+    return True
+
+
+def publish(force: bool = False) -> None:
+    """Publica la copia de este proceso en el caché compartido (a lo más cada `METRICS_PUBLISH_INTERVAL`)."""
+    global _last_publish
+    now = time.time()
+    if not force and now - _last_publish < METRICS_PUBLISH_INTERVAL:
+        return
+    _last_publish = now
+    worker = _worker_id()
+    try:
+        cache.set(f"metrics:{worker}", snapshot(), timeout=METRICS_TTL)
+        workers = cache.get("metrics:workers") or []
+        if worker not in workers:
+            cache.set("metrics:workers", workers + [worker], timeout=0)
+    except Exception as e:
+        logger.warning(f"No se pudieron publicar las métricas del worker {worker}: {e}")
+
+
+def collect_workers() -> dict:
+    """Suma las copias publicadas por todos los workers vivos (incluido este)."""
+    publish(force=True)
+    merged = {"values": {}, "meta": {}}
+    workers = cache.get("metrics:workers") or []
+    alive = []
+    for worker in workers:
+        data = cache.get(f"metrics:{worker}") if _is_alive(worker) else None
+        if data is None:
+            continue
+        alive.append(worker)
+        merged["meta"].update(data["meta"])
+        for key, value in data["values"].items():
+            current = merged["values"].get(key)
+            if current is None:
+                merged["values"][key] = list(value) if isinstance(value, list) else value
+            elif isinstance(value, list):
+                merged["values"][key] = [a + b for a, b in zip(current, value)]
+            else:
+                merged["values"][key] = current + value
+    if len(alive) != len(workers):
+        cache.set("metrics:workers", alive, timeout=0)
+    return merged
+
+
+def _format_labels(labels, extra: tuple = ()) -> str:
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{key}="{value}"' for (key, _), value in zip(pairs, escaped)) + "}"
+
+
+def render(data: dict) -> str:
+    """Texto en el formato de exposición de Prometheus."""
+    meta = {**METRICS, **data["meta"]}
+    series = defaultdict(list)
+    for (name, labels), value in data["values"].items():
+        series[name].append((labels, value))
+
+    lines = []
+    for name in sorted(series):
+        kind, help_text, buckets = meta[name]
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+        for labels, value in sorted(series[name], key=lambda item: item[0]):
+            if kind != "histogram":
+                lines.append(f"{name}{_format_labels(labels)} {value:g}")
+                continue
+            cumulative = 0
+            for bound, count in zip(list(buckets) + ["+Inf"], value[:-1]):
+                cumulative += count
+                lines.append(f"{name}_bucket{_format_labels(labels, (('le', bound if bound == '+Inf' else f'{bound:g}'),))} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {value[-1]:g}")
+            lines.append(f"{name}_count{_format_labels(labels)} {cumulative}")
+    return "\n".join(lines) + "\n"
+
+
+def register_instrumentation(app) -> None:
+    """
+    Instrumenta los callbacks de una app Dash y agrega la ruta `/metrics` a su servidor.
+
+    :param app: App Dash (con sus callbacks ya registrados o por registrar).
+    """
+    if not METRICS_ENABLED:
+        return
+    server = app.server
+
+    @server.before_request
+    def start_callback_timer():
+        if request.path.endswith("/_dash-update-component"):
+            g.callback_start = time.perf_counter()
+
+    @server.after_request
+    def record_callback(response):
+        start = g.pop("callback_start", None)
+        if start is None:
+            return response
+        name, output = callback_label(app)
+        observe("oftw_callback_duration_seconds", time.perf_counter() - start, callback=name, output=output)
+        observe("oftw_callback_request_bytes", request.content_length or 0, callback=name)
+        observe("oftw_callback_response_bytes", response.calculate_content_length() or 0, callback=name)
+        if response.status_code >= 400:
+            inc("oftw_callback_errors_total", callback=name, status=str(response.status_code))
+        publish()
+        return response
+
+    @server.route("/metrics")
+    def metrics():
+        return Response(render(collect_workers()), mimetype="text/plain; version=0.0.4")
@@ -0,0 +1,258 @@
+"""
+Cola de trabajos en segundo plano con concurrencia acotada, timeouts y cancelación.
+
+Los callbacks de Dash encolan el trabajo lento (p.ej. una llamada al LLM) y retornan de inmediato
+con el id del trabajo; la UI consulta su estado periódicamente. El estado de cada trabajo se
+replica en el caché compartido, de modo que la consulta (o la cancelación) puede llegar a
+cualquier worker de gunicorn y no solo al que ejecuta el trabajo.
+"""
+
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from log_config import get_logger
+from src.utils.cache import cache
+
+logger = get_logger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+TIMED_OUT = "timeout"
+FINAL_STATES = {DONE, FAILED, CANCELLED, TIMED_OUT}
+
+# Segundos que se conserva el estado de un trabajo terminado
+JOB_TTL = 600
+# Cada cuánto un trabajo en ejecución revisa si otro worker pidió cancelarlo
+CANCEL_CHECK_INTERVAL = 0.5
+# Intervalo mínimo entre réplicas del avance parcial en el caché compartido
+PROGRESS_PUBLISH_INTERVAL = 0.2
+
+
+class JobRejected(Exception):
+    """La cola está llena y no acepta más trabajos."""
+
+
+def _shared_get(key: str):
+    try:
+        return cache.get(key)
+    except (RuntimeError, AttributeError, KeyError):
+        return None
+
+
+def _shared_set(key: str, value) -> None:
+    try:
+        cache.set(key, value, timeout=JOB_TTL)
+    except (RuntimeError, AttributeError, KeyError):
+        pass
+
+
+class Job:
+    """Un trabajo encolado. La función del trabajo lo recibe para consultar su cancelación y plazo."""
+
+    def __init__(self, queue_name: str, timeout: float):
+        self.id = uuid.uuid4().hex
+        self.queue_name = queue_name
+        self.status = QUEUED
+        self.result = None
+        self.progress = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.timeout = timeout
+        self._cancel_event = threading.Event()
+        self._cancel_checked_at = 0.0
+        self._published_at = 0.0
+
+    @property
+    def deadline(self) -> float:
+        """Instante (time.time) en que el trabajo vence, contado desde que empezó a ejecutarse."""
+        return (self.started_at or time.time()) + self.timeout
+
+    def remaining(self) -> float:
+        """Segundos que le quedan al trabajo antes de vencer."""
+        return max(0.0, self.deadline - time.time())
+
+    def is_cancelled(self) -> bool:
+        """Indica si se pidió cancelar el trabajo (en este proceso o desde otro worker)."""
+        if self._cancel_event.is_set():
+            return True
+        now = time.monotonic()
+        if now - self._cancel_checked_at >= CANCEL_CHECK_INTERVAL:
+            self._cancel_checked_at = now
+            if _shared_get(f"job-cancel:{self.id}"):
+                self._cancel_event.set()
+        return self._cancel_event.is_set()
+
+    def report(self, progress) -> None:
+        """
+        Registra el avance parcial del trabajo (p.ej. el texto generado hasta ahora). En este
+        proceso queda visible de inmediato; en el caché compartido, como máximo cada
+        PROGRESS_PUBLISH_INTERVAL segundos.
+
+        :param progress: Avance serializable.
+        """
+        self.progress = progress
+        if time.monotonic() - self._published_at >= PROGRESS_PUBLISH_INTERVAL:
+            self.publish()
+
+    def publish(self) -> None:
+        """Replica el estado del trabajo en el caché compartido."""
+        self._published_at = time.monotonic()
+        _shared_set(f"job:{self.id}", self.snapshot())
+
+    def snapshot(self) -> dict:
+        """Estado serializable del trabajo."""
+        return {
+            "id": self.id,
+            "queue": self.queue_name,
+            "status": self.status,
+            "result": self.result,
+            "progress": self.progress,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class JobQueue:
+    """Pool de hilos acotado con una cola de trabajos pendientes de tamaño máximo."""
+
+    def __init__(self, name: str, max_workers: int, max_pending: int, timeout: float):
+        """
+        :param name: Nombre de la cola (prefijo de los hilos y de los logs).
+        :param max_workers: Trabajos que se ejecutan a la vez.
+        :param max_pending: Trabajos en cola o en ejecución a partir de los cuales se rechazan nuevos.
+        :param timeout: Segundos máximos de ejecución de cada trabajo.
+        """
+        self.name = name
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._jobs = {}
+        self._futures = {}
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args, **kwargs) -> str:
+        """
+        Encola `fn(job, *args, **kwargs)`.
+
+        :return: Id del trabajo.
+        :raises JobRejected: Si la cola está llena.
+        """
+        with self._lock:
+            self._evict_finished()
+            pending = sum(1 for job in self._jobs.values() if job.status not in FINAL_STATES)
+            if pending >= self.max_pending:
+                raise JobRejected(f"Cola {self.name} llena ({pending} trabajos pendientes).")
+            job = Job(self.name, self.timeout)
+            self._jobs[job.id] = job
+            self._futures[job.id] = self._executor.submit(self._run, job, fn, args, kwargs)
+
+        self._publish(job)
+        logger.info(f"Trabajo {job.id} encolado en {self.name} ({pending + 1} pendientes).")
+        return job.id
+
+    def get(self, job_id: str):
+        """
+        Estado de un trabajo de este proceso o, si no, el replicado por otro worker.
+
+        :param job_id: Id del trabajo.
+        :return: Diccionario con el estado (ver `Job.snapshot`) o None si no existe.
+        """
+        job = self._jobs.get(job_id)
+        if job is None:
+            return _shared_get(f"job:{job_id}")
+
+        if job.status == RUNNING and time.time() > job.deadline:
+            # El hilo no se puede interrumpir: el trabajo se da por vencido y su resultado se descarta
+            self._finish(job, TIMED_OUT, error=f"Sin respuesta en {self.timeout:g}s.")
+        return job.snapshot()
+
+    def cancel(self, job_id: str) -> bool:
+        """
+        Pide cancelar un trabajo. Si aún no empezó, no llega a ejecutarse; si está en ejecución,
+        la función lo detecta con `job.is_cancelled()` y su resultado se descarta.
+
+        :param job_id: Id del trabajo.
+        :return: True si el trabajo existía y no había terminado.
+        """
+        job = self._jobs.get(job_id)
+        if job is None:
+            state = _shared_get(f"job:{job_id}")
+            if state is None or state["status"] in FINAL_STATES:
+                return False
+            # Trabajo de otro worker: se avisa por el caché compartido
+            _shared_set(f"job-cancel:{job_id}", True)
+            return True
+
+        if job.status in FINAL_STATES:
+            return False
+        job._cancel_event.set()
+        future = self._futures.get(job_id)
+        if future is not None and future.cancel():
+            self._finish(job, CANCELLED)
+        elif job.status == RUNNING:
+            self._finish(job, CANCELLED)
+        return True
+
+    def stats(self) -> dict:
+        """Cantidad de trabajos de este proceso por estado."""
+        counts = {}
+        for job in list(self._jobs.values()):
+            counts[job.status] = counts.get(job.status, 0) + 1
+        return counts
+
+    def _run(self, job: Job, fn, args, kwargs) -> None:
+        if job.is_cancelled():
+            self._finish(job, CANCELLED)
+            return
+
+        job.status = RUNNING
+        job.started_at = time.time()
+        self._publish(job)
+        try:
+            result = fn(job, *args, **kwargs)
+        except Exception as e:
+            if time.time() > job.deadline:
+                # El error es consecuencia del plazo (p.ej. el timeout del cliente HTTP)
+                self._finish(job, TIMED_OUT, error=f"Sin respuesta en {self.timeout:g}s.")
+            else:
+                logger.error(f"Trabajo {job.id} de {self.name} falló: {e}")
+                self._finish(job, FAILED, error=str(e))
+            return
+
+        if job.is_cancelled():
+            self._finish(job, CANCELLED)
+        elif time.time() > job.deadline:
+            self._finish(job, TIMED_OUT, error=f"Sin respuesta en {self.timeout:g}s.")
+        else:
+            self._finish(job, DONE, result=result)
+
+    def _finish(self, job: Job, status: str, result=None, error: str = None) -> None:
+        with self._lock:
+            if job.status in FINAL_STATES:
+                return
+            job.status = status
+            job.result = result
+            job.error = error
+            job.finished_at = time.time()
+        self._publish(job)
+        elapsed = job.finished_at - job.created_at
+        logger.info(f"Trabajo {job.id} de {self.name}: {status} en {elapsed:.2f}s.")
+
+    def _publish(self, job: Job) -> None:
+        job.publish()
+
+    def _evict_finished(self) -> None:
+        limit = time.time() - JOB_TTL
+        for job_id in [job_id for job_id, job in self._jobs.items()
+                       if job.status in FINAL_STATES and job.finished_at < limit]:
+            del self._jobs[job_id]
+            self._futures.pop(job_id, None)
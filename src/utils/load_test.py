@@ -0,0 +1,455 @@
+"""
+Prueba de carga HTTP de los dashboards sobre gunicorn.
+
+Simula usuarios concurrentes que navegan como el navegador: cargan una página (router y opciones de
+los filtros, más los callbacks iniciales de la página) y luego hacen una secuencia de cambios de
+filtros, disparando en paralelo (como el renderer de Dash) todos los callbacks de la página que
+dependen de los filtros, con un tiempo de lectura entre cambios. En Chat LLM hacen una pregunta, leen
+el stream SSE de la respuesta y la recogen con el callback de poll, contra el servidor LLM falso
+(`src.utils.fake_openai_server`).
+
+Los callbacks y sus entradas se toman de `/_dash-dependencies`, y los componentes de cada página de
+la respuesta del router, así que la prueba sigue a la app sin configuración adicional.
+
+Para cada configuración `workers x threads` levanta gunicorn con `gunicorn_config.py`
+(GUNICORN_WORKERS / GUNICORN_THREADS) con el caché compartido vacío, hace una pasada de
+calentamiento, mide durante `--duration` segundos y reporta p50/p95/p99 de las requests y de las
+interacciones completas (un cambio de filtro o una pregunta), por página, y el throughput. Los
+resultados quedan en `cache-dir/benchmarks/load_test.json`. Conviene correr la prueba en otra máquina
+que el servidor: en la misma, ambos compiten por las mismas CPUs.
+
+Uso:
+    python -m src.utils.load_test --configs 1x1,1x4,2x4 --users 20 --duration 60
+    python -m src.utils.load_test --url http://127.0.0.1:8050 --users 10
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+import numpy as np
+import requests
+from log_config import get_logger
+
+logger = get_logger(__name__)
+
+ROOT_DIR = Path(__file__).parent.parent.parent
+RESULTS_FILE = ROOT_DIR / 'cache-dir' / 'benchmarks' / 'load_test.json'
+
+PAGES = ["/money_moved", "/objectics", "/pledge_perf", "/chat_llm"]
+FILTER_IDS = {"year-filter", "portfolio-filter", "year-mode"}
+CHAT_QUESTIONS = [
+    "What is the total money moved?",
+    "How did active ARR change over the selected years?",
+    "Which payment platform moves the most money?",
+    "What is the pledge attrition rate?",
+    "Which chapter types bring the most active pledges?",
+]
+# Conexiones en paralelo por usuario, como el límite por host de un navegador
+BROWSER_CONNECTIONS = 6
+
+
+def parse_output(output: str) -> list:
+    """Salidas de un callback a partir de su clave en `/_dash-dependencies`."""
+    parts = output.strip(".").split("...") if output.startswith("..") else [output]
+    return [{"id": part.rsplit(".", 1)[0], "property": part.rsplit(".", 1)[1].split("@")[0]} for part in parts]
+
+
+def callback_body(spec: dict, values: dict, changed: list) -> dict:
+    """
+    Cuerpo de `/_dash-update-component` para un callback.
+
+    :param spec: Callback tal como lo entrega `/_dash-dependencies`.
+    :param values: Valores de las propiedades {"id.prop": valor} (las que falten van como None).
+    :param changed: Propiedades que dispararon el callback.
+    """
+    outputs = parse_output(spec["output"])
+    return {
+        "output": spec["output"],
+        "outputs": outputs if spec["output"].startswith("..") else outputs[0],
+        "inputs": [{**i, "value": values.get(f"{i['id']}.{i['property']}")} for i in spec["inputs"]],
+        "state": [{**s, "value": values.get(f"{s['id']}.{s['property']}")} for s in spec["state"]],
+        "changedPropIds": changed,
+    }
+
+
+def component_ids(tree) -> set:
+    """Ids de todos los componentes de un layout serializado."""
+    ids = set()
+    stack = [tree]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, list):
+            stack.extend(node)
+        elif isinstance(node, dict):
+            props = node.get("props", node)
+            if isinstance(props.get("id"), str):
+                ids.add(props["id"])
+            stack.extend(value for value in props.values() if isinstance(value, (list, dict)))
+    return ids
+
+
+def option_values(options) -> list:
+    return [option["value"] if isinstance(option, dict) else option for option in options or []]
+
+
+class AppModel:
+    """Callbacks de la app agrupados por página (se arma una vez por servidor)."""
+
+    def __init__(self, base_url: str):
+        session = requests.Session()
+        self.callbacks = [spec for spec in session.get(f"{base_url}/_dash-dependencies").json()
+                          if not spec.get("clientside_function")]
+        global_ids = component_ids(session.get(f"{base_url}/_dash-layout").json())
+
+        by_input = defaultdict(list)
+        for spec in self.callbacks:
+            for i in spec["inputs"]:
+                by_input[f"{i['id']}.{i['property']}"].append(spec)
+        self.navigation = by_input["url.pathname"]
+        self.chat_submit = by_input["chat-llm-submit.n_clicks"][0]
+        self.chat_poll = by_input["chat-llm-stream-end.data"][0]
+
+        # Para cada página: callbacks iniciales y callbacks de los filtros con salidas en la página
+        self.initial, self.on_filters = {}, {}
+        for page in PAGES:
+            layout = self._post(session, base_url, next(s for s in self.navigation if "page-content" in s["output"]),
+                                {"url.pathname": page}, ["url.pathname"])
+            ids = component_ids(layout["response"]) | global_ids
+            in_page = [spec for spec in self.callbacks if spec not in self.navigation
+                       and {o["id"] for o in parse_output(spec["output"])} <= ids
+                       and all(i["id"] in ids for i in spec["inputs"])]
+            self.on_filters[page] = [spec for spec in in_page if any(i["id"] in FILTER_IDS for i in spec["inputs"])]
+            self.initial[page] = [spec for spec in in_page if not spec.get("prevent_initial_call")
+                                  and spec not in self.on_filters[page]]
+
+    @staticmethod
+    def _post(session, base_url, spec, values, changed):
+        response = session.post(f"{base_url}/_dash-update-component", json=callback_body(spec, values, changed))
+        response.raise_for_status()
+        return response.json() if response.status_code == 200 else {}
+
+
+class VirtualUser:
+    """Un usuario que navega entre páginas hasta el plazo; registra cada request e interacción."""
+
+    def __init__(self, index: int, base_url: str, model: AppModel, recorder, think_time: float, seed: int):
+        self.index = index
+        self.base_url = base_url
+        self.model = model
+        self.record = recorder
+        self.think_time = think_time
+        self.rng = random.Random(seed * 1000 + index)
+        self.session = requests.Session()
+        self.session.mount("http://", requests.adapters.HTTPAdapter(pool_maxsize=BROWSER_CONNECTIONS))
+        self.pool = ThreadPoolExecutor(max_workers=BROWSER_CONNECTIONS)
+        self.values = {"year-mode.value": "fiscal"}
+        self.years, self.portfolios = [], []
+        self.questions = 0
+
+    def _send(self, body: dict) -> requests.Response:
+        try:
+            return self.session.post(f"{self.base_url}/_dash-update-component", json=body, timeout=120)
+        except requests.ConnectionError:
+            # Conexión keep-alive cerrada por el servidor mientras estaba inactiva: el navegador reintenta
+            return self.session.post(f"{self.base_url}/_dash-update-component", json=body, timeout=120)
+
+    def post(self, page: str, spec: dict, changed: list) -> dict:
+        start = time.perf_counter()
+        try:
+            response = self._send(callback_body(spec, self.values, changed))
+            ok = response.status_code in (200, 204)
+            error = None if ok else f"HTTP {response.status_code}"
+            payload = response.json() if response.status_code == 200 else {}
+        except (requests.RequestException, ValueError) as e:
+            ok, payload, error = False, {}, type(e).__name__
+        self.record("request", page, spec["output"] if ok else f"{spec['output']} ({error})",
+                    (time.perf_counter() - start) * 1000, ok)
+        return payload.get("response", {})
+
+    def fire(self, page: str, specs: list, changed: list) -> list:
+        """Dispara callbacks en paralelo (como el renderer) y espera todas las respuestas."""
+        return list(self.pool.map(lambda spec: self.post(page, spec, changed), specs))
+
+    def visit(self, page: str) -> None:
+        start = time.perf_counter()
+        self.values["url.pathname"] = page
+        for response in self.fire(page, self.model.navigation, ["url.pathname"]):
+            if "year-filter" in response:
+                self.years = option_values(response["year-filter"].get("options"))
+                self.portfolios = option_values(response.get("portfolio-filter", {}).get("options"))
+        self.fire(page, self.model.initial[page], [])
+        self.record("interaction", page, "page load", (time.perf_counter() - start) * 1000, True)
+
+    def change_filters(self, page: str) -> None:
+        """Un cambio de filtros típico: un año, otro año más, el modo, portfolios o limpiar."""
+        action = self.rng.choices(["year", "add_year", "mode", "portfolio", "clear"], [40, 15, 15, 20, 10])[0]
+        if action == "year" and self.years:
+            self.values["year-filter.value"], changed = [self.rng.choice(self.years)], "year-filter.value"
+        elif action == "add_year" and self.years:
+            selected = set(self.values.get("year-filter.value") or []) | {self.rng.choice(self.years)}
+            self.values["year-filter.value"], changed = sorted(selected), "year-filter.value"
+        elif action == "portfolio" and self.portfolios:
+            selected = self.rng.sample(self.portfolios, k=min(len(self.portfolios), self.rng.randint(1, 2)))
+            self.values["portfolio-filter.value"], changed = selected, "portfolio-filter.value"
+        elif action == "clear":
+            self.values["year-filter.value"] = self.values["portfolio-filter.value"] = None
+            changed = "year-filter.value"
+        else:
+            self.values["year-mode.value"] = "calendar" if self.values["year-mode.value"] == "fiscal" else "fiscal"
+            changed = "year-mode.value"
+
+        start = time.perf_counter()
+        self.fire(page, self.model.on_filters[page], [changed])
+        self.record("interaction", page, "filter change", (time.perf_counter() - start) * 1000, True)
+
+    def ask_question(self) -> None:
+        """Envía una pregunta, lee el stream SSE de la respuesta y la recoge con el callback de poll."""
+        page = "/chat_llm"
+        self.questions += 1
+        # Preguntas distintas por usuario para no medir solo aciertos del caché de respuestas
+        question = f"{self.rng.choice(CHAT_QUESTIONS)} (user {self.index}, #{self.questions})"
+        start = time.perf_counter()
+        self.values.update({"chat-llm-submit.n_clicks": self.questions, "chat-llm-input.value": question,
+                            "chat-llm-job.data": None})
+        response = self.post(page, self.model.chat_submit, ["chat-llm-submit.n_clicks"])
+        job_id = response.get("chat-llm-job", {}).get("data")
+
+        ok = True
+        if job_id:
+            ok = self._read_stream(job_id)
+            self.values.update({"chat-llm-job.data": job_id, "chat-llm-stream-end.data": job_id})
+            self.post(page, self.model.chat_poll, ["chat-llm-stream-end.data"])
+        self.record("interaction", page, "chat answer", (time.perf_counter() - start) * 1000, ok)
+
+    def _read_stream(self, job_id: str) -> bool:
+        last_id = None
+        while True:
+            start = time.perf_counter()
+            headers = {"Last-Event-ID": last_id} if last_id is not None else {}
+            event, done = {}, None
+            try:
+                with self.session.get(f"{self.base_url}/chat-llm/stream/{job_id}", headers=headers,
+                                      stream=True, timeout=120) as response:
+                    for line in response.iter_lines(decode_unicode=True):
+                        if line:
+                            key, _, value = line.partition(": ")
+                            event[key] = value
+                            continue
+                        if event.get("event") == "token":
+                            last_id = event.get("id")
+                        elif event.get("event") == "done":
+                            done = event.get("data")
+                        event = {}
+            except requests.RequestException:
+                self.record("request", "/chat_llm", "chat-llm/stream", (time.perf_counter() - start) * 1000, False)
+                return False
+            self.record("request", "/chat_llm", "chat-llm/stream", (time.perf_counter() - start) * 1000, True)
+            if done is not None:
+                return True
+
+    def run(self, deadline: float) -> None:
+        try:
+            while time.time() < deadline:
+                page = self.rng.choice(PAGES)
+                self.visit(page)
+                for _ in range(self.rng.randint(2, 5)):
+                    if time.time() >= deadline:
+                        break
+                    time.sleep(self.rng.expovariate(1 / self.think_time) if self.think_time else 0)
+                    if page == "/chat_llm":
+                        self.ask_question()
+                    else:
+                        self.change_filters(page)
+        finally:
+            self.pool.shutdown()
+
+
+def percentiles(latencies: list) -> dict:
+    values = np.array(latencies, dtype="float64")
+    p50, p95, p99 = np.percentile(values, [50, 95, 99]) if len(values) else (np.nan,) * 3
+    return {"count": len(values), "p50_ms": float(p50), "p95_ms": float(p95), "p99_ms": float(p99)}
+
+
+def run_load(base_url: str, users: int, duration: float, think_time: float, seed: int, model: AppModel = None) -> dict:
+    """
+    Ejecuta la carga contra un servidor.
+
+    :param base_url: URL del servidor (sin / final).
+    :param users: Usuarios concurrentes.
+    :param duration: Segundos de medición.
+    :param think_time: Segundos medios entre interacciones de un usuario.
+    :param seed: Semilla de las secuencias de navegación.
+    :param model: Callbacks por página (se arma si no se entrega).
+    :return: Resumen: throughput y percentiles por página, de requests e interacciones.
+    """
+    model = model or AppModel(base_url)
+    samples, lock = [], threading.Lock()
+
+    def recorder(kind, page, name, latency_ms, ok):
+        with lock:
+            samples.append((kind, page, name, latency_ms, ok))
+
+    start = time.time()
+    deadline = start + duration
+    # Entrada escalonada de los usuarios durante el primer 10% de la medición
+    ramp = duration * 0.1 / max(users, 1)
+
+    def start_user(index):
+        time.sleep(index * ramp)
+        VirtualUser(index, base_url, model, recorder, think_time, seed).run(deadline)
+
+    with ThreadPoolExecutor(max_workers=users) as pool:
+        list(pool.map(start_user, range(users)))
+    elapsed = time.time() - start
+
+    requests_ = [s for s in samples if s[0] == "request"]
+    summary = {
+        "users": users, "duration_s": elapsed, "requests": len(requests_),
+        "errors": sum(1 for s in requests_ if not s[4]),
+        "errors_by_callback": dict(Counter(s[2] for s in requests_ if not s[4])),
+        "throughput_rps": len(requests_) / elapsed,
+        "request_latency": percentiles([s[3] for s in requests_]),
+        "pages": {},
+    }
+    for page in PAGES:
+        page_requests = [s[3] for s in requests_ if s[1] == page]
+        interactions = defaultdict(list)
+        for kind, sample_page, name, latency, ok in samples:
+            if kind == "interaction" and sample_page == page:
+                interactions[name].append(latency)
+        summary["pages"][page] = {
+            "requests": percentiles(page_requests),
+            "throughput_rps": len(page_requests) / elapsed,
+            "interactions": {name: percentiles(values) for name, values in interactions.items()},
+        }
+    return summary
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_until_ready(base_url: str, timeout: float = 180) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if requests.get(f"{base_url}/_dash-layout", timeout=5).status_code == 200:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"{base_url} no respondió en {timeout:.0f}s")
+
+
+def start_process(args: list, env: dict, log_path: Path) -> subprocess.Popen:
+    log_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(log_path, "w") as log:
+        return subprocess.Popen(args, env=env, cwd=ROOT_DIR, stdout=log, stderr=subprocess.STDOUT)
+
+
+def stop_process(process: subprocess.Popen) -> None:
+    process.terminate()
+    try:
+        process.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+def run_config(workers: int, threads: int, llm_url: str, args) -> dict:
+    """
+    Levanta gunicorn con una configuración, lo calienta y ejecuta la carga.
+
+    :return: Resumen de `run_load` con la configuración.
+    """
+    if not args.keep_cache:
+        shutil.rmtree(ROOT_DIR / 'cache-dir' / 'flask', ignore_errors=True)
+
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    env = {**os.environ, "GUNICORN_WORKERS": str(workers), "GUNICORN_THREADS": str(threads),
+           "OPENAI_BASE_URL": llm_url, "OPENAI_API_KEY": os.getenv("OPENAI_API_KEY", "sk-load-test")}
+    server = start_process([sys.executable, "-m", "gunicorn", "-c", "gunicorn_config.py", "main:server",
+                            "--bind", f"127.0.0.1:{port}"], env,
+                           RESULTS_FILE.parent / f"gunicorn-{workers}x{threads}.log")
+    try:
+        wait_until_ready(base_url)
+        model = AppModel(base_url)
+        # Calentamiento: cada página con los filtros por defecto (carga de datos en cada worker)
+        run_load(base_url, users=max(workers, 2), duration=args.warmup, think_time=0, seed=args.seed + 1,
+                 model=model)
+        logger.info(f"Carga {workers}x{threads}: {args.users} usuarios durante {args.duration:.0f}s.")
+        summary = run_load(base_url, args.users, args.duration, args.think_time, args.seed, model)
+    finally:
+        stop_process(server)
+    return {"config": f"{workers}x{threads}", "workers": workers, "threads": threads, **summary}
+
+
+def print_report(results: list) -> None:
+    print(f"{'config':>7} {'page':<13} {'req/s':>7} {'p50':>8} {'p95':>8} {'p99':>8}   interacción p50/p95/p99 (ms)")
+    for result in results:
+        overall = result["request_latency"]
+        print(f"{result['config']:>7} {'(todas)':<13} {result['throughput_rps']:>7.1f} {overall['p50_ms']:>8.1f} "
+              f"{overall['p95_ms']:>8.1f} {overall['p99_ms']:>8.1f}   errores: {result['errors']}/{result['requests']}")
+        for page, stats in result["pages"].items():
+            latency = stats["requests"]
+            interactions = "; ".join(f"{name} {i['p50_ms']:.0f}/{i['p95_ms']:.0f}/{i['p99_ms']:.0f} (n={i['count']})"
+                                     for name, i in stats["interactions"].items())
+            print(f"{'':>7} {page:<13} {stats['throughput_rps']:>7.1f} {latency['p50_ms']:>8.1f} "
+                  f"{latency['p95_ms']:>8.1f} {latency['p99_ms']:>8.1f}   {interactions}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Prueba de carga HTTP de los dashboards.")
+    parser.add_argument("--configs", default="1x1,1x4", help="Configuraciones workers x threads, p.ej. 1x1,2x4.")
+    parser.add_argument("--url", default=None, help="Servidor ya levantado (en lugar de lanzar gunicorn).")
+    parser.add_argument("--llm-url", default=None, help="API compatible con OpenAI (por defecto, el servidor falso).")
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--duration", type=float, default=30, help="Segundos de medición por configuración.")
+    parser.add_argument("--warmup", type=float, default=10, help="Segundos de calentamiento por configuración.")
+    parser.add_argument("--think-time", type=float, default=1.0, help="Segundos medios entre interacciones.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--keep-cache", action="store_true", help="No vaciar cache-dir/flask antes de cada configuración.")
+    parser.add_argument("--output", default=str(RESULTS_FILE))
+    args = parser.parse_args()
+
+    results = []
+    if args.url:
+        results.append({"config": "url", "url": args.url,
+                        **run_load(args.url.rstrip("/"), args.users, args.duration, args.think_time, args.seed)})
+    else:
+        llm_server = None
+        llm_url = args.llm_url
+        if llm_url is None:
+            llm_port = free_port()
+            llm_server = start_process([sys.executable, "-m", "src.utils.fake_openai_server", "--port", str(llm_port),
+                                        "--delay", "0.3", "--token-delay", "0.02"], dict(os.environ),
+                                       RESULTS_FILE.parent / "fake-llm.log")
+            llm_url = f"http://127.0.0.1:{llm_port}/v1"
+        try:
+            for config in args.configs.split(","):
+                workers, threads = (int(n) for n in config.lower().split("x"))
+                results.append(run_config(workers, threads, llm_url, args))
+        finally:
+            if llm_server is not None:
+                stop_process(llm_server)
+
+    output = Path(args.output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump({"timestamp": datetime.now().isoformat(timespec="seconds"), "users": args.users,
+                   "think_time_s": args.think_time, "results": results}, f, indent=2)
+    print_report(results)
+    print(f"\nResultados en {output}")
@@ -0,0 +1,79 @@
+"""
+Pre-calentamiento de datos y caché al arrancar.
+
+Con `OFTW_PREWARM=1`, gunicorn carga la app en el proceso maestro (`preload_app`) y, antes del fork,
+carga y limpia los datos, construye los índices de filtrado y calcula los bundles de las
+combinaciones de filtros más comunes: sin filtro de años y cada año por separado, en modo fiscal y
+calendario. Al final congela los objetos vivos (`gc.freeze`) para que el recolector no toque sus
+páginas y los workers las sigan compartiendo por copy-on-write.
+
+Uso (pre-calentar el caché compartido sin levantar el servidor):
+    python -m src.utils.prewarm
+"""
+
+import gc
+import os
+import time
+from log_config import get_logger
+from src.data_ingestion.data_loader import data_versions
+from src.metrics_calculations.page_bundles import (
+    get_money_moved_bundle, get_objectics_bundle, get_pledge_perf_bundle
+)
+from src.utils.filtering import get_available_years
+
+logger = get_logger(__name__)
+
+PREWARM = os.getenv("OFTW_PREWARM", "0") == "1"
+
+YEAR_MODES = ("fiscal", "calendar")
+
+PAGE_BUNDLES = (get_money_moved_bundle, get_objectics_bundle, get_pledge_perf_bundle)
+
+
+def common_filter_combinations(payments_df) -> list:
+    """
+    Combinaciones de filtros que se pre-calculan: sin años y cada año por separado, sin portfolios.
+
+    :param payments_df: DataFrame de pagos limpio (para los años disponibles).
+    :return: Lista de tuplas (selected_years, selected_portfolios, year_mode).
+    """
+    years = [None] + [[year] for year in get_available_years(payments_df)]
+    return [(selected_years, None, year_mode) for selected_years in years for year_mode in YEAR_MODES]
+
+
+def prewarm(freeze: bool = True) -> None:
+    """
+    Carga la versión vigente de los datos y calcula los bundles de las combinaciones comunes.
+    No arranca el vigía de recarga, para poder ejecutarse en el proceso maestro antes del fork.
+
+    :param freeze: Si es True, congela los objetos vivos con `gc.freeze()` al terminar.
+    """
+    start = time.perf_counter()
+    version = data_versions.load()
+    payments_df = version.dfs.get("payments")
+    if payments_df is None or payments_df.empty:
+        logger.warning("Sin datos de pagos: se omite el pre-calentamiento.")
+        return
+
+    combinations = common_filter_combinations(payments_df)
+    for selected_years, selected_portfolios, year_mode in combinations:
+        for get_bundle in PAGE_BUNDLES:
+            try:
+                get_bundle(selected_years, selected_portfolios, year_mode, fingerprint=version.fingerprint)
+            except Exception as e:
+                logger.error(f"Error pre-calculando {get_bundle.__name__} {selected_years} {year_mode}: {e}")
+
+    logger.info(f"Pre-calentamiento de la versión {version.fingerprint}: {len(combinations)} combinaciones "
+                f"de filtros en {time.perf_counter() - start:.2f}s.")
+
+    if freeze:
+        gc.collect()
+        gc.freeze()
+        logger.info(f"{gc.get_freeze_count()} objetos congelados antes del fork.")
+
+
+if __name__ == "__main__":
+    from main import server
+
+    with server.app_context():
+        prewarm(freeze=False)
@@ -0,0 +1,231 @@
+"""
+Perfilado bajo demanda de un request de callback, sin redeploy.
+
+Con `OFTW_PROFILE_SECRET` definido, un request a `/_dash-update-component` que trae el secreto en el
+header `X-OFTW-Profile` se ejecuta bajo un profiler. El secreto solo se acepta en el header (un
+parámetro de la URL quedaría en los logs de acceso y en el historial del navegador).
+ - `sampling` (por defecto): muestrea la pila del hilo del request cada `OFTW_PROFILE_SAMPLE_INTERVAL`
+   segundos y guarda un `.folded` (pilas colapsadas para flamegraph.pl o speedscope). Solo ve el
+   hilo del request.
+ - `cprofile`: determinista, guarda un `.pstats` (`python -m pstats`, snakeviz). Desde Python 3.12
+   cProfile perfila todos los hilos del proceso: con `GUNICORN_THREADS` > 1, el vigía de datos o los
+   trabajos del LLM, el perfil mezcla trabajo de otros requests. Usarlo con un solo hilo por worker.
+El modo se elige con el header `X-OFTW-Profile-Mode`. El perfil cubre el callback completo, incluida
+la serialización de la respuesta de Dash.
+
+Los perfiles quedan en `OFTW_PROFILE_DIR` (por defecto `logs/profiles/<función del callback>/`) y cada
+uno se agrega a `index.jsonl` con el callback, su salida, la duración y el archivo; la respuesta lo
+indica en el header `X-OFTW-Profile-File`. Se perfila un request a la vez por proceso: si ya hay uno en
+curso, el request se atiende normalmente. Sin `OFTW_PROFILE_SECRET` el mecanismo está apagado.
+
+Ejemplo (con el cuerpo de un request copiado de las herramientas de desarrollo del navegador):
+    curl -H "X-OFTW-Profile: $OFTW_PROFILE_SECRET" -H "Content-Type: application/json" \\
+         -d @request.json http://localhost:8050/_dash-update-component
+
+Ver los perfiles:
+    python -m src.utils.profiling --callback update_graphs
+"""
+
+import argparse
+import cProfile
+import hashlib
+import hmac
+import io
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from flask import g, request
+from log_config import LOG_DIR, get_logger
+from src.utils.tracing import callback_label
+
+logger = get_logger(__name__)
+
+PROFILE_SECRET = os.getenv("OFTW_PROFILE_SECRET", "")
+PROFILE_DIR = Path(os.getenv("OFTW_PROFILE_DIR", os.path.join(LOG_DIR, "profiles")))
+PROFILE_SAMPLE_INTERVAL = float(os.getenv("OFTW_PROFILE_SAMPLE_INTERVAL", "0.001"))
+
+PROFILE_HEADER = "X-OFTW-Profile"
+PROFILE_MODE_HEADER = "X-OFTW-Profile-Mode"
+PROFILE_FILE_HEADER = "X-OFTW-Profile-File"
+# El primero es el modo por defecto
+MODES = ("sampling", "cprofile")
+INDEX_FILE = "index.jsonl"
+
+# Un perfil a la vez por proceso (acota el costo y evita mezclar profilers)
+_busy = threading.Lock()
+
+
+def requested_mode():
+    """
+    Modo de perfilado pedido por el request actual, si trae el secreto correcto.
+
+    :return: "sampling", "cprofile" o None si no se pide (o el secreto no coincide).
+    """
+    token = request.headers.get(PROFILE_HEADER)
+    if not token or not PROFILE_SECRET:
+        return None
+    if not hmac.compare_digest(token.encode("utf-8"), PROFILE_SECRET.encode("utf-8")):
+        logger.warning(f"Pedido de perfilado con un secreto inválido desde {request.remote_addr}.")
+        return None
+    mode = request.headers.get(PROFILE_MODE_HEADER) or MODES[0]
+    return mode if mode in MODES else MODES[0]
+
+
+class SamplingProfiler:
+    """Muestrea la pila de un hilo desde un hilo aparte y cuenta las pilas colapsadas."""
+
+    def __init__(self, thread_id: int, interval: float = PROFILE_SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def enable(self) -> None:
+        self._thread.start()
+
+    def disable(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{Path(code.co_filename).stem}:{code.co_qualname}")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def dump_stats(self, path: Path) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+def _profile_path(name: str, output: str, mode: str) -> Path:
+    now = time.time()
+    stamp = time.strftime("%Y%m%dT%H%M%S", time.localtime(now)) + f"{now % 1:.3f}"[1:]
+    digest = hashlib.sha1(output.encode("utf-8")).hexdigest()[:8]
+    suffix = ".pstats" if mode == "cprofile" else ".folded"
+    return PROFILE_DIR / name / f"{stamp}-{os.getpid()}-{digest}{suffix}"
+
+
+def _finish_profile(app, status_code: int):
+    """Detiene el profiler del request actual, guarda el perfil y lo agrega al índice."""
+    mode, profiler, start = g.pop("profile")
+    try:
+        profiler.disable()
+        duration_ms = (time.perf_counter() - start) * 1000
+        name, output = callback_label(app)
+        path = _profile_path(name, output, mode)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        profiler.dump_stats(path)
+        entry = {
+            "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "callback": name,
+            "output": output,
+            "mode": mode,
+            "status": status_code,
+            "duration_ms": round(duration_ms, 1),
+            "pid": os.getpid(),
+            "file": str(path.relative_to(PROFILE_DIR)),
+        }
+        with open(PROFILE_DIR / INDEX_FILE, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry) + "\n")
+        logger.info(f"Perfil de {name} ({mode}, {duration_ms:.0f} ms) guardado en {path}.")
+        return path
+    except Exception as e:
+        logger.error(f"No se pudo guardar el perfil del request: {e}")
+        return None
+    finally:
+        _busy.release()
+
+
+def register_profiling(app) -> None:
+    """
+    Habilita el perfilado bajo demanda de los requests de callback de una app Dash.
+
+    :param app: App Dash.
+    """
+    if not PROFILE_SECRET:
+        return
+    server = app.server
+
+    @server.before_request
+    def start_profile():
+        if not request.path.endswith("/_dash-update-component"):
+            return
+        mode = requested_mode()
+        if mode is None:
+            return
+        if not _busy.acquire(blocking=False):
+            logger.warning("Ya hay un perfil en curso en este proceso; el request se atiende sin perfilar.")
+            return
+        profiler = cProfile.Profile() if mode == "cprofile" else SamplingProfiler(threading.get_ident())
+        g.profile = (mode, profiler, time.perf_counter())
+        profiler.enable()
+
+    @server.after_request
+    def save_profile(response):
+        if "profile" in g:
+            path = _finish_profile(app, response.status_code)
+            if path is not None:
+                response.headers[PROFILE_FILE_HEADER] = str(path.relative_to(PROFILE_DIR))
+        return response
+
+    @server.teardown_request
+    def save_failed_profile(error):
+        # El request falló antes de `after_request`: el perfil se guarda igual, con estado 500
+        if "profile" in g:
+            _finish_profile(app, 500)
+
+
+def read_index(path: Path = PROFILE_DIR / INDEX_FILE) -> list:
+    """Entradas del índice de perfiles, en el orden en que se guardaron."""
+    if not path.exists():
+        return []
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def summarize(entry: dict, limit: int = 25) -> str:
+    """Resumen de un perfil: funciones por tiempo acumulado (pstats) o pilas más frecuentes (folded)."""
+    path = PROFILE_DIR / entry["file"]
+    if entry["mode"] == "cprofile":
+        out = io.StringIO()
+        pstats.Stats(str(path), stream=out).strip_dirs().sort_stats("cumulative").print_stats(limit)
+        return out.getvalue()
+    with open(path, encoding="utf-8") as f:
+        lines = [line.rsplit(" ", 1) for line in f]
+    total = sum(int(count) for _, count in lines) or 1
+    # Tiempo propio por función (la hoja de cada pila)
+    leaves = Counter()
+    for stack, count in lines:
+        leaves[stack.rsplit(";", 1)[-1]] += int(count)
+    return "\n".join(f"{100 * count / total:6.1f}%  {frame}" for frame, count in leaves.most_common(limit))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Lista los perfiles guardados y resume el más reciente.")
+    parser.add_argument("--callback", help="Solo los perfiles de este callback (nombre de la función).")
+    parser.add_argument("--last", type=int, default=10, help="Cantidad de perfiles a listar.")
+    parser.add_argument("--limit", type=int, default=25, help="Funciones a mostrar en el resumen.")
+    args = parser.parse_args()
+
+    entries = [e for e in read_index() if not args.callback or e["callback"] == args.callback]
+    if not entries:
+        print(f"No hay perfiles en {PROFILE_DIR}.")
+        sys.exit(0)
+    for entry in entries[-args.last:]:
+        print(f"{entry['timestamp']} | {entry['callback']:<30} | {entry['mode']:<8} | "
+              f"{entry['duration_ms']:8.1f} ms | HTTP {entry['status']} | {entry['file']}")
+    print(f"\nResumen de {entries[-1]['file']}:\n")
+    print(summarize(entries[-1], args.limit))
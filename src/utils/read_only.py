@@ -0,0 +1,60 @@
+"""
+Contrato de solo lectura para los DataFrames compartidos.
+
+Las versiones de datos, los índices de filtrado y el cubo de Money Moved se comparten entre todos
+los hilos de un worker. Para que subir `threads` en gunicorn sea seguro:
+ - pandas trabaja con Copy-on-Write: un DataFrame derivado (selección de columnas, slice, etc.)
+   nunca escribe en los arreglos de su origen, sino en una copia propia.
+ - Los arreglos de los DataFrames compartidos se marcan como no escribibles: una escritura en el
+   lugar sobre el DataFrame compartido falla con `ValueError` en vez de corromper los datos de las
+   demás requests.
+ - Los diccionarios de DataFrames se publican como `MappingProxyType` (sin asignación de claves).
+
+Las capas de métricas y gráficos no modifican sus entradas: derivan columnas con `assign` o
+trabajan sobre el resultado de un `groupby`/filtro.
+"""
+
+from types import MappingProxyType
+import numpy as np
+import pandas as pd
+
+# Copy-on-Write en todo el proceso (comportamiento por defecto a partir de pandas 3.0)
+pd.set_option("mode.copy_on_write", True)
+
+
+def freeze_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Marca como no escribibles los arreglos de un DataFrame (en el lugar).
+
+    :param df: DataFrame compartido.
+    :return: El mismo DataFrame.
+    """
+    if df is None:
+        return df
+    # Los bloques del BlockManager guardan los arreglos reales (una columna es una vista del bloque)
+    for values in df._mgr.arrays:
+        ndarray = getattr(values, "_ndarray", values)
+        if isinstance(ndarray, np.ndarray):
+            ndarray.flags.writeable = False
+    return df
+
+
+def freeze_frames(dfs: dict) -> MappingProxyType:
+    """
+    Congela todos los DataFrames de un diccionario y lo retorna como vista de solo lectura.
+
+    :param dfs: Diccionario {nombre: DataFrame}.
+    :return: `MappingProxyType` con los mismos DataFrames.
+    """
+    for df in dfs.values():
+        freeze_frame(df)
+    return MappingProxyType(dict(dfs))
+
+
+def is_frozen(df: pd.DataFrame) -> bool:
+    """Indica si todos los arreglos NumPy del DataFrame son de solo lectura."""
+    for values in df._mgr.arrays:
+        ndarray = getattr(values, "_ndarray", values)
+        if isinstance(ndarray, np.ndarray) and ndarray.flags.writeable:
+            return False
+    return True
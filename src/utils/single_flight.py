@@ -0,0 +1,240 @@
+"""
+Single-flight sobre `cache.memoize`.
+
+Cuando varias llamadas concurrentes piden la misma clave que no está en caché (p.ej. los callbacks
+de una página que se disparan juntos tras publicar una versión de datos), solo una la calcula:
+ - Dentro del proceso, las demás esperan un lock por clave y luego leen el resultado del caché.
+ - Entre workers, el que calcula toma un lock en el backend de caché (`add` atómico); los demás
+   consultan el caché hasta que aparece el valor o el lock se libera.
+
+`single_flight_stats()` retorna, por función, cuántos cálculos se hicieron y cuántos duplicados
+se evitaron.
+
+Uso de la demo:
+    python -m src.utils.single_flight
+"""
+
+import functools
+import hashlib
+import os
+import threading
+import time
+from collections import defaultdict
+from log_config import get_logger
+from src.utils.cache import cache
+from src.utils.instrumentation import add_collector, observe
+from src.utils.tracing import set_attributes, span
+
+logger = get_logger(__name__)
+
+# Vigencia máxima del lock entre workers (si el dueño muere, el lock vence solo)
+LOCK_TIMEOUT = int(os.getenv("OFTW_SINGLE_FLIGHT_LOCK_TIMEOUT", "120"))
+# Intervalo de consulta al caché mientras otro worker calcula
+POLL_INTERVAL = 0.05
+
+# Marca de "sin resultado" para las funciones `lookup`
+MISSING = object()
+
+_key_locks = {}
+_key_locks_guard = threading.Lock()
+
+_stats = defaultdict(lambda: {"hits": 0, "computed": 0, "suppressed_local": 0, "suppressed_remote": 0,
+                              "lock_timeouts": 0})
+_stats_guard = threading.Lock()
+
+
+def _count(name: str, counter: str) -> None:
+    with _stats_guard:
+        _stats[name][counter] += 1
+    set_attributes(**{"single_flight.result": counter})
+
+
+def single_flight_stats() -> dict:
+    """
+    Contadores por función: hits, cálculos y duplicados evitados (en el proceso y entre workers).
+
+    :return: Diccionario {función: {contador: valor}}.
+    """
+    with _stats_guard:
+        return {name: dict(counters) for name, counters in _stats.items()}
+
+
+def _collect_stats() -> list:
+    return [
+        ("oftw_memoized_calls_total", "counter", "Llamadas a funciones memoizadas por resultado (ver `single_flight_stats`).",
+         {"function": name, "result": counter}, value)
+        for name, counters in single_flight_stats().items()
+        for counter, value in counters.items()
+    ]
+
+
+add_collector(_collect_stats)
+
+
+def _acquire_key_lock(key: str) -> threading.Lock:
+    with _key_locks_guard:
+        entry = _key_locks.setdefault(key, [threading.Lock(), 0])
+        entry[1] += 1
+        return entry[0]
+
+
+def _release_key_lock(key: str) -> None:
+    with _key_locks_guard:
+        entry = _key_locks[key]
+        entry[1] -= 1
+        if entry[1] == 0:
+            del _key_locks[key]
+
+
+def _shared_backend():
+    """Backend de caché de la app actual, o None fuera de un contexto de aplicación."""
+    try:
+        return cache.cache
+    except (RuntimeError, AttributeError, KeyError):
+        return None
+
+
+def _compute_across_workers(name: str, key: str, lookup, compute):
+    backend = _shared_backend()
+    if backend is None:
+        _count(name, "computed")
+        return compute()
+
+    lock_key = f"single-flight:{key}"
+    if backend.add(lock_key, os.getpid(), timeout=LOCK_TIMEOUT):
+        try:
+            # Otro worker pudo terminar entre la primera consulta y la toma del lock
+            value = lookup()
+            if value is not MISSING:
+                _count(name, "suppressed_remote")
+                return value
+            _count(name, "computed")
+            return compute()
+        finally:
+            backend.delete(lock_key)
+
+    # Otro worker está calculando: esperar su resultado
+    deadline = time.monotonic() + LOCK_TIMEOUT
+    while time.monotonic() < deadline:
+        time.sleep(POLL_INTERVAL)
+        value = lookup()
+        if value is not MISSING:
+            _count(name, "suppressed_remote")
+            return value
+        if not backend.has(lock_key):
+            # El dueño terminó: su resultado pudo publicarse justo después de la última consulta
+            value = lookup()
+            if value is not MISSING:
+                _count(name, "suppressed_remote")
+                return value
+            break
+    else:
+        _count(name, "lock_timeouts")
+        logger.warning(f"Single-flight {name}: se agotó la espera del lock {lock_key}.")
+
+    _count(name, "computed")
+    return compute()
+
+
+def single_flight(name: str, key: str, lookup, compute):
+    """
+    Ejecuta `compute` a lo sumo una vez por clave entre llamadas concurrentes.
+
+    :param name: Nombre para los contadores (normalmente la función).
+    :param key: Clave única del resultado.
+    :param lookup: Función sin argumentos que retorna el resultado ya disponible o `MISSING`.
+    :param compute: Función sin argumentos que calcula (y publica) el resultado.
+    :return: Resultado de `lookup` o de `compute`.
+    """
+    value = lookup()
+    if value is not MISSING:
+        _count(name, "hits")
+        return value
+
+    lock = _acquire_key_lock(key)
+    try:
+        waited = not lock.acquire(blocking=False)
+        if waited:
+            lock.acquire()
+        try:
+            if waited:
+                value = lookup()
+                if value is not MISSING:
+                    _count(name, "suppressed_local")
+                    return value
+            return _compute_across_workers(name, key, lookup, compute)
+        finally:
+            lock.release()
+    finally:
+        _release_key_lock(key)
+
+
+def single_flight_memoize(timeout=None):
+    """
+    Igual que `cache.memoize(timeout)`, pero las llamadas concurrentes con los mismos argumentos
+    comparten un único cálculo. Conserva `uncached` y `make_cache_key` del memoize original.
+
+    :param timeout: Vigencia de las entradas (ver `cache.memoize`).
+    """
+    def decorator(f):
+        memoized = cache.memoize(timeout=timeout)(f)
+        name = f.__qualname__
+
+        @functools.wraps(f)
+        def wrapper(*args, **kwargs):
+            backend = _shared_backend()
+            if backend is None:
+                return memoized(*args, **kwargs)
+
+            def lookup():
+                # La clave del memoize incluye una versión por función que puede cambiar si dos
+                # workers la inicializan a la vez; se vuelve a derivar en cada consulta
+                value = backend.get(memoized.make_cache_key(f, *args, **kwargs))
+                return MISSING if value is None else value
+
+            # Clave del lock estable entre workers (no depende de la versión del memoize)
+            flight_key = f"{name}:{hashlib.sha1(repr((args, sorted(kwargs.items()))).encode()).hexdigest()}"
+            def compute():
+                value = f(*args, **kwargs)
+                if value is not None:
+                    backend.set(memoized.make_cache_key(f, *args, **kwargs), value, timeout=timeout)
+                return value
+
+            start = time.perf_counter()
+            with span(name):
+                value = single_flight(name, flight_key, lookup, compute)
+            observe("oftw_memoized_duration_seconds", time.perf_counter() - start, function=name)
+            return value
+
+        wrapper.uncached = memoized.uncached
+        wrapper.make_cache_key = memoized.make_cache_key
+        return wrapper
+    return decorator
+
+
+if __name__ == "__main__":
+    from concurrent.futures import ThreadPoolExecutor
+    from flask import Flask
+
+    app = Flask(__name__)
+    cache.init_app(app)
+
+    @single_flight_memoize(timeout=60)
+    def slow_square(x):
+        time.sleep(0.5)
+        return x * x
+
+    def call(x):
+        with app.app_context():
+            return slow_square(x)
+
+    with app.app_context():
+        cache.clear()
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        start = time.perf_counter()
+        results = list(pool.map(call, [3] * 8 + [4] * 8))
+        elapsed = time.perf_counter() - start
+
+    print(f"16 llamadas concurrentes (2 claves) en {elapsed:.2f}s: {sorted(set(results))}")
+    print(single_flight_stats())
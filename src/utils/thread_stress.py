@@ -0,0 +1,160 @@
+"""
+Prueba de estrés de concurrencia del contrato de solo lectura (ver `src/utils/read_only.py`).
+
+Ejecuta los callbacks de los dashboards (y el contexto del Chat LLM) desde varios hilos a la vez
+sobre la misma app, con el caché vacío para que los cálculos corran en paralelo, y verifica que:
+ - cada respuesta sea idéntica a la obtenida en una pasada secuencial;
+ - los DataFrames de la versión de datos activa no cambien (columnas y hash de contenido) y
+   sigan siendo de solo lectura.
+
+Uso:
+    python -m src.utils.thread_stress --threads 8 --rounds 3
+"""
+
+import argparse
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+from log_config import get_logger
+
+logger = get_logger(__name__)
+
+FILTER_INPUTS = {"year-filter.value", "portfolio-filter.value", "year-mode.value"}
+PAGES = ["/money_moved", "/objectics", "/pledge_perf", "/chat_llm"]
+
+
+def frames_signature(dfs) -> dict:
+    """Columnas y hash de contenido de cada DataFrame."""
+    return {name: (list(df.columns), int(pd.util.hash_pandas_object(df, index=True).sum()))
+            for name, df in dfs.items()}
+
+
+def filter_combinations(years: list, portfolios: list) -> list:
+    """Combinaciones de filtros: sin filtro y cada año, con y sin portfolios, en ambos modos."""
+    year_sets = [None] + [[year] for year in years]
+    portfolio_sets = [None, portfolios[:2]]
+    return [(selected_years, selected_portfolios, year_mode)
+            for selected_years in year_sets
+            for selected_portfolios in portfolio_sets
+            for year_mode in ("fiscal", "calendar")]
+
+
+def build_requests(app, combinations: list) -> list:
+    """Cuerpos de `/_dash-update-component` para cada callback de filtros y cada combinación."""
+    requests = []
+    for output, spec in app.callback_map.items():
+        inputs = [f"{i['id']}.{i['property']}" for i in spec["inputs"]]
+        outputs = [{"id": o.rsplit(".", 1)[0], "property": o.rsplit(".", 1)[1]}
+                   for o in output.strip(".").split("...")]
+        outputs = outputs if output.startswith("..") else outputs[0]
+
+        if set(inputs) == FILTER_INPUTS:
+            for selected_years, selected_portfolios, year_mode in combinations:
+                values = {"year-filter.value": selected_years, "portfolio-filter.value": selected_portfolios,
+                          "year-mode.value": year_mode}
+                requests.append({
+                    "output": output, "outputs": outputs, "changedPropIds": [inputs[0]], "state": [],
+                    "inputs": [{"id": i["id"], "property": i["property"], "value": values[f"{i['id']}.{i['property']}"]}
+                               for i in spec["inputs"]],
+                })
+        elif inputs == ["url.pathname"]:
+            for page in PAGES:
+                requests.append({
+                    "output": output, "outputs": outputs, "changedPropIds": ["url.pathname"], "state": [],
+                    "inputs": [{"id": "url", "property": "pathname", "value": page}],
+                })
+    return requests
+
+
+def run(threads: int, rounds: int, seed: int = 0) -> bool:
+    """
+    :param threads: Hilos concurrentes.
+    :param rounds: Veces que se ejecuta cada request (en cada ronda, las requests se reparten en
+                   orden aleatorio entre los hilos).
+    :param seed: Semilla del orden aleatorio.
+    :return: True si no hubo diferencias, errores ni mutaciones.
+    """
+    from main import app, server
+    from src.callbacks.chat_llm_callbacks import create_rich_context
+    from src.data_ingestion.data_loader import data_versions
+    from src.utils.cache import cache
+    from src.utils.callbacks_filter import get_filtered_data
+    from src.utils.filtering import get_available_years
+    from src.utils.read_only import is_frozen
+
+    with server.app_context():
+        version = data_versions.current()
+    payments_df = version.dfs["payments"]
+    combinations = filter_combinations(list(get_available_years(payments_df)),
+                                       sorted(payments_df["portfolio"].dropna().unique()))
+    requests = build_requests(app, combinations)
+    signature = frames_signature(version.dfs)
+
+    def call(request, client):
+        if request.get("chat_context"):
+            with server.app_context():
+                return create_rich_context(*get_filtered_data(*request["chat_context"])).encode()
+        response = client.post("/_dash-update-component", json=request)
+        if response.status_code not in (200, 204):
+            raise RuntimeError(f"HTTP {response.status_code} en {request['output']}")
+        return response.data
+
+    requests += [{"output": "chat-context", "chat_context": combination} for combination in combinations]
+
+    # Referencia secuencial
+    client = server.test_client()
+    start = time.perf_counter()
+    expected = [call(request, client) for request in requests]
+    sequential = time.perf_counter() - start
+    logger.info(f"{len(requests)} requests secuenciales en {sequential:.2f}s.")
+
+    with server.app_context():
+        cache.clear()
+
+    local = threading.local()
+    rng = random.Random(seed)
+    order = [position for _ in range(rounds) for position in rng.sample(range(len(requests)), len(requests))]
+    schedule = [order[i::threads] for i in range(threads)]
+
+    def worker(thread_index):
+        local.client = server.test_client()
+        mismatches, errors = [], []
+        for position in schedule[thread_index]:
+            try:
+                if call(requests[position], local.client) != expected[position]:
+                    mismatches.append(requests[position]["output"])
+            except Exception as e:
+                errors.append(f"{requests[position]['output']}: {e}")
+        return mismatches, errors
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        results = list(pool.map(worker, range(threads)))
+    concurrent = time.perf_counter() - start
+
+    mismatches = [m for result in results for m in result[0]]
+    errors = [e for result in results for e in result[1]]
+    mutated = [name for name, value in frames_signature(version.dfs).items() if value != signature[name]]
+    writable = [name for name, df in version.dfs.items() if not is_frozen(df)]
+
+    total = len(order)
+    print(f"{total} requests en {threads} hilos ({rounds} rondas) en {concurrent:.2f}s "
+          f"({total / concurrent:.0f} req/s; secuencial {len(requests) / sequential:.0f} req/s)")
+    print(f"Respuestas distintas a la referencia: {len(mismatches)}  Errores: {len(errors)}")
+    print(f"DataFrames modificados: {mutated or 'ninguno'}  Escribibles: {writable or 'ninguno'}")
+    for line in (sorted(set(mismatches)) + errors)[:10]:
+        print(f"  {line}")
+    return not (mismatches or errors or mutated or writable)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Estrés de concurrencia sobre los callbacks de la app.")
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    sys.exit(0 if run(args.threads, args.rounds, args.seed) else 1)
@@ -0,0 +1,381 @@
+"""
+Trazas jerárquicas livianas (ingesta → filtro → métrica → figura) por invocación de callback.
+
+Cada request a `/_dash-update-component` abre una traza cuya raíz es el callback; las funciones
+marcadas con `@traced` (o `@instrumented`, las memoizadas y `span(...)`) abren spans hijos sobre
+el span activo, que viaja en un `contextvars.ContextVar` (un hilo por request en gunicorn gthread).
+Fuera de una traza, `span` no hace nada.
+
+Las trazas se arman en memoria y al terminar solo se exportan las lentas (`OFTW_TRACE_SLOW_MS`,
+por defecto 500 ms), las que terminaron con error y una fracción `OFTW_TRACE_SAMPLE_RATE` del resto
+(por defecto 0). El destino es `OFTW_TRACE_FILE` (por defecto `logs/traces.jsonl`): una línea por traza
+en el formato JSON de OTLP (`ExportTraceServiceRequest`), que el receptor `otlpjsonfile` del
+OpenTelemetry Collector puede leer. `OFTW_TRACING=0` lo desactiva.
+
+Ver las trazas (cada invocación como árbol, con tiempo total y propio por span; el tiempo propio de
+la raíz es el overhead de Dash y la serialización de la respuesta):
+    python -m src.utils.tracing --callback update_graphs --last 3
+"""
+
+import argparse
+import contextlib
+import contextvars
+import functools
+import json
+import os
+import random
+import threading
+import time
+from pathlib import Path
+from flask import g, request
+from log_config import LOG_DIR, get_logger
+
+logger = get_logger(__name__)
+
+TRACING_ENABLED = os.getenv("OFTW_TRACING", "1") == "1"
+TRACE_SLOW_MS = float(os.getenv("OFTW_TRACE_SLOW_MS", "500"))
+TRACE_SAMPLE_RATE = float(os.getenv("OFTW_TRACE_SAMPLE_RATE", "0"))
+TRACE_FILE = Path(os.getenv("OFTW_TRACE_FILE", os.path.join(LOG_DIR, "traces.jsonl")))
+# Al superar este tamaño el archivo se rota a `<archivo>.1`
+TRACE_FILE_MAX_BYTES = int(float(os.getenv("OFTW_TRACE_FILE_MAX_MB", "50")) * 1024 * 1024)
+# Tope de spans por traza (p.ej. una función llamada por cada grupo de un groupby)
+MAX_SPANS = 1000
+
+SERVICE_NAME = "oftw-dashboard"
+# Tipos de span de OTLP
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+# Códigos de estado de OTLP
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+_current_span = contextvars.ContextVar("oftw_current_span", default=None)
+_export_lock = threading.Lock()
+
+
+class Trace:
+    """Spans de una traza, en orden de inicio."""
+
+    def __init__(self):
+        self.trace_id = os.urandom(16).hex()
+        self.spans = []
+        self.dropped = 0
+        self._lock = threading.Lock()
+
+    def add(self, span) -> bool:
+        with self._lock:
+            if len(self.spans) >= MAX_SPANS:
+                self.dropped += 1
+                return False
+            self.spans.append(span)
+            return True
+
+
+class Span:
+    __slots__ = ("trace", "span_id", "parent_id", "name", "kind", "attributes", "start_ns", "end_ns", "error")
+
+    def __init__(self, trace: Trace, name: str, parent=None, kind: int = SPAN_KIND_INTERNAL, attributes: dict = None):
+        self.trace = trace
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent.span_id if parent is not None else None
+        self.name = name
+        self.kind = kind
+        self.attributes = dict(attributes or {})
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.error = None
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e6
+
+    def end(self, error: BaseException = None) -> None:
+        if error is not None:
+            self.error = f"{type(error).__name__}: {error}"
+        self.end_ns = time.time_ns()
+
+
+def current_span():
+    """Span activo en este contexto, o None fuera de una traza."""
+    return _current_span.get()
+
+
+def set_attributes(**attributes) -> None:
+    """Agrega atributos al span activo (no hace nada fuera de una traza)."""
+    active = _current_span.get()
+    if active is not None:
+        active.attributes.update(attributes)
+
+
+@contextlib.contextmanager
+def span(name: str, **attributes):
+    """Span hijo del span activo. Fuera de una traza no hace nada (y retorna None)."""
+    parent = _current_span.get()
+    if parent is None:
+        yield None
+        return
+    child = Span(parent.trace, name, parent, attributes=attributes)
+    if not parent.trace.add(child):
+        yield None
+        return
+    token = _current_span.set(child)
+    try:
+        yield child
+    except BaseException as e:
+        child.end(e)
+        raise
+    else:
+        child.end()
+    finally:
+        _current_span.reset(token)
+
+
+def start_trace(name: str, kind: int = SPAN_KIND_INTERNAL, **attributes):
+    """
+    Abre una traza nueva y deja su raíz como span activo.
+
+    :return: (span raíz, token para `finish_trace`), o (None, None) si el tracing está desactivado.
+    """
+    if not TRACING_ENABLED:
+        return None, None
+    trace = Trace()
+    root = Span(trace, name, kind=kind, attributes=attributes)
+    trace.add(root)
+    return root, _current_span.set(root)
+
+
+def finish_trace(root, token, error: BaseException = None) -> bool:
+    """
+    Cierra la traza de `root` y la exporta si corresponde (lenta, con error o muestreada).
+
+    :return: True si la traza se exportó.
+    """
+    if root is None:
+        return False
+    _current_span.reset(token)
+    if root.end_ns is None:
+        root.end(error)
+    if root.trace.dropped:
+        root.attributes["oftw.dropped_spans"] = root.trace.dropped
+    if not (root.duration_ms >= TRACE_SLOW_MS or root.error is not None or random.random() < TRACE_SAMPLE_RATE):
+        return False
+    export_trace(root.trace)
+    return True
+
+
+@contextlib.contextmanager
+def trace(name: str, **attributes):
+    """
+    Traza propia para trabajo fuera de un request (p.ej. la construcción de una versión de datos).
+    Dentro de una traza ya abierta es un span hijo más.
+    """
+    if _current_span.get() is not None:
+        with span(name, **attributes) as child:
+            yield child
+        return
+    root, token = start_trace(name, **attributes)
+    try:
+        yield root
+    except BaseException as e:
+        finish_trace(root, token, e)
+        raise
+    finish_trace(root, token)
+
+
+def traced(f):
+    """Decorador: ejecuta la función dentro de un span con su nombre (`modulo.funcion`)."""
+    if not TRACING_ENABLED:
+        return f
+    name = f"{f.__module__.rsplit('.', 1)[-1]}.{f.__name__}"
+
+    @functools.wraps(f)
+    def wrapper(*args, **kwargs):
+        if _current_span.get() is None:
+            return f(*args, **kwargs)
+        with span(name):
+            return f(*args, **kwargs)
+    return wrapper
+
+
+def _otlp_value(value) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_span(s: Span) -> dict:
+    data = {
+        "traceId": s.trace.trace_id,
+        "spanId": s.span_id,
+        "name": s.name,
+        "kind": s.kind,
+        "startTimeUnixNano": str(s.start_ns),
+        "endTimeUnixNano": str(s.end_ns or time.time_ns()),
+        "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in s.attributes.items()],
+        "status": {"code": STATUS_ERROR, "message": s.error} if s.error else {"code": STATUS_OK},
+    }
+    if s.parent_id:
+        data["parentSpanId"] = s.parent_id
+    return data
+
+
+def to_otlp(trace: Trace) -> dict:
+    """Traza en el formato JSON de OTLP (`ExportTraceServiceRequest`)."""
+    return {"resourceSpans": [{
+        "resource": {"attributes": [
+            {"key": "service.name", "value": {"stringValue": SERVICE_NAME}},
+            {"key": "process.pid", "value": {"intValue": str(os.getpid())}},
+        ]},
+        "scopeSpans": [{"scope": {"name": __name__}, "spans": [_otlp_span(s) for s in trace.spans]}],
+    }]}
+
+
+def export_trace(trace: Trace) -> None:
+    """Agrega la traza como una línea a `TRACE_FILE` (una sola escritura, segura entre workers)."""
+    line = (json.dumps(to_otlp(trace), separators=(",", ":")) + "\n").encode("utf-8")
+    try:
+        with _export_lock:
+            TRACE_FILE.parent.mkdir(parents=True, exist_ok=True)
+            try:
+                if TRACE_FILE.stat().st_size > TRACE_FILE_MAX_BYTES:
+                    os.replace(TRACE_FILE, TRACE_FILE.with_name(TRACE_FILE.name + ".1"))
+            except FileNotFoundError:
+                pass
+            fd = os.open(TRACE_FILE, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, line)
+            finally:
+                os.close(fd)
+    except OSError as e:
+        logger.warning(f"No se pudo exportar la traza {trace.trace_id}: {e}")
+
+
+def callback_label(app) -> tuple:
+    """
+    Nombre de la función del callback y su salida para el request actual a `/_dash-update-component`.
+
+    :return: (nombre de la función, id de la salida).
+    """
+    output = (request.get_json(silent=True) or {}).get("output", "unknown")
+    spec = app.callback_map.get(output, {})
+    return getattr(spec.get("callback"), "__name__", "unknown"), output
+
+
+def register_tracing(app) -> None:
+    """
+    Abre una traza por cada request de callback de una app Dash.
+
+    :param app: App Dash.
+    """
+    if not TRACING_ENABLED:
+        return
+    server = app.server
+
+    @server.before_request
+    def start_callback_trace():
+        if not request.path.endswith("/_dash-update-component"):
+            return
+        name, output = callback_label(app)
+        g.trace = start_trace(name, kind=SPAN_KIND_SERVER, **{
+            "dash.callback": name,
+            "dash.output": output,
+            "http.method": request.method,
+            "http.route": request.path,
+            "http.request_content_length": request.content_length or 0,
+        })
+
+    @server.after_request
+    def record_callback_response(response):
+        root, _ = g.get("trace", (None, None))
+        if root is not None:
+            root.attributes["http.status_code"] = response.status_code
+            root.attributes["http.response_content_length"] = response.calculate_content_length() or 0
+            if response.status_code >= 500:
+                root.error = f"HTTP {response.status_code}"
+        return response
+
+    @server.teardown_request
+    def finish_callback_trace(error):
+        root, token = g.pop("trace", (None, None))
+        finish_trace(root, token, error)
+
+
+def read_traces(path: Path = TRACE_FILE) -> list:
+    """Trazas exportadas como listas de spans (dicts de OTLP), en el orden del archivo."""
+    traces = []
+    if not path.exists():
+        return traces
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                data = json.loads(line)
+            except ValueError:
+                continue
+            traces.append([s for rs in data["resourceSpans"] for ss in rs["scopeSpans"] for s in ss["spans"]])
+    return traces
+
+
+def _attributes(s: dict) -> dict:
+    return {a["key"]: next(iter(a["value"].values())) for a in s.get("attributes", [])}
+
+
+def format_trace(spans: list) -> str:
+    """Árbol de spans con su duración y tiempo propio (sin contar los hijos)."""
+    duration = {s["spanId"]: (int(s["endTimeUnixNano"]) - int(s["startTimeUnixNano"])) / 1e6 for s in spans}
+    children = {}
+    for s in spans:
+        children.setdefault(s.get("parentSpanId"), []).append(s)
+
+    lines = []
+
+    def walk(s, depth):
+        kids = children.get(s["spanId"], [])
+        own = duration[s["spanId"]] - sum(duration[k["spanId"]] for k in kids)
+        status = " ERROR " + s["status"].get("message", "") if s["status"].get("code") == STATUS_ERROR else ""
+        # Los atributos de la raíz (callback, salida, HTTP) ya van en el encabezado
+        attributes = "" if depth == 0 else " ".join(f"{k}={v}" for k, v in _attributes(s).items())
+        lines.append(f"{'  ' * depth}{s['name']:<{max(1, 60 - 2 * depth)}} {duration[s['spanId']]:9.1f} ms"
+                     f" (propio {own:8.1f} ms){status} {attributes}".rstrip())
+        for kid in kids:
+            walk(kid, depth + 1)
+
+    for root in children.get(None, []):
+        attributes = _attributes(root)
+        started = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(int(root["startTimeUnixNano"]) / 1e9))
+        status = f" | HTTP {attributes['http.status_code']}" if "http.status_code" in attributes else ""
+        lines.append(f"Traza {root['traceId']} | {started} | {attributes.get('dash.output', root['name'])}{status}")
+        walk(root, 0)
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Muestra las trazas exportadas como árboles de spans.")
+    parser.add_argument("--file", type=Path, default=TRACE_FILE, help="Archivo de trazas (JSON de OTLP por línea).")
+    parser.add_argument("--callback", help="Solo las trazas de este callback (nombre de la función).")
+    parser.add_argument("--trace-id", help="Solo la traza con este id.")
+    parser.add_argument("--min-ms", type=float, default=0, help="Solo las trazas que duraron al menos esto.")
+    parser.add_argument("--last", type=int, default=5, help="Cantidad de trazas a mostrar (las más recientes).")
+    args = parser.parse_args()
+
+    selected = []
+    for spans in read_traces(args.file):
+        root = next((s for s in spans if not s.get("parentSpanId")), None)
+        if root is None:
+            continue
+        if args.callback and _attributes(root).get("dash.callback", root["name"]) != args.callback:
+            continue
+        if args.trace_id and root["traceId"] != args.trace_id:
+            continue
+        if (int(root["endTimeUnixNano"]) - int(root["startTimeUnixNano"])) / 1e6 < args.min_ms:
+            continue
+        selected.append(spans)
+
+    if not selected:
+        print(f"No hay trazas que coincidan en {args.file}.")
+    for spans in selected[-args.last:]:
+        print(format_trace(spans))
+        print()